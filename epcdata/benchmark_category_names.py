@@ -0,0 +1,99 @@
+"""
+Benchmark category display names over the full category set.
+
+Compares, per name and per full pass over every Category:
+- cold: the precompiled normaliser with its LRU cache cleared first
+- warm: the same calls answered from the LRU cache (repeat renders)
+- menu: reading display_name/clean_name from the cached category_menu tree
+
+With no categories in the database, the EPC serial/parent/child titles that
+import_to_oscar turns into categories are used instead.
+
+    python benchmark_category_names.py --repeat 20
+"""
+import os
+import sys
+import argparse
+import time
+import django
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Set the Django settings module
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'epcdata.settings')
+
+# Setup Django
+django.setup()
+
+from oscar.core.loading import get_model
+from motorpartsdata.category_menu import category_tree
+from motorpartsdata.category_names import _beautify, _clean, beautify_category_name, clean_category_name
+from motorpartsdata.models import SerialNumber, ParentTitle, ChildTitle
+
+Category = get_model('catalogue', 'Category')
+
+
+def category_names():
+    names = list(Category.objects.values_list('name', flat=True))
+    if names:
+        return names, 'categories'
+    names = [f"Serial {serial}" for serial in SerialNumber.objects.values_list('serial', flat=True)]
+    names += ParentTitle.objects.values_list('title', flat=True)
+    names += ChildTitle.objects.values_list('title', flat=True)
+    return names, 'EPC titles'
+
+
+def walk(nodes):
+    for node in nodes:
+        yield node
+        yield from walk(node.children)
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def normalise_all(names):
+    for name in names:
+        clean_category_name(name)
+        beautify_category_name(name)
+
+
+def cold_pass(names):
+    _clean.cache_clear()
+    _beautify.cache_clear()
+    normalise_all(names)
+
+
+def read_tree(nodes):
+    for node in nodes:
+        node.clean_name
+        node.display_name
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Time category name normalisation over every category')
+    parser.add_argument('--repeat', type=int, default=10, help='Passes to average over')
+    args = parser.parse_args()
+
+    names, source = category_names()
+    if not names:
+        print("No categories or EPC titles to benchmark")
+        sys.exit(1)
+    print(f"{len(names)} names from {source} ({len(set(names))} distinct)")
+
+    cold = timed(lambda: cold_pass(names), args.repeat)
+    normalise_all(names)
+    warm = timed(lambda: normalise_all(names), args.repeat)
+    print(f"  cold normaliser  {1000 * cold:8.2f} ms/pass  {1e6 * cold / len(names):6.2f} us/name")
+    print(f"  warm LRU cache   {1000 * warm:8.2f} ms/pass  {1e6 * warm / len(names):6.2f} us/name")
+
+    nodes = list(walk(category_tree()))
+    if nodes:
+        menu = timed(lambda: read_tree(nodes), args.repeat)
+        print(f"  menu attributes  {1000 * menu:8.2f} ms/pass  {1e6 * menu / len(nodes):6.2f} us/name "
+              f"({len(nodes)} menu nodes)")
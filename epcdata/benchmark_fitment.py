@@ -0,0 +1,113 @@
+"""
+Benchmark fitment checks ("does part X fit VIN Y?") and compatible-vehicle
+lists.
+
+Each sampled (part number, serial) pair is checked with:
+- join:      Part -> ChildTitle -> ParentTitle -> SerialNumber, what the
+             views would do without an index
+- serialpart: the SerialPart (part number, serial) index
+- fitment:   fitment.fits(), cold (cache cleared per check, one Fitment row
+             read) and warm (bytes already cached, after a priming pass)
+
+and each sampled part number's serial list with the join and with
+fitment.compatible_serials(). Half the pairs fit, half do not (when the
+database has more than one serial).
+
+Without a CACHES setting Django's local-memory cache keeps only 300 entries,
+and each sampled number takes two or three, so larger samples measure
+evictions rather than warm checks.
+
+    python benchmark_fitment.py --sample 100
+"""
+import os
+import sys
+import argparse
+import random
+import time
+import django
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Set the Django settings module
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'epcdata.settings')
+
+# Setup Django
+django.setup()
+
+from django.core.cache import cache
+from motorpartsdata import fitment
+from motorpartsdata.models import Fitment, Part, PartNumber, SerialNumber, SerialPart
+
+
+def join(number, serial):
+    return Part.objects.filter(part_number=number, child_title__parent__serial_number__serial=serial).exists()
+
+
+def serial_part(number, serial):
+    return SerialPart.objects.filter(part_number__number=number, serial_number__serial=serial).exists()
+
+
+def cold(number, serial):
+    cache.clear()
+    return fitment.fits(number, serial)
+
+
+def join_serials(number):
+    return list(
+        SerialNumber.objects.filter(parent_titles__child_titles__parts__part_number=number)
+        .order_by('serial').values_list('serial', flat=True).distinct()
+    )
+
+
+def timed(method, cases):
+    started = time.perf_counter()
+    results = [method(*case) for case in cases]
+    return (time.perf_counter() - started) / len(cases) * 1000, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fitment checks')
+    parser.add_argument('--sample', type=int, default=100, help='Part numbers to check')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the fitment index first')
+    args = parser.parse_args()
+
+    if args.rebuild or not Fitment.objects.exists():
+        started = time.perf_counter()
+        stats = fitment.rebuild()
+        print(f"Fitment built in {time.perf_counter() - started:.2f}s: "
+              f"{stats['part_numbers']} part numbers, {stats['serials']} serials")
+    rng = random.Random(args.seed)
+    serials = list(SerialNumber.objects.values_list('serial', flat=True))
+    numbers = list(PartNumber.objects.filter(fitment__isnull=False).values_list('number', flat=True))
+    rng.shuffle(numbers)
+    numbers = numbers[:args.sample]
+    pairs = []
+    for i, number in enumerate(numbers):
+        fitting = fitment.compatible_serials(number)
+        pairs.append((number, rng.choice(fitting) if i % 2 == 0 or len(fitting) == len(serials) else
+                      rng.choice(sorted(set(serials) - set(fitting)))))
+    print(f"{Part.objects.count()} Part rows, {len(serials)} serials, {len(numbers)} part numbers sampled")
+
+    print(f"{'check':<12} {'mean ms':>8} {'fits':>6}")
+    expected = None
+    for name, method in (('join', join), ('serialpart', serial_part), ('cold', cold), ('warm', fitment.fits)):
+        if name == 'warm':
+            timed(method, pairs)
+        elapsed, results = timed(method, pairs)
+        expected = expected or results
+        assert results == expected, name
+        print(f"{name:<12} {elapsed:>8.3f} {sum(results):>6}")
+
+    print(f"{'list':<12} {'mean ms':>8} {'serials':>8}")
+    cases = [(number,) for number in numbers]
+    for name, method in (('join', join_serials), ('warm', fitment.compatible_serials)):
+        if name == 'warm':
+            timed(method, cases)
+        elapsed, results = timed(method, cases)
+        print(f"{name:<12} {elapsed:>8.3f} {sum(map(len, results)):>8}")
+
+
+if __name__ == '__main__':
+    main()
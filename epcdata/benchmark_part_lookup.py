@@ -0,0 +1,110 @@
+"""
+Benchmark part number lookups against the full Part table.
+
+Each sampled part number is looked up as typed three ways:
+- exact:  as stored ("C00049476")
+- typed:  lower case with a space and dash ("c0004 9476-")
+- typo:   two neighbouring digits swapped ("C00049467")
+
+and each form is timed with:
+- old:    Part.objects.filter(part_number=...), what the views did
+- scan:   normalising part_number in SQL on every Part row
+- lookup: part_lookup.lookup(), one probe of the PartNumberVariant index
+
+reporting mean latency and how many lookups found the intended number. A
+swapped pair of digits is often one edit from several real numbers, so for
+typos the 'listed' row counts how often the intended number is among
+part_lookup.near_misses(), what the views offer as suggestions.
+
+    python benchmark_part_lookup.py --sample 200
+"""
+import os
+import sys
+import argparse
+import random
+import time
+import django
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Set the Django settings module
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'epcdata.settings')
+
+# Setup Django
+django.setup()
+
+from django.db.models import Value
+from django.db.models.functions import Replace, Upper
+from motorpartsdata.models import Part, PartNumber
+from motorpartsdata.part_lookup import lookup, near_misses
+
+
+def typed(number):
+    middle = len(number) // 2
+    return f"{number[:middle].lower()} {number[middle:].lower()}-"
+
+
+def typo(number):
+    digits = [i for i in range(len(number) - 1) if number[i].isdigit() and number[i + 1].isdigit()
+              and number[i] != number[i + 1]]
+    if not digits:
+        return None
+    i = digits[-1]
+    return number[:i] + number[i + 1] + number[i] + number[i + 2:]
+
+
+def old(text):
+    part = Part.objects.filter(part_number=text).first()
+    return part.part_number if part else None
+
+
+def scan(text):
+    key = PartNumber.normalize(text)
+    part = (
+        Part.objects.annotate(key=Upper(Replace(Replace('part_number', Value(' '), Value('')), Value('-'), Value(''))))
+        .filter(key=key).first()
+    )
+    return part.part_number if part else None
+
+
+def indexed(text):
+    part_number, _ = lookup(text)
+    return part_number.number if part_number else None
+
+
+def listed(text):
+    return [part_number.number for part_number in near_misses(text)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark part number lookups')
+    parser.add_argument('--sample', type=int, default=100, help='Part numbers to look up')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    numbers = list(PartNumber.objects.values_list('number', flat=True))
+    random.Random(args.seed).shuffle(numbers)
+    sample = numbers[:args.sample]
+    print(f"{Part.objects.count()} Part rows, {len(numbers)} part numbers, {len(sample)} sampled")
+
+    forms = {
+        'exact': [(number, number) for number in sample],
+        'typed': [(typed(number), number) for number in sample],
+        'typo': [(typo(number), number) for number in sample if typo(number)],
+    }
+    print(f"{'form':<6} {'method':<7} {'mean ms':>8} {'found':>9}")
+    for form, cases in forms.items():
+        for name, method in (('old', old), ('scan', scan), ('lookup', indexed)):
+            started = time.perf_counter()
+            found = sum(method(text) == number for text, number in cases)
+            elapsed = time.perf_counter() - started
+            print(f"{form:<6} {name:<7} {elapsed / len(cases) * 1000:>8.2f} {found:>4}/{len(cases):<4}")
+    started = time.perf_counter()
+    found = sum(number in listed(text) for text, number in forms['typo'])
+    elapsed = time.perf_counter() - started
+    print(f"{'typo':<6} {'listed':<7} {elapsed / len(forms['typo']) * 1000:>8.2f} {found:>4}/{len(forms['typo']):<4}")
+
+
+if __name__ == '__main__':
+    main()
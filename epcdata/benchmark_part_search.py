@@ -0,0 +1,78 @@
+"""
+Benchmark the part search index against icontains scans.
+
+For each query, times:
+- index: motorpartsdata.part_search.search() (prefix and typo-tolerant)
+- scan:  what SimpleEngine-style search does to cover the same text, an
+         icontains OR over part number, usage name, pricing description and
+         child/parent titles of every Part, per word
+
+The scan grows with Part rows across every VIN; the index reads only the
+postings of the matched words, one per distinct part number.
+
+    python benchmark_part_search.py --repeat 20
+    python benchmark_part_search.py --query "brake pad" --query bracekt
+"""
+import os
+import sys
+import argparse
+import time
+import django
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Set the Django settings module
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'epcdata.settings')
+
+# Setup Django
+django.setup()
+
+from django.db.models import Q
+from motorpartsdata.models import Part, SearchTerm
+from motorpartsdata.part_search import rebuild_index, search
+
+DEFAULT_QUERIES = ['bolt', 'brake pad', 'bracekt', 'wiper blade', 'air cleaner hose', 'C0004', 'B00003507']
+
+
+def scan(query):
+    parts = Part.objects.all()
+    for word in query.split():
+        parts = parts.filter(
+            Q(part_number__icontains=word) | Q(usage_name__icontains=word)
+            | Q(canonical__pricing_data__description__icontains=word)
+            | Q(child_title__title__icontains=word) | Q(child_title__parent__title__icontains=word)
+        )
+    return set(parts.values_list('canonical_id', flat=True))
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the part search index')
+    parser.add_argument('--query', action='append', dest='queries', help='Query to time (repeatable)')
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per query and method')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the index first')
+    args = parser.parse_args()
+
+    if args.rebuild or not SearchTerm.objects.exists():
+        started = time.perf_counter()
+        stats = rebuild_index()
+        print(f"Index built in {time.perf_counter() - started:.2f}s: "
+              f"{stats['part_numbers']} part numbers, {stats['terms']} terms")
+    print(f"{Part.objects.count()} Part rows")
+
+    print(f"{'query':<20} {'index ms':>9} {'hits':>5} {'scan ms':>9} {'hits':>5}")
+    for query in args.queries or DEFAULT_QUERIES:
+        index_time, found = timed(lambda: search(query), args.repeat)
+        scan_time, scanned = timed(lambda: scan(query), args.repeat)
+        print(f"{query:<20} {index_time * 1000:>9.2f} {len(found):>5} {scan_time * 1000:>9.2f} {len(scanned):>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Benchmark the price scraper's capture step against a local fixture of the
+XT pricing page.
+
+The fixture serves a page with the same input layout (58 inputs, the search
+box at index 3) and warehouse/stock row as the real one, and fills in the
+pricing a random 100-600 ms after each search, like the live site, with
+the warehouse/stock row following a moment after the inputs. Each mode
+searches the same codes in headless Chrome:
+
+    fixed     the old capture: time.sleep(2) after every search
+    adaptive  price_capture.wait_for_update(): poll until the page changes and settles
+
+and reports per-part latency and parts per minute. Every captured record is
+checked to carry the price and stock the fixture published for its code.
+
+    python benchmark_price_capture.py                 # 30 codes per mode
+    python benchmark_price_capture.py --codes 100 --min-latency 50 --max-latency 1500
+"""
+import argparse
+import http.server
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from motorpartsdata.price_capture import LatencyStats, capture, to_form_data, wait_for_update
+from motorpartsdata.pricing_values import INDEX_MAPPING
+
+FIXED_SLEEP = 2
+INPUT_COUNT = 58
+
+FIXTURE_PAGE = """<!doctype html>
+<html><head><title>XT pricing fixture</title></head>
+<body>
+<form>%(inputs)s</form>
+<div style="overflow: hidden; user-select: none; height: 19px; position: relative; z-index: 0; width: 1072px; border-bottom-color: transparent;">
+  <div style="position: absolute; z-index: 3;" id="whs"></div>
+  <div style="position: absolute; z-index: 3;" id="stock"></div>
+</div>
+<script>
+const params = new URLSearchParams(window.location.search);
+const minLatency = parseInt(params.get('min') || '100', 10);
+const maxLatency = parseInt(params.get('max') || '600', 10);
+const inputs = document.querySelectorAll('input');
+const search = inputs[3];
+const STOCK_DELAY = 30;
+function expectedStock(n) { return n %% 7 ? String(n %% 7) : 'Nil'; }
+search.focus();
+function fill(code) {
+    const n = parseInt(code.replace(/[^0-9]/g, '').slice(-4) || '0', 10);
+    inputs[4].value = 'DESC ' + code;
+    inputs[5].value = n %% 5 ? 'A' : 'S';
+    inputs[13].value = String(n %% 30);
+    inputs[14].value = 'Z';
+    inputs[22].value = '2';
+    inputs[24].value = (n / 100 + 1).toFixed(2);
+    inputs[29].value = (n / 120 + 1).toFixed(2);
+    inputs[34].value = (n / 120 + 1).toFixed(2);
+    inputs[55].value = String(n %% 90);
+    // The stock row lands separately, so a capture of the first change alone is caught
+    setTimeout(() => {
+        document.getElementById('whs').textContent = '02';
+        document.getElementById('stock').textContent = expectedStock(n);
+    }, STOCK_DELAY);
+    search.focus();
+}
+search.addEventListener('keydown', event => {
+    if (event.key !== 'Enter') return;
+    event.preventDefault();
+    const code = search.value;
+    setTimeout(() => fill(code), minLatency + Math.random() * (maxLatency - minLatency));
+});
+</script>
+</body></html>
+"""
+
+
+def fixture_html():
+    readonly = set(INDEX_MAPPING) - {3}
+    inputs = ''.join(
+        f'<input type="text"{" readonly" if index in readonly else ""}>' for index in range(INPUT_COUNT)
+    )
+    return (FIXTURE_PAGE % {'inputs': inputs}).encode('utf-8')
+
+
+def expected_price(code):
+    digits = ''.join(ch for ch in code if ch.isdigit())[-4:] or '0'
+    return f"{int(digits) / 100 + 1:.2f}"
+
+
+def expected_stock(code):
+    digits = ''.join(ch for ch in code if ch.isdigit())[-4:] or '0'
+    return str(int(digits) % 7) if int(digits) % 7 else 'Nil'
+
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = fixture_html()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixture():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_mode(driver, url, codes, mode):
+    from selenium.webdriver.common.keys import Keys
+
+    driver.get(url)
+    metrics = LatencyStats()
+    snapshot = capture(driver)
+    wrong = 0
+    for code in codes:
+        started = time.perf_counter()
+        search = driver.switch_to.active_element
+        search.clear()
+        search.send_keys(code)
+        search.send_keys(Keys.RETURN)
+        submitted = time.perf_counter()
+        if mode == 'fixed':
+            time.sleep(FIXED_SLEEP)
+            snapshot = capture(driver)
+        else:
+            snapshot = wait_for_update(driver, snapshot)
+        waited = time.perf_counter() - submitted
+        form_data = to_form_data(snapshot)
+        if (form_data['allInputs'][24].get('value') != expected_price(code)
+                or form_data['whs_stock'].get('stock_available') != expected_stock(code)):
+            wrong += 1
+        metrics.add(code, waited, time.perf_counter() - started)
+    return metrics.summary(), wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--codes', type=int, default=30, help='Codes searched per mode')
+    parser.add_argument('--min-latency', type=int, default=100, help='Fastest fixture response (ms)')
+    parser.add_argument('--max-latency', type=int, default=600, help='Slowest fixture response (ms)')
+    parser.add_argument('--modes', nargs='+', choices=('fixed', 'adaptive'), default=['fixed', 'adaptive'])
+    args = parser.parse_args()
+
+    try:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+    except ImportError:
+        sys.exit('selenium is required (pip install selenium) along with a local Chrome')
+
+    server = serve_fixture()
+    url = f"http://127.0.0.1:{server.server_port}/?min={args.min_latency}&max={args.max_latency}"
+    codes = [f"C{100000 + i * 37:08d}" for i in range(args.codes)]
+
+    options = Options()
+    options.add_argument('--headless=new')
+    driver = webdriver.Chrome(options=options)
+    try:
+        results = {mode: run_mode(driver, url, codes, mode) for mode in args.modes}
+    finally:
+        driver.quit()
+        server.shutdown()
+
+    for mode, (summary, wrong) in results.items():
+        print(f"{mode:>9}: {summary}, wrong captures: {wrong}")
+    if len(results) == 2:
+        speedup = results['adaptive'][0]['parts_per_minute'] / results['fixed'][0]['parts_per_minute']
+        print(f"adaptive is {speedup:.1f}x the parts per minute of fixed")
+
+
+if __name__ == '__main__':
+    main()
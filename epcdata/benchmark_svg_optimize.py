@@ -0,0 +1,176 @@
+"""
+Benchmark the ingest-time SVG optimiser against saved VIN folders.
+
+For every diagram it reports bytes before/after (raw, gzip and, if installed,
+brotli), the optimiser's own run time, the XML parse time of both versions as
+a proxy for client render cost, and a parity check: the optimised SVG must
+contain the same drawable elements (tag, id, class, text) in the same order,
+with every coordinate within rounding tolerance of the original.
+
+    python benchmark_svg_optimize.py                      # every VIN folder here
+    python benchmark_svg_optimize.py LSH14C4C5NA129710 --limit 20 --precision 3
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from motorpartsdata.epc_html import parse_diagram_file
+from motorpartsdata.svg_optimize import DEFAULT_PRECISION, IDENTITY_MATRIX, NUMBER, local_name, optimize_svg
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GEOMETRY_ATTRIBUTES = (
+    'd', 'points', 'transform', 'x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'r', 'rx', 'ry', 'width', 'height',
+)
+SKIPPED_TAGS = {'svg', 'desc', 'metadata', 'defs', 'style'}
+
+
+def find_vin_folders(base_dir):
+    """Directories directly below base_dir that contain section folders of .html files"""
+    folders = []
+    for name in sorted(os.listdir(base_dir)):
+        path = os.path.join(base_dir, name)
+        if os.path.isdir(path) and len(name) == 17 and name.isalnum():
+            folders.append(path)
+    return folders
+
+
+def diagram_paths(vin_dir, limit=None):
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(vin_dir):
+        dirnames.sort()
+        paths.extend(os.path.join(dirpath, f) for f in sorted(filenames) if f.lower().endswith('.html'))
+    return paths[:limit] if limit else paths
+
+
+def drawables(svg_code):
+    """[(tag, id, class, text, [numbers])] for every element that affects rendering"""
+    elements = []
+    for element in ET.fromstring(svg_code).iter():
+        name = local_name(element.tag)
+        if name in SKIPPED_TAGS or (name == 'g' and not element.attrib):
+            continue
+        numbers = []
+        for attribute in GEOMETRY_ATTRIBUTES:
+            value = element.get(attribute, '')
+            if attribute == 'transform':
+                value = IDENTITY_MATRIX.sub(r'translate(\1 \2)', value)
+            numbers.extend(float(n) for n in NUMBER.findall(value))
+        text = (element.text or '').strip() if name in ('text', 'tspan') else ''
+        # Case-insensitive: the optimiser restores clipPath etc. from the HTML parser's lower case
+        elements.append((name.lower(), element.get('id'), element.get('class'), text, numbers))
+    return elements
+
+
+def parity(original, optimized):
+    """(structure_matches, max coordinate deviation)"""
+    before, after = drawables(original), drawables(optimized)
+    if [e[:4] for e in before] != [e[:4] for e in after]:
+        return False, None
+    deviation = 0.0
+    for (_, _, _, _, a), (_, _, _, _, b) in zip(before, after):
+        if len(a) != len(b):
+            return False, None
+        deviation = max([deviation] + [abs(x - y) for x, y in zip(a, b)])
+    return True, deviation
+
+
+def sizes(svg_code):
+    raw = svg_code.encode('utf-8')
+    return (
+        len(raw),
+        len(gzip.compress(raw, mtime=0)),
+        len(brotli.compress(raw)) if brotli else 0,
+    )
+
+
+def parse_seconds(svg_code, repeat=5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        ET.fromstring(svg_code)
+    return (time.perf_counter() - started) / repeat
+
+
+def benchmark_vin(vin_dir, precision, limit=None):
+    totals = {
+        'diagrams': 0, 'mismatches': 0, 'max_deviation': 0.0,
+        'before': [0, 0, 0], 'after': [0, 0, 0],
+        'optimize_seconds': 0.0, 'parse_before': 0.0, 'parse_after': 0.0,
+    }
+    for path in diagram_paths(vin_dir, limit):
+        diagram = parse_diagram_file(path)
+        if 'error' in diagram:
+            print(f"  skipped {path}: {diagram['error']}")
+            continue
+        original = diagram['svg_code']
+
+        started = time.perf_counter()
+        optimized = optimize_svg(original, precision)
+        totals['optimize_seconds'] += time.perf_counter() - started
+
+        matches, deviation = parity(original, optimized)
+        if not matches:
+            totals['mismatches'] += 1
+            print(f"  structure mismatch: {os.path.relpath(path, vin_dir)}")
+        else:
+            totals['max_deviation'] = max(totals['max_deviation'], deviation)
+
+        for index, value in enumerate(sizes(original)):
+            totals['before'][index] += value
+        for index, value in enumerate(sizes(optimized)):
+            totals['after'][index] += value
+        totals['parse_before'] += parse_seconds(original)
+        totals['parse_after'] += parse_seconds(optimized)
+        totals['diagrams'] += 1
+    return totals
+
+
+def saving(before, after):
+    return f"{before:>11,} -> {after:>11,} ({100 * (before - after) / before:5.1f}% smaller)" if before else 'n/a'
+
+
+def report(name, totals):
+    count = totals['diagrams'] or 1
+    print(f"{name}: {totals['diagrams']} diagrams, {totals['mismatches']} structure mismatches, "
+          f"max coordinate deviation {totals['max_deviation']:.4f}")
+    print(f"  raw     {saving(totals['before'][0], totals['after'][0])}")
+    print(f"  gzip    {saving(totals['before'][1], totals['after'][1])}")
+    if brotli:
+        print(f"  brotli  {saving(totals['before'][2], totals['after'][2])}")
+    print(f"  optimise {1000 * totals['optimize_seconds'] / count:.2f} ms/diagram; "
+          f"XML parse {1000 * totals['parse_before'] / count:.3f} -> {1000 * totals['parse_after'] / count:.3f} ms/diagram")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure SVG optimiser savings and parity on saved VIN folders')
+    parser.add_argument('vin_dirs', nargs='*', help='VIN folders (default: every VIN folder next to this script)')
+    parser.add_argument('--precision', type=int, default=DEFAULT_PRECISION, help='Decimal places kept in coordinates')
+    parser.add_argument('--limit', type=int, default=None, help='Only the first N diagrams of each folder')
+    args = parser.parse_args()
+
+    vin_dirs = args.vin_dirs or find_vin_folders(os.path.dirname(os.path.abspath(__file__)))
+    overall = None
+    for vin_dir in vin_dirs:
+        totals = benchmark_vin(vin_dir, args.precision, args.limit)
+        report(os.path.basename(os.path.normpath(vin_dir)), totals)
+        if overall is None:
+            overall = totals
+        else:
+            for key, value in totals.items():
+                if isinstance(value, list):
+                    overall[key] = [a + b for a, b in zip(overall[key], value)]
+                elif key == 'max_deviation':
+                    overall[key] = max(overall[key], value)
+                else:
+                    overall[key] += value
+    if overall and len(vin_dirs) > 1:
+        report('All folders', overall)
+    sys.exit(1 if overall and overall['mismatches'] else 0)
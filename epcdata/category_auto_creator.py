@@ -1,162 +1,84 @@
 """
 Enhanced data loading utilities that automatically create Oscar categories
 when processing motor parts data.
+
+Categories are the Serial -> ParentTitle -> ChildTitle tree that
+import_to_oscar uses, built by motorpartsdata.category_builder.
 """
 import logging
-from oscar.apps.catalogue.models import Category
-from motorpartsdata.models import SerialNumber, ParentTitle, ChildTitle
+from motorpartsdata.category_builder import CategoryTreeBuilder, build_serial_categories
 
 logger = logging.getLogger(__name__)
 
+
+def _serial_categories(serial_instance):
+    """(serial category, category_map) for a serial, creating whatever is missing"""
+    builder = CategoryTreeBuilder()
+    serial_category, category_map = build_serial_categories(builder, [serial_instance])[serial_instance.id]
+    builder.save()
+    if builder.created:
+        logger.info(f"📁 Created {builder.created} Oscar categories for serial {serial_instance.serial}")
+    else:
+        logger.debug(f"📁 Using existing Oscar categories for serial {serial_instance.serial}")
+    return serial_category, category_map
+
+
 def create_oscar_category_for_serial(serial_instance):
     """Create or get Oscar category for a SerialNumber"""
-    category_name = f"Serial: {serial_instance.serial}"
-    
     try:
-        category, created = Category.objects.get_or_create(
-            name=category_name,
-            defaults={
-                'description': f'Parts for serial number {serial_instance.serial}',
-                'slug': f'serial-{serial_instance.serial}',
-            }
-        )
-        
-        # If it's a new category and has no parent, make it a root category
-        if created and not category.get_parent():
-            # Move to root level if not already there
-            try:
-                if category.depth != 1:
-                    Category.objects.filter(id=category.id).update(depth=1, numchild=0, path='0001')
-                    category.refresh_from_db()
-            except Exception as e:
-                logger.warning(f"Could not set category as root: {e}")
-        
-        if created:
-            logger.info(f"📁 Created Oscar category: {category_name}")
-        else:
-            logger.debug(f"📁 Using existing Oscar category: {category_name}")
-            
-        return category
-        
+        return _serial_categories(serial_instance)[0]
     except Exception as e:
         logger.error(f"Error creating category for serial {serial_instance.serial}: {e}")
         return None
 
+
 def create_oscar_category_for_parent(parent_instance, serial_category=None):
     """Create or get Oscar category for a ParentTitle"""
-    category_name = f"Parent: {parent_instance.title}"
-    
     try:
-        category, created = Category.objects.get_or_create(
-            name=category_name,
-            defaults={
-                'description': f'Parent category: {parent_instance.title}',
-                'slug': f'parent-{parent_instance.id}',
-            }
-        )
-        
-        # If it's a new category and has no parent, make it a root category
-        if created and not category.get_parent():
-            try:
-                if category.depth != 1:
-                    Category.objects.filter(id=category.id).update(depth=1, numchild=0, path=f'{category.id:04d}')
-                    category.refresh_from_db()
-            except Exception as e:
-                logger.warning(f"Could not set category as root: {e}")
-        
-        if created:
-            logger.info(f"📂 Created Oscar category: {category_name}")
-        else:
-            logger.debug(f"📂 Using existing Oscar category: {category_name}")
-            
-        return category
-        
+        return _serial_categories(parent_instance.serial_number)[1].get(parent_instance.id)
     except Exception as e:
         logger.error(f"Error creating category for parent {parent_instance.title}: {e}")
         return None
 
+
 def create_oscar_category_for_child(child_instance, parent_category=None):
     """Create or get Oscar category for a ChildTitle"""
-    category_name = f"Child: {child_instance.title}"
-    
     try:
-        category, created = Category.objects.get_or_create(
-            name=category_name,
-            defaults={
-                'description': f'Child category: {child_instance.title}',
-                'slug': f'child-{child_instance.id}',
-            }
-        )
-        
-        # If it's a new category and has no parent, make it a root category
-        if created and not category.get_parent():
-            try:
-                if category.depth != 1:
-                    Category.objects.filter(id=category.id).update(depth=1, numchild=0, path=f'{category.id:04d}')
-                    category.refresh_from_db()
-            except Exception as e:
-                logger.warning(f"Could not set category as root: {e}")
-        
-        if created:
-            logger.info(f"📄 Created Oscar category: {category_name}")
-        else:
-            logger.debug(f"📄 Using existing Oscar category: {category_name}")
-            
-        return category
-        
+        return _serial_categories(child_instance.parent.serial_number)[1].get(f"child_{child_instance.id}")
     except Exception as e:
         logger.error(f"Error creating category for child {child_instance.title}: {e}")
         return None
 
+
 def auto_create_categories_for_data(serial_instance=None, parent_instance=None, child_instance=None):
     """
     Automatically create Oscar categories for new data.
     Call this function whenever you create new SerialNumber, ParentTitle, or ChildTitle instances.
     """
     created_categories = []
-    
+
     try:
-        # Create category for serial if provided
-        if serial_instance:
-            serial_cat = create_oscar_category_for_serial(serial_instance)
-            if serial_cat:
-                created_categories.append(serial_cat)
-        
-        # Create category for parent if provided
-        if parent_instance:
-            # Get the serial category if it exists
-            serial_cat = None
-            if hasattr(parent_instance, 'serial_number'):
-                serial_cat = create_oscar_category_for_serial(parent_instance.serial_number)
-                if serial_cat and serial_cat not in created_categories:
-                    created_categories.append(serial_cat)
-            
-            parent_cat = create_oscar_category_for_parent(parent_instance, serial_cat)
-            if parent_cat:
-                created_categories.append(parent_cat)
-        
-        # Create category for child if provided
-        if child_instance:
-            # Get the parent and serial categories if they exist
-            parent_cat = None
-            serial_cat = None
-            
-            if hasattr(child_instance, 'parent'):
-                parent_cat = create_oscar_category_for_parent(child_instance.parent)
-                if parent_cat and parent_cat not in created_categories:
-                    created_categories.append(parent_cat)
-                
-                if hasattr(child_instance.parent, 'serial_number'):
-                    serial_cat = create_oscar_category_for_serial(child_instance.parent.serial_number)
-                    if serial_cat and serial_cat not in created_categories:
-                        created_categories.append(serial_cat)
-            
-            child_cat = create_oscar_category_for_child(child_instance, parent_cat)
-            if child_cat:
-                created_categories.append(child_cat)
-        
+        if serial_instance is None and parent_instance is not None:
+            serial_instance = parent_instance.serial_number
+        if serial_instance is None and child_instance is not None:
+            serial_instance = child_instance.parent.serial_number
+        if serial_instance is None:
+            return created_categories
+
+        # The whole serial tree is built in one pass, so a new child also gets its parent and serial
+        serial_cat, category_map = _serial_categories(serial_instance)
+        created_categories.append(serial_cat)
+        for key in (
+            parent_instance.id if parent_instance else None,
+            child_instance.parent_id if child_instance else None,
+            f"child_{child_instance.id}" if child_instance else None,
+        ):
+            category = category_map.get(key)
+            if category is not None and category not in created_categories:
+                created_categories.append(category)
+
         return created_categories
-        
+
     except Exception as e:
         logger.error(f"Error in auto_create_categories_for_data: {e}")
         return created_categories
@@ -208,10 +208,11 @@ OSCAR_SEND_REGISTRATION_EMAIL = False
 # Configure Oscar URLs for "View on site" functionality
 OSCAR_HOMEPAGE = '/'
 
-# Haystack (for Oscar search)
+# Haystack (for Oscar search), answered from the part search index;
+# fill it with "manage.py rebuild_part_search" after migrating
 HAYSTACK_CONNECTIONS = {
     'default': {
-        'ENGINE': 'haystack.backends.simple_backend.SimpleEngine',
+        'ENGINE': 'motorpartsdata.search_backend.PartSearchEngine',
     },
 }
 
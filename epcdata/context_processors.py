@@ -1,14 +1,11 @@
-from oscar.core.loading import get_model
-
-Category = get_model('catalogue', 'Category')
+from motorpartsdata.category_menu import category_tree
 
 def categories_processor(request):
     """
     Context processor to add categories to all templates
     """
     try:
-        # Get all root categories (those without a parent)
-        categories = Category.objects.filter(depth=1).select_related().prefetch_related('children')
-        return {'categories': categories}
+        # Root categories with their children attached, from the cached menu tree
+        return {'categories': category_tree()}
     except:
         return {'categories': []}
@@ -25,7 +25,7 @@ if sample_part:
     print(f"Sample part: {sample_part.part_number} - {sample_part.usage_name}")
     
     # Check if pricing exists
-    pricing = PricingData.objects.filter(part_number=sample_part).first()
+    pricing = PricingData.objects.filter(part_number_id=sample_part.canonical_id).first()
     print(f"Has pricing: {pricing is not None}")
     if pricing:
         print(f"List price: {pricing.list_price}")
@@ -46,9 +46,9 @@ if sample_part:
 
 print()
 print("=== Parts with pricing (first 5) ===")
-parts_with_pricing = Part.objects.filter(pricing_data__isnull=False)[:5]
+parts_with_pricing = Part.objects.filter(canonical__pricing_data__isnull=False).select_related('canonical__pricing_data')[:5]
 for part in parts_with_pricing:
-    pricing = part.pricing_data.first()
+    pricing = part.canonical.pricing_data
     print(f"- {part.part_number}: £{pricing.list_price if pricing and pricing.list_price else 'N/A'}")
 
 print()
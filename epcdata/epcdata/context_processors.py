@@ -1,15 +1,16 @@
 from oscar.core.loading import get_model
 from django.conf import settings
+from motorpartsdata.category_menu import category_tree
 
 def uren_context(request):
     """
     Context processor to provide common data for Uren template.
     """
-    Category = get_model('catalogue', 'Category')
     Product = get_model('catalogue', 'Product')
     
-    # Get root categories (depth=1) which should be the "Serial ..." categories
-    root_categories = Category.objects.filter(depth=1).select_related()
+    # Root categories (depth=1, the "Serial ..." categories) with their children
+    # attached, from the cached menu tree, so menus make no per-node queries
+    root_categories = category_tree()
     
     # Get featured products (first 8 products with stock)
     featured_products = Product.objects.filter(
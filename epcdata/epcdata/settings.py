@@ -283,10 +283,12 @@ OSCAR_SEND_REGISTRATION_EMAIL = False
 # Configure Oscar URLs for "View on site" functionality
 OSCAR_HOMEPAGE = '/'
 
-# Haystack (for Oscar search)
+# Haystack (for Oscar search), answered from the part search index. Migration
+# 0014 fills it and ingest/loadprices keep it current; "manage.py
+# rebuild_part_search" rebuilds it from scratch
 HAYSTACK_CONNECTIONS = {
     'default': {
-        'ENGINE': 'haystack.backends.simple_backend.SimpleEngine',
+        'ENGINE': 'motorpartsdata.search_backend.PartSearchEngine',
     },
 }
 
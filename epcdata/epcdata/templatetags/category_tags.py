@@ -1,5 +1,6 @@
 from django import template
 from oscar.apps.catalogue.models import Category
+from motorpartsdata.category_menu import category_tree
 
 register = template.Library()
 
@@ -8,8 +9,8 @@ def category_sidebar():
     """
     Display a hierarchical category sidebar similar to vanparts-direct.co.uk
     """
-    # Get all root categories (depth=1) and their immediate children
-    root_categories = Category.objects.filter(depth=1).prefetch_related('get_children')
+    # Root categories (depth=1) with their descendants, from the cached menu tree
+    root_categories = category_tree()
     
     return {
         'root_categories': root_categories,
@@ -5,7 +5,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.http import HttpResponse
 from django.template.response import TemplateResponse
-from svg_views import svg_diagram_view
+from svg_views import svg_diagram_view, svg_file_view
 from django.apps import apps
 from customer_views import customer_login_view
 
@@ -13,29 +13,31 @@ def product_detail(request, pk, product_slug=None):
     """Simple product detail view"""
     try:
         from oscar.core.loading import get_model
-        from motorpartsdata.models import Part, ChildTitle
+        from motorpartsdata.diagrams import product_diagram
+        from motorpartsdata.part_lookup import part_number_for_upc
+        from motorpartsdata.supersession import current_replacement
+        from motorpartsdata.fitment import compatible_serials
         
         Product = get_model('catalogue', 'Product')
         product = get_object_or_404(Product, pk=pk)
         stock_record = product.stockrecords.first()
         price = f"£{stock_record.price}" if stock_record else "Price not set"
         
-        # Try to get SVG diagram
+        replacement = current_replacement(part_number_for_upc(product.upc)) if product.upc else None
+        serials = compatible_serials(part_number_for_upc(product.upc)) if product.upc else []
+        
+        # Try to get SVG diagram (UPC matched to a part number as in diagrams.py, normalised)
         svg_section = ""
-        try:
-            part = Part.objects.get(part_number=product.upc)
-            child_title = part.child_title
-            if child_title and child_title.svg_code:
-                svg_section = f"""
-                <div style="margin-top: 30px; border: 1px solid #ddd; padding: 20px;">
-                    <h3>Technical Diagram - {child_title.title}</h3>
-                    <div style="border: 1px solid #ccc; padding: 10px; background: #f9f9f9; overflow: auto; max-height: 600px; text-align: center;">
-                        {child_title.svg_code}
-                    </div>
+        diagram = product_diagram(product)
+        if diagram and diagram['svg_code']:
+            svg_section = f"""
+            <div style="margin-top: 30px; border: 1px solid #ddd; padding: 20px;">
+                <h3>Technical Diagram - {diagram['title']}</h3>
+                <div style="border: 1px solid #ccc; padding: 10px; background: #f9f9f9; overflow: auto; max-height: 600px; text-align: center;">
+                    {diagram['svg_code']}
                 </div>
-                """
-        except (Part.DoesNotExist, ChildTitle.DoesNotExist):
-            pass
+            </div>
+            """
         
         html = f"""
         <html>
@@ -58,6 +60,8 @@ def product_detail(request, pk, product_slug=None):
             <div class="product-detail">
                 <h1>{product.title}</h1>
                 <p><strong>UPC:</strong> {product.upc or 'Not set'}</p>
+                {f'<p><strong>Superseded by:</strong> {replacement.number}</p>' if replacement else ''}
+                {f'<p><strong>Fits:</strong> {len(serials)} vehicles ({", ".join(serials[:10])})</p>' if serials else ''}
                 <p><strong>Price:</strong> {price}</p>
                 <p><strong>Description:</strong> {product.description or 'No description available'}</p>
                 
@@ -158,6 +162,7 @@ urlpatterns = [
     
     # SVG diagram endpoint
     path('svg-diagram/<str:upc>/', svg_diagram_view, name='svg_diagram'),
+    path('svg/<slug:digest>.svg', svg_file_view, name='svg_file'),
     
     # Custom login override (must come before Oscar URLs)
     path('accounts/login/', customer_login_view, name='account_login'),
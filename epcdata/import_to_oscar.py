@@ -196,7 +196,7 @@ class OscarImporter:
     def _get_price_from_pricing_data(self, part):
         """Extract price from pricing data"""
         try:
-            pricing_data = PricingData.objects.filter(part_number=part).first()
+            pricing_data = PricingData.objects.filter(part_number_id=part.canonical_id).first()
             if pricing_data and pricing_data.list_price:
                 # Try to convert to decimal, handle various formats
                 price_str = str(pricing_data.list_price).replace('£', '').replace(',', '').strip()
@@ -208,7 +208,7 @@ class OscarImporter:
     def _get_stock_info(self, part):
         """Extract stock information from pricing data"""
         try:
-            pricing_data = PricingData.objects.filter(part_number=part).first()
+            pricing_data = PricingData.objects.filter(part_number_id=part.canonical_id).first()
             if pricing_data and pricing_data.stock_available:
                 stock_str = str(pricing_data.stock_available).strip()
                 
@@ -2,6 +2,9 @@
 """
 Script to link existing Oscar products to categories based on your motor parts data.
 This helps organize your 1,601 existing products into the new category structure.
+
+    python link_products_to_categories.py --dry-run   # report the links that would be added
+    python link_products_to_categories.py
 """
 
 import os
@@ -11,82 +14,38 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'epcdata.settings')
 django.setup()
 
-from oscar.apps.catalogue.models import Category, Product, ProductCategory
-from motorpartsdata.models import Part, ChildTitle, ParentTitle, SerialNumber
+import argparse
 import logging
+import time
+from django.db.models import Count
+from oscar.apps.catalogue.models import Category, Product
+from motorpartsdata.category_links import link_products_to_categories as link_missing
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def link_products_to_categories():
-    """Link Oscar products to categories based on motor parts data relationships"""
+def link_products_to_categories(dry_run=False):
+    """Link Oscar products to their part's serial, parent and child categories"""
     
     logger.info("🔗 Starting product-category linking process")
+    started = time.perf_counter()
     
-    linked_count = 0
-    not_found_count = 0
-    
-    # Get all Oscar products
-    products = Product.objects.all()
-    logger.info(f"Found {products.count()} Oscar products to process")
-    
-    for product in products:
-        try:
-            # Try to find a matching Part by UPC/part_number
-            part = None
-            
-            # First try matching by UPC
-            if product.upc:
-                part = Part.objects.filter(part_number=product.upc).first()
-            
-            # If not found by UPC, try by title/name
-            if not part and product.title:
-                part = Part.objects.filter(usage_name__icontains=product.title[:50]).first()
-            
-            if part:
-                # Find the appropriate categories for this part
-                child_title = part.child_title
-                parent_title = child_title.parent
-                serial_number = parent_title.serial_number
-                
-                # Find corresponding Oscar categories
-                categories_to_link = []
-                
-                # Serial category
-                serial_cat = Category.objects.filter(name=f"Serial: {serial_number.serial}").first()
-                if serial_cat:
-                    categories_to_link.append(serial_cat)
-                
-                # Parent category
-                parent_cat = Category.objects.filter(name=f"Parent: {parent_title.title}").first()
-                if parent_cat:
-                    categories_to_link.append(parent_cat)
-                
-                # Child category
-                child_cat = Category.objects.filter(name=f"Child: {child_title.title}").first()
-                if child_cat:
-                    categories_to_link.append(child_cat)
-                
-                # Link the product to categories
-                for category in categories_to_link:
-                    product_category, created = ProductCategory.objects.get_or_create(
-                        product=product,
-                        category=category
-                    )
-                    if created:
-                        logger.info(f"✅ Linked product '{product.title}' to category '{category.name}'")
-                        linked_count += 1
-                
-            else:
-                logger.debug(f"❌ No matching part found for product: {product.title} (UPC: {product.upc})")
-                not_found_count += 1
-                
-        except Exception as e:
-            logger.error(f"Error processing product {product.id}: {e}")
+    diff = link_missing(dry_run=dry_run)
     
-    logger.info(f"🎯 Linking complete:")
-    logger.info(f"   Linked: {linked_count} product-category relationships")
-    logger.info(f"   Not found: {not_found_count} products without matching parts")
+    action = "Would link" if dry_run else "Linked"
+    logger.info(f"🎯 Linking complete in {time.perf_counter() - started:.2f}s:")
+    logger.info(f"   {action}: {len(diff['missing'])} product-category relationships")
+    logger.info(f"   Already linked: {diff['existing']}")
+    logger.info(f"   Not found: {diff['unmatched']} products without matching parts")
+    if diff['missing_categories']:
+        logger.info(f"   Skipped: {diff['missing_categories']} links to categories not created yet (run import_to_oscar)")
+    if dry_run:
+        names = dict(Category.objects.filter(id__in={c for _, c in diff['missing']}).values_list('id', 'name'))
+        per_category = {}
+        for _, category_id in diff['missing']:
+            per_category[category_id] = per_category.get(category_id, 0) + 1
+        for category_id, count in sorted(per_category.items(), key=lambda item: -item[1]):
+            logger.info(f"   + {count:5d} products -> {names.get(category_id, category_id)}")
 
 def create_category_structure_report():
     """Create a report showing the category structure"""
@@ -94,16 +53,13 @@ def create_category_structure_report():
     logger.info("\n📊 Category Structure Report:")
     logger.info("=" * 50)
     
-    # Count categories by type
-    serial_cats = Category.objects.filter(name__startswith="Serial:").count()
-    parent_cats = Category.objects.filter(name__startswith="Parent:").count()
-    child_cats = Category.objects.filter(name__startswith="Child:").count()
-    total_cats = Category.objects.count()
+    # Count categories by tree level
+    by_depth = dict(Category.objects.order_by().values_list('depth').annotate(count=Count('id')))
     
-    logger.info(f"Serial Categories: {serial_cats}")
-    logger.info(f"Parent Categories: {parent_cats}")
-    logger.info(f"Child Categories: {child_cats}")
-    logger.info(f"Total Categories: {total_cats}")
+    logger.info(f"Serial Categories: {by_depth.get(1, 0)}")
+    logger.info(f"Parent Categories: {by_depth.get(2, 0)}")
+    logger.info(f"Child Categories: {by_depth.get(3, 0)}")
+    logger.info(f"Total Categories: {sum(by_depth.values())}")
     
     # Count products with categories
     products_with_cats = Product.objects.filter(categories__isnull=False).distinct().count()
@@ -114,6 +70,11 @@ def create_category_structure_report():
     logger.info(f"Uncategorized Products: {total_products - products_with_cats}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Link Oscar products to their serial/parent/child categories')
+    parser.add_argument('--dry-run', action='store_true', help='Report the links that would be added without adding them')
+    args = parser.parse_args()
+    
     create_category_structure_report()
-    link_products_to_categories()
-    create_category_structure_report()
+    link_products_to_categories(dry_run=args.dry_run)
+    if not args.dry_run:
+        create_category_structure_report()
@@ -1,5 +1,7 @@
 import os
+import sys
 import json
+import time
 import logging
 import django
 from django.conf import settings
@@ -8,8 +10,11 @@ from django.conf import settings
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'epcdata.settings')
 django.setup()
 
-from motorpartsdata.models import Part, PricingData
-from rest_framework import serializers
+from django.db import transaction
+from motorpartsdata.models import PartNumber, PricingData
+from motorpartsdata.part_search import index_part_numbers
+from motorpartsdata import supersession
+from motorpartsdata.pricing_values import INDEX_MAPPING, parse_active, parse_price, parse_stock
 
 # Configure logging
 logging.basicConfig(
@@ -22,29 +27,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create a simple serializer for PricingData
-class PricingDataSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = PricingData
-        fields = '__all__'
-
-# Index mapping based on the comments in models.py
-INDEX_MAPPING = {
-    3: 'part_number_value',  # Used to lookup Part instance
-    8: 'replacement',        # index 8
-    4: 'description',        # index 4
-    5: 'active',            # index 5
-    10: 'oldest',           # index 10
-    55: 'range_code',       # index 55
-    13: 'discount_code',    # index 13
-    14: 'class_code',       # index 14
-    22: 'vat_code',         # index 22
-    24: 'list_price',       # index 24
-    29: 'vor',              # index 29
-    34: 'stock_order',      # index 34
-    41: 'replacement_code', # index 41
-}
-
 def extract_value_from_inputs(all_inputs, index):
     """Extract value from allInputs array by index"""
     try:
@@ -58,98 +40,166 @@ def extract_value_from_inputs(all_inputs, index):
     except (IndexError, TypeError):
         return ''
 
-def process_json_file(json_path):
-    """Process a single JSON file and extract pricing data"""
+# PricingData columns written by the loader (everything except the FK)
+PRICING_FIELDS = [name for name in INDEX_MAPPING.values() if name != 'part_number_value'] + ['whs', 'stock_available', 'stock_qty']
+
+# Typed columns and the parser for their scraped text
+TYPED_FIELDS = {
+    'active': parse_active,
+    'list_price': parse_price,
+    'vor': parse_price,
+    'stock_order': parse_price,
+}
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def parse_json_file(json_path):
+    """Parse a single JSON file into a pricing record, without touching the database"""
     try:
-        logger.info(f"Processing file: {json_path}")
-        
         with open(json_path, 'r', encoding='utf-8') as file:
             data = json.load(file)
-        
-        # Extract the allInputs directly from the root level
-        all_inputs = data.get('allInputs', [])
-        
-        # Extract warehouse stock data
-        whs_stock = data.get('whs_stock', {})
-        whs = whs_stock.get('whs', '')
-        stock_available = whs_stock.get('stock_available', '')
-        
-        # Extract values based on index mapping
-        extracted_data = {}
-        for index, field_name in INDEX_MAPPING.items():
-            value = extract_value_from_inputs(all_inputs, index)
-            extracted_data[field_name] = value
-            print(f"DEBUG: index {index} maps to '{field_name}' with value: '{value}'")  # Debug output
-
-        # Get the part number value to lookup the Part instance
-        part_number_value = extracted_data.pop('part_number_value', '')
-        
-        if not part_number_value:
-            logger.warning(f"No part number found in {json_path}")
-            return
-        
-        # Look up all Part instances with this part number
-        part_instances = Part.objects.filter(part_number=part_number_value)
-        
-        if not part_instances.exists():
-            # Extract part number from filename as fallback
-            filename = os.path.basename(json_path)
-            filename_part_number = filename.replace('.json', '')
-            
-            logger.warning(f"Part with number '{part_number_value}' not found in database, trying filename part number '{filename_part_number}'")
-            
-            # Try searching with the filename part number
-            part_instances = Part.objects.filter(part_number=filename_part_number)
-            
-            if not part_instances.exists():
-                logger.error(f"Part with number '{filename_part_number}' (from filename) also not found in database")
-                return
-            else:
-                logger.info(f"Found part(s) using filename part number '{filename_part_number}'")
-                # Update the part_number_value for logging purposes
-                part_number_value = filename_part_number
-        
-        logger.info(f"Found {part_instances.count()} parts with number '{part_number_value}'")
-        
-        # Create pricing data for ALL parts with this part number that don't already have it
-        success_count = 0
-        skipped_count = 0
-        
-        for part_instance in part_instances:
-            # Check if THIS specific part instance already has pricing data
-            if PricingData.objects.filter(part_number=part_instance).exists():
-                logger.info(f"Pricing data already exists for part ID {part_instance.id} with number {part_number_value}, skipping this instance")
-                skipped_count += 1
-                continue
-            
-            # Prepare the pricing data for this specific part instance
-            pricing_data = {
-                'part_number': part_instance.id,
-                'whs': whs,
-                'stock_available': stock_available,
-                **extracted_data  # Add all the extracted field data
-            }
-            
-            # Create the pricing data record
-            pricing_serializer = PricingDataSerializer(data=pricing_data)
-            if pricing_serializer.is_valid():
-                pricing_serializer.save()
-                success_count += 1
-                logger.info(f"Created pricing data for part ID {part_instance.id} with number: {part_number_value}")
-            else:
-                logger.error(f"Pricing data serializer errors for part ID {part_instance.id} with number {part_number_value}: {pricing_serializer.errors}")
-        
-        if skipped_count > 0:
-            logger.info(f"Skipped {skipped_count} parts that already had pricing data")
-        logger.info(f"Successfully created pricing data for {success_count} of {part_instances.count()} parts with number {part_number_value}")
-    
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error in {json_path}: {str(e)}")
-    except Exception as e:
-        logger.error(f"Error processing {json_path}: {str(e)}")
+        return None
+    except OSError as e:
+        logger.error(f"Error reading {json_path}: {str(e)}")
+        return None
+
+    if not isinstance(data, dict):
+        logger.error(f"Unexpected JSON in {json_path}: expected an object, got {type(data).__name__}")
+        return None
+
+    # Extract the allInputs directly from the root level
+    all_inputs = data.get('allInputs', [])
+
+    # Extract warehouse stock data
+    whs_stock = data.get('whs_stock') or {}
+    if not isinstance(whs_stock, dict):
+        whs_stock = {}
+
+    # Extract values based on index mapping
+    fields = {}
+    for index, field_name in INDEX_MAPPING.items():
+        fields[field_name] = extract_value_from_inputs(all_inputs, index)
+        logger.debug(f"index {index} maps to '{field_name}' with value: '{fields[field_name]}'")
+
+    fields['whs'] = whs_stock.get('whs', '')
+    fields['stock_available'] = whs_stock.get('stock_available', '')
+
+    part_number_value = fields.pop('part_number_value', '')
+    if not part_number_value:
+        logger.warning(f"No part number found in {json_path}")
+        return None
+
+    # Values longer than the column would have been rejected by the serializer
+    too_long = [name for name, value in fields.items()
+                if name not in TYPED_FIELDS and value and len(value) > PricingData._meta.get_field(name).max_length]
+    if too_long:
+        logger.error(f"Values too long for {too_long} in {json_path}, skipping")
+        return None
+
+    for name, parse in TYPED_FIELDS.items():
+        fields[name] = parse(fields[name])
+    # bulk_create skips PricingData.save(), which would otherwise fill this in
+    fields['stock_qty'] = parse_stock(fields['stock_available']) if fields['stock_available'] else None
+
+    return {
+        'path': json_path,
+        'part_number': part_number_value,
+        # Fallback when the number in the JSON does not match any Part
+        'filename_part_number': os.path.basename(json_path).replace('.json', ''),
+        'fields': fields,
+    }
 
-def process_folder(folder_path):
-    """Process all JSON files in a folder"""
+
+def chunked(items, size):
+    """Yield successive lists of at most size items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def resolve_part_number_ids(part_numbers, batch_size=DEFAULT_BATCH_SIZE):
+    """Map part number -> PartNumber id using IN lookups on the unique index"""
+    part_number_ids = {}
+    for chunk in chunked(sorted(set(part_numbers)), batch_size):
+        part_number_ids.update(PartNumber.objects.filter(number__in=chunk).values_list('number', 'id'))
+    return part_number_ids
+
+
+def load_records(records, batch_size=DEFAULT_BATCH_SIZE, update_existing=False):
+    """
+    Write parsed pricing records with bulk_create/bulk_update.
+
+    Pricing is stored once per canonical part number and shared by every Part
+    instance using it. Numbers that already have pricing are skipped unless
+    update_existing is set, in which case the row is overwritten.
+    """
+    stats = {'created': 0, 'updated': 0, 'skipped': 0, 'not_found': 0}
+
+    part_number_ids = resolve_part_number_ids(
+        [r['part_number'] for r in records] + [r['filename_part_number'] for r in records],
+        batch_size,
+    )
+
+    # Later files win when the same part number appears more than once
+    fields_by_part_number = {}
+    for record in records:
+        part_number_id = part_number_ids.get(record['part_number'])
+        if part_number_id is None:
+            part_number_id = part_number_ids.get(record['filename_part_number'])
+            if part_number_id is None:
+                logger.error(f"Part '{record['part_number']}' (file {record['path']}) not found in database")
+                stats['not_found'] += 1
+                continue
+            logger.info(f"Found part using filename part number '{record['filename_part_number']}'")
+        fields_by_part_number[part_number_id] = record['fields']
+
+    existing = {}
+    for chunk in chunked(list(fields_by_part_number), batch_size):
+        for pricing in PricingData.objects.filter(part_number_id__in=chunk).only('id', 'part_number_id', *PRICING_FIELDS):
+            existing[pricing.part_number_id] = pricing
+
+    to_create = []
+    to_update = []
+    for part_number_id, fields in fields_by_part_number.items():
+        pricing = existing.get(part_number_id)
+        if pricing is None:
+            to_create.append(PricingData(part_number_id=part_number_id, **fields))
+        elif update_existing:
+            for name, value in fields.items():
+                setattr(pricing, name, value)
+            to_update.append(pricing)
+        else:
+            stats['skipped'] += 1
+
+    with transaction.atomic():
+        for chunk in chunked(to_create, batch_size):
+            PricingData.objects.bulk_create(chunk)
+            stats['created'] += len(chunk)
+        for chunk in chunked(to_update, batch_size):
+            PricingData.objects.bulk_update(chunk, PRICING_FIELDS)
+            stats['updated'] += len(chunk)
+        # Descriptions are searchable, so the written numbers are re-indexed
+        index_part_numbers([pricing.part_number_id for pricing in to_create + to_update])
+    if to_create or to_update:
+        # Replacement chains can change anywhere, so the closure is rebuilt whole
+        stats['supersessions'] = supersession.rebuild()['rows']
+
+    return stats
+
+
+def process_json_file(json_path, update_existing=False):
+    """Process a single JSON file and extract pricing data"""
+    logger.info(f"Processing file: {json_path}")
+    record = parse_json_file(json_path)
+    if record is None:
+        return None
+    return load_records([record], update_existing=update_existing)
+
+
+def process_folder(folder_path, batch_size=DEFAULT_BATCH_SIZE, update_existing=False):
+    """Parse all JSON files in a folder, then write their pricing in bulk"""
     if not os.path.exists(folder_path):
         logger.error(f"Folder does not exist: {folder_path}")
         return
@@ -159,7 +209,7 @@ def process_folder(folder_path):
         return
     
     json_files = []
-    for file_name in os.listdir(folder_path):
+    for file_name in sorted(os.listdir(folder_path)):
         if file_name.lower().endswith('.json'):
             json_files.append(os.path.join(folder_path, file_name))
     
@@ -168,31 +218,47 @@ def process_folder(folder_path):
         return
     
     logger.info(f"Found {len(json_files)} JSON files to process")
+    started = time.perf_counter()
     
-    success_count = 0
+    records = []
     error_count = 0
-    
     for json_file in json_files:
-        try:
-            process_json_file(json_file)
-            success_count += 1
-        except Exception as e:
-            logger.error(f"Failed to process {json_file}: {str(e)}")
+        record = parse_json_file(json_file)
+        if record is None:
             error_count += 1
+        else:
+            records.append(record)
+    
+    parsed = time.perf_counter()
+    logger.info(f"Parsed {len(records)} files in {parsed - started:.2f}s ({error_count} unusable)")
     
-    logger.info(f"Processing complete. Success: {success_count}, Errors: {error_count}")
+    stats = load_records(records, batch_size=batch_size, update_existing=update_existing)
+    
+    elapsed = time.perf_counter() - started
+    rows = stats['created'] + stats['updated']
+    logger.info(
+        f"Processing complete. Created: {stats['created']}, Updated: {stats['updated']}, "
+        f"Skipped (existing): {stats['skipped']}, Not found: {stats['not_found']}, Errors: {error_count}"
+    )
+    logger.info(f"Wrote {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.1f} rows/sec)")
+    return stats
 
 def main():
     """Main function to run the pricing data loader"""
-    import sys
+    import argparse
     
-    # Check for command-line argument
-    if len(sys.argv) != 2:
-        print("Usage: python loadprices.py <folder_path>")
-        print("Example: python loadprices.py output_20250701_112614")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description='Load pricing JSON files into PricingData',
+        epilog='Example: python loadprices.py output_20250701_112614',
+    )
+    parser.add_argument('folder_path', help='Folder containing the pricing JSON files')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Rows per bulk insert/update statement (default {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--update-existing', action='store_true',
+                        help='Overwrite pricing for parts that already have it instead of skipping them')
+    args = parser.parse_args()
     
-    folder_path = sys.argv[1]
+    folder_path = args.folder_path
     
     # If it's a relative path, make it absolute based on current working directory
     if not os.path.isabs(folder_path):
@@ -201,11 +267,11 @@ def main():
     logger.info(f"Starting pricing data loading from folder: {folder_path}")
     
     try:
-        process_folder(folder_path)
+        process_folder(folder_path, batch_size=args.batch_size, update_existing=args.update_existing)
         logger.info("Pricing data loading completed successfully")
     except Exception as e:
         logger.error(f"Fatal error during processing: {str(e)}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
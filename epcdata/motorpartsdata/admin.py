@@ -2,8 +2,8 @@ from django.contrib import admin
 from django import forms
 from django_countries.widgets import CountrySelectWidget
 from .models import (
-    SerialNumber, ParentTitle, ChildTitle, Part, PricingData,
-    ShippingAddress, ShippingMethod
+    SerialNumber, ParentTitle, ChildTitle, Part, PartNumber, PriceScrapeJob, PricingData, DiagramSource, SvgBlob,
+    ShippingAddress, ShippingMethod, Supersession
 )
 
 # Custom forms to ensure proper widgets
@@ -41,6 +41,7 @@ class ChildTitleAdmin(admin.ModelAdmin):
     list_display = ['title', 'parent']
     list_filter = ['parent']
     search_fields = ['title']
+    raw_id_fields = ['svg_blob', 'original_svg_blob']
 
 @admin.register(Part)
 class PartAdmin(admin.ModelAdmin):
@@ -49,11 +50,44 @@ class PartAdmin(admin.ModelAdmin):
     search_fields = ['part_number', 'usage_name']
     ordering = ['call_out_order']
 
+@admin.register(PartNumber)
+class PartNumberAdmin(admin.ModelAdmin):
+    list_display = ['number']
+    search_fields = ['number']
+
+@admin.register(PriceScrapeJob)
+class PriceScrapeJobAdmin(admin.ModelAdmin):
+    list_display = ['part_number', 'status', 'priority', 'attempts', 'next_attempt_at', 'claimed_by']
+    list_filter = ['status']
+    search_fields = ['part_number__number']
+    raw_id_fields = ['part_number']
+    ordering = ['-priority']
+
+@admin.register(DiagramSource)
+class DiagramSourceAdmin(admin.ModelAdmin):
+    list_display = ['path', 'serial_number', 'content_hash', 'loaded_at']
+    list_filter = ['serial_number']
+    search_fields = ['path', 'content_hash']
+
+@admin.register(SvgBlob)
+class SvgBlobAdmin(admin.ModelAdmin):
+    list_display = ['hash', 'size', 'created_at']
+    search_fields = ['hash']
+    exclude = ['data']
+
 @admin.register(PricingData)
 class PricingDataAdmin(admin.ModelAdmin):
     list_display = ['part_number', 'description', 'list_price', 'active']
     list_filter = ['active', 'vat_code']
-    search_fields = ['part_number__part_number', 'description']
+    search_fields = ['part_number__number', 'description']
+    raw_id_fields = ['part_number']
+
+@admin.register(Supersession)
+class SupersessionAdmin(admin.ModelAdmin):
+    list_display = ['part_number', 'successor', 'depth', 'is_current']
+    list_filter = ['is_current']
+    search_fields = ['part_number__number', 'successor__number']
+    raw_id_fields = ['part_number', 'successor']
 
 @admin.register(ShippingAddress)
 class ShippingAddressAdmin(admin.ModelAdmin):
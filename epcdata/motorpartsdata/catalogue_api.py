@@ -0,0 +1,150 @@
+"""
+Read-only JSON catalogue: serials, their sections (ParentTitle), diagrams
+(ChildTitle) and parts.
+
+    GET /api/catalogue/serials/
+    GET /api/catalogue/serials/<serial>/sections/
+    GET /api/catalogue/sections/<id>/diagrams/
+    GET /api/catalogue/diagrams/<id>/parts/
+
+Every list is paged by keyset: rows come in id order, ?limit= per page, and
+'next' carries ?after=<last id>, so a page is one index range scan however
+deep it is. ?fields= picks the columns to return and only those are
+selected; a diagram's svg_code is read from the blob store only when named.
+Responses carry an ETag and answer a matching If-None-Match with 304.
+"""
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, set_response_etag
+from django.views.decorators.http import require_http_methods
+
+from .models import ChildTitle, ParentTitle, Part, SerialNumber, SvgBlob
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+# Largest id the database columns hold (bigint); beyond it queries fail instead of matching nothing
+MAX_ID = 2 ** 63 - 1
+
+# Field name -> column, per resource
+SERIAL_FIELDS = {'id': 'id', 'serial': 'serial'}
+SECTION_FIELDS = {'id': 'id', 'title': 'title', 'serial_id': 'serial_number_id'}
+DIAGRAM_FIELDS = {
+    'id': 'id', 'title': 'title', 'section_id': 'parent_id',
+    'svg_hash': 'svg_blob_id', 'svg_url': 'svg_blob_id', 'svg_code': 'svg_blob_id',
+}
+PART_FIELDS = {
+    'id': 'id', 'diagram_id': 'child_title_id', 'call_out_order': 'call_out_order', 'part_number': 'part_number',
+    'usage_name': 'usage_name', 'unit_qty': 'unit_qty', 'lr': 'lr', 'remark': 'remark', 'nn_note': 'nn_note',
+}
+
+# Fields only returned when asked for
+HEAVY_FIELDS = {'svg_code'}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def error(message, status):
+    return JsonResponse({'success': False, 'message': message}, status=status)
+
+
+def selected_fields(request, fields):
+    """Field names from ?fields=, defaulting to all but the heavy ones"""
+    value = request.GET.get('fields')
+    if not value:
+        return [name for name in fields if name not in HEAVY_FIELDS]
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise BadRequest(f"Unknown field(s): {', '.join(unknown)}; choose from {', '.join(fields)}")
+    return names
+
+
+def int_param(request, name, default, minimum, maximum=None, clamp=True):
+    """?name= as an int; above maximum it is clamped, or rejected if clamp is False"""
+    value = request.GET.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+    if number < minimum:
+        raise BadRequest(f"{name} must be at least {minimum}")
+    if maximum is not None and number > maximum:
+        if not clamp:
+            raise BadRequest(f"{name} must be at most {maximum}")
+        return maximum
+    return number
+
+
+def add_svg_fields(items, rows, names):
+    """Fill svg_url and svg_code of diagram items; blobs are read only for svg_code"""
+    codes = {}
+    if 'svg_code' in names:
+        hashes = {row['svg_blob_id'] for row in rows if row['svg_blob_id']}
+        codes = {
+            digest: SvgBlob.decompress(data)
+            for digest, data in SvgBlob.objects.filter(hash__in=hashes).values_list('hash', 'data')
+        }
+    for item, row in zip(items, rows):
+        digest = row['svg_blob_id']
+        if 'svg_url' in names:
+            item['svg_url'] = reverse('svg_file', args=[digest]) if digest else None
+        if 'svg_code' in names:
+            item['svg_code'] = codes.get(digest, '')
+
+
+def page_response(request, queryset, fields, finish=None):
+    """One keyset page of a queryset as JSON, with ETag and conditional GET"""
+    try:
+        names = selected_fields(request, fields)
+        limit = int_param(request, 'limit', DEFAULT_LIMIT, 1, MAX_LIMIT)
+        after = int_param(request, 'after', 0, 0, MAX_ID, clamp=False)
+    except BadRequest as e:
+        return error(str(e), 400)
+
+    columns = {'id'} | {fields[name] for name in names}
+    rows = list(queryset.filter(id__gt=after).order_by('id').values(*columns)[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    items = [{name: row[fields[name]] for name in names} for row in rows]
+    if finish:
+        finish(items, rows, names)
+
+    next_url = None
+    if more:
+        query = request.GET.copy()
+        query['after'] = rows[-1]['id']
+        next_url = f"{request.path}?{query.urlencode()}"
+    response = JsonResponse({'success': True, 'results': items, 'next': next_url})
+    set_response_etag(response)
+    return get_conditional_response(request, etag=response['ETag'], response=response)
+
+
+@require_http_methods(["GET", "HEAD"])
+def serials(request):
+    return page_response(request, SerialNumber.objects.all(), SERIAL_FIELDS)
+
+
+@require_http_methods(["GET", "HEAD"])
+def serial_sections(request, serial):
+    serial_id = SerialNumber.objects.filter(serial=serial).values_list('id', flat=True).first()
+    if serial_id is None:
+        return error('Serial not found', 404)
+    return page_response(request, ParentTitle.objects.filter(serial_number_id=serial_id), SECTION_FIELDS)
+
+
+@require_http_methods(["GET", "HEAD"])
+def section_diagrams(request, section_id):
+    if section_id > MAX_ID or not ParentTitle.objects.filter(id=section_id).exists():
+        return error('Section not found', 404)
+    return page_response(request, ChildTitle.objects.filter(parent_id=section_id), DIAGRAM_FIELDS, add_svg_fields)
+
+
+@require_http_methods(["GET", "HEAD"])
+def diagram_parts(request, diagram_id):
+    if diagram_id > MAX_ID or not ChildTitle.objects.filter(id=diagram_id).exists():
+        return error('Diagram not found', 404)
+    return page_response(request, Part.objects.filter(child_title_id=diagram_id), PART_FIELDS)
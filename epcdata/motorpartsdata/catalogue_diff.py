@@ -0,0 +1,79 @@
+"""
+Part-number differences between serials, computed in SQL on SerialPart.
+
+One grouped query returns each distinct part number used by the compared
+serials with how many of them use it and whether the base serial does, so
+diffing large VINs never loads Part rows into Python.
+"""
+from django.db.models import Count, Exists, F, OuterRef, Q
+
+from .models import PricingData, SerialPart
+
+ADDED = 'added'
+REMOVED = 'removed'
+SHARED = 'shared'
+PARTIAL = 'partial'
+STATUSES = (ADDED, REMOVED, SHARED, PARTIAL)
+
+
+def diff_serials(base, others):
+    """
+    Compare the part numbers of a base serial with one or more other serials.
+
+    Returns rows {'part_number', 'status', 'serials', 'has_pricing'} sorted by
+    status then part number, where status is:
+      added   - used by at least one other serial but not by base
+      removed - used by base but by none of the others
+      shared  - used by base and every other serial
+      partial - used by base and only some of the others (3+ serials only)
+    and serials is how many of the compared serials use the number.
+    """
+    other_ids = [other.pk for other in others if other.pk != base.pk]
+    rows = (
+        SerialPart.objects.filter(serial_number_id__in=[base.pk] + other_ids)
+        .values(
+            number=F('part_number__number'),
+            has_pricing=Exists(PricingData.objects.filter(part_number_id=OuterRef('part_number_id'))),
+        )
+        .annotate(
+            serials=Count('serial_number_id', distinct=True),
+            in_base=Count('serial_number_id', filter=Q(serial_number_id=base.pk), distinct=True),
+        )
+        .order_by()
+    )
+
+    diff = []
+    for row in rows:
+        others_using = row['serials'] - row['in_base']
+        if not row['in_base']:
+            status = ADDED
+        elif not others_using:
+            status = REMOVED
+        elif others_using == len(other_ids):
+            status = SHARED
+        else:
+            status = PARTIAL
+        diff.append({
+            'part_number': row['number'],
+            'status': status,
+            'serials': row['serials'],
+            'has_pricing': row['has_pricing'],
+        })
+    diff.sort(key=lambda row: (STATUSES.index(row['status']), row['part_number']))
+    return diff
+
+
+def summarise(diff):
+    """Count of rows per status"""
+    summary = dict.fromkeys(STATUSES, 0)
+    for row in diff:
+        summary[row['status']] += 1
+    return summary
+
+
+def part_numbers(diff, status, unpriced_only=False):
+    """Part numbers of the rows with a status, optionally only those without pricing"""
+    return [
+        row['part_number'] for row in diff
+        if row['status'] == status and not (unpriced_only and row['has_pricing'])
+    ]
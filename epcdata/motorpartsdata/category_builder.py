@@ -0,0 +1,141 @@
+"""
+Bulk builder for the Serial -> ParentTitle -> ChildTitle category tree.
+
+Treebeard's add_root()/add_child() cost several statements per node (last
+sibling lookup, insert, parent numchild update, plus Oscar's
+ancestors_are_public refresh on post_save), and callers also probed for each
+node by name first. CategoryTreeBuilder loads every Category once into a
+name/path index, matches existing nodes against it, works out materialised
+paths for the missing ones in memory and writes them with one bulk_create per
+depth, plus one bulk_update for existing nodes that gained children.
+"""
+import logging
+
+from oscar.core.loading import get_model
+from treebeard.exceptions import PathOverflow
+
+from . import category_menu
+from .models import ChildTitle, ParentTitle
+
+logger = logging.getLogger(__name__)
+
+Category = get_model('catalogue', 'Category')
+
+INDEX_FIELDS = ('id', 'path', 'depth', 'numchild', 'name', 'slug', 'is_public', 'ancestors_are_public')
+
+
+class CategoryTreeBuilder:
+    """Finds or plans categories against one preloaded index; save() writes the planned ones"""
+
+    def __init__(self):
+        self.by_name = {}
+        self.by_name_slug = {}
+        # Parent path ('' for roots) -> last step used below it
+        self.last_step = {}
+        self.new = []
+        # Saved categories whose numchild grew, by pk
+        self.changed = {}
+        self.created = 0
+        self.existing = 0
+        for category in Category.objects.order_by('path').only(*INDEX_FIELDS):
+            self._index(category)
+            # Ordered by path, so the last sibling seen has the highest step
+            self.last_step[category.path[:-Category.steplen]] = Category._str2int(category.path[-Category.steplen:])
+
+    def _index(self, category):
+        # Lowest path wins, as Category.objects.filter(...).first() did
+        self.by_name.setdefault(category.name, category)
+        self.by_name_slug.setdefault((category.name, category.slug), category)
+
+    def root(self, name, slug, description=''):
+        """The first category with this name (at any depth), or a new root"""
+        category = self.by_name.get(name)
+        if category is not None:
+            self.existing += 1
+            return category
+        return self._add('', name=name, slug=slug, description=description, ancestors_are_public=True)
+
+    def child(self, parent, name, slug, description=''):
+        """The first category with this name and slug, or a new last child of parent"""
+        category = self.by_name_slug.get((name, slug))
+        if category is not None:
+            self.existing += 1
+            return category
+        if parent.pk is not None:
+            self.changed[parent.pk] = parent
+        parent.numchild += 1
+        return self._add(
+            parent.path, name=name, slug=slug, description=description,
+            ancestors_are_public=parent.is_public and parent.ancestors_are_public,
+        )
+
+    def _add(self, parent_path, **fields):
+        step = self.last_step.get(parent_path, 0) + 1
+        key = Category._int2str(step)
+        if len(key) > Category.steplen:
+            raise PathOverflow(f"Path Overflow from: '{parent_path}'")
+        self.last_step[parent_path] = step
+        path = parent_path + Category.alphabet[0] * (Category.steplen - len(key)) + key
+        category = Category(path=path, depth=len(path) // Category.steplen, numchild=0, **fields)
+        self.new.append(category)
+        self._index(category)
+        self.created += 1
+        return category
+
+    def save(self):
+        """Insert the planned categories, parents first, and refresh the menu"""
+        for depth in sorted({category.depth for category in self.new}):
+            Category.objects.bulk_create([category for category in self.new if category.depth == depth])
+        if self.changed:
+            Category.objects.bulk_update(list(self.changed.values()), ['numchild'])
+        if self.new or self.changed:
+            # bulk_create/bulk_update send no signals
+            category_menu.invalidate()
+        self.new = []
+        self.changed = {}
+
+
+def serial_root(builder, serial_number):
+    return builder.root(
+        name=f"Serial {serial_number.serial}",
+        slug=f"serial-{serial_number.serial}",
+        description=f"Parts for serial number {serial_number.serial}",
+    )
+
+
+def build_serial_categories(builder, serial_numbers):
+    """
+    Plan the category tree of each serial, returning
+    {serial id: (serial category, category_map)} where category_map is keyed by
+    ParentTitle id and "child_<ChildTitle id>" as import_to_oscar expects.
+    Call builder.save() to write the new categories.
+    """
+    serial_ids = [serial_number.id for serial_number in serial_numbers]
+    parents = {}
+    for parent_id, serial_id, title in (
+        ParentTitle.objects.filter(serial_number_id__in=serial_ids).order_by('id')
+        .values_list('id', 'serial_number_id', 'title')
+    ):
+        parents.setdefault(serial_id, []).append((parent_id, title))
+    children = {}
+    for child_id, parent_id, title in (
+        ChildTitle.objects.filter(parent__serial_number_id__in=serial_ids).order_by('id')
+        .values_list('id', 'parent_id', 'title')
+    ):
+        children.setdefault(parent_id, []).append((child_id, title))
+
+    trees = {}
+    for serial_number in serial_numbers:
+        serial_category = serial_root(builder, serial_number)
+        category_map = {}
+        for idx, (parent_id, parent_title) in enumerate(parents.get(serial_number.id, ()), 1):
+            parent_slug = f"serial-{serial_number.serial}-parent-{idx}"
+            parent_category = category_map[parent_id] = builder.child(
+                serial_category, parent_title, parent_slug, f"Parent category: {parent_title}",
+            )
+            for child_idx, (child_id, child_title) in enumerate(children.get(parent_id, ()), 1):
+                category_map[f"child_{child_id}"] = builder.child(
+                    parent_category, child_title, f"{parent_slug}-child-{child_idx}", f"Child category: {child_title}",
+                )
+        trees[serial_number.id] = (serial_category, category_map)
+    return trees
@@ -0,0 +1,94 @@
+"""
+Set-based product -> category linking.
+
+Each product is linked to the Serial, ParentTitle and ChildTitle categories
+of its part (the lowest Part id with that part number, as in diagrams.py).
+Products are matched by UPC, with or without import_to_oscar's "EPC-"
+prefix, falling back to the normalised part number (PartNumber.normalized)
+for UPCs typed with other case or separators. Categories are looked up in the tree category_builder lays out,
+against one preloaded name/slug index; categories that don't exist yet are
+reported, not created. The wanted links are diffed against the existing
+ProductCategory rows and only the missing ones are inserted.
+"""
+import logging
+
+from oscar.core.loading import get_model
+
+from . import category_menu
+from .category_builder import CategoryTreeBuilder, build_serial_categories
+from .models import Part, PartNumber, SerialNumber
+from .part_lookup import part_number_for_upc
+
+logger = logging.getLogger(__name__)
+
+Product = get_model('catalogue', 'Product')
+ProductCategory = get_model('catalogue', 'ProductCategory')
+
+BATCH_SIZE = 1000
+
+
+def category_link_diff():
+    """
+    Work out the ProductCategory rows that should exist, returning a dict with
+    'missing' ({(product id, category id)}), 'existing' (count of wanted links
+    already present), 'unmatched' (products without a part) and
+    'missing_categories' (wanted categories not created yet)
+    """
+    # Part number (and normalised number) -> (ParentTitle id, ChildTitle id) of its lowest Part id
+    titles_for_part = {}
+    titles_for_key = {}
+    for part_number, key, parent_id, child_id in Part.objects.order_by('id').values_list(
+        'part_number', 'canonical__normalized', 'child_title__parent_id', 'child_title_id',
+    ):
+        titles_for_part.setdefault(part_number, (parent_id, child_id))
+        titles_for_key.setdefault(key, (parent_id, child_id))
+
+    # Title ids -> category ids (None where the category isn't created yet)
+    builder = CategoryTreeBuilder()
+    serial_parent_categories = {}
+    child_categories = {}
+    for serial_category, category_map in build_serial_categories(builder, list(SerialNumber.objects.all())).values():
+        for key, category in category_map.items():
+            if isinstance(key, int):
+                serial_parent_categories[key] = (serial_category.pk, category.pk)
+            else:
+                child_categories[int(key[len('child_'):])] = category.pk
+
+    wanted = set()
+    unmatched = 0
+    missing_categories = 0
+    for product_id, upc in Product.objects.exclude(upc__isnull=True).order_by().values_list('id', 'upc'):
+        part_number = part_number_for_upc(upc)
+        titles = titles_for_part.get(part_number) or titles_for_key.get(PartNumber.normalize(part_number))
+        if titles is None:
+            unmatched += 1
+            continue
+        parent_id, child_id = titles
+        for category_id in serial_parent_categories[parent_id] + (child_categories[child_id],):
+            if category_id is None:
+                missing_categories += 1
+            else:
+                wanted.add((product_id, category_id))
+
+    existing = set(ProductCategory.objects.order_by().values_list('product_id', 'category_id'))
+    return {
+        'missing': wanted - existing,
+        'existing': len(wanted & existing),
+        'unmatched': unmatched,
+        'missing_categories': missing_categories,
+    }
+
+
+def link_products_to_categories(dry_run=False):
+    """Insert the missing links (unless dry_run), returning category_link_diff()'s report"""
+    diff = category_link_diff()
+    if not dry_run and diff['missing']:
+        ProductCategory.objects.bulk_create(
+            [ProductCategory(product_id=p, category_id=c) for p, c in sorted(diff['missing'])],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        # bulk_create sends no signals
+        category_menu.invalidate()
+        logger.info(f"Linked {len(diff['missing'])} product-category relationships")
+    return diff
@@ -0,0 +1,93 @@
+"""
+Cached category tree for the storefront menus.
+
+The header mega-menu and the browse sidebar walk up to three levels of
+Category on every page. Treebeard's get_children() is a query per node and
+prefetch_related does not apply to MP_Node, so instead the whole tree is built
+from two queries into MenuCategory nodes, with display names precomputed,
+and cached until a Category or ProductCategory is saved or deleted (see
+signals.py). Bulk loaders that bypass signals call invalidate() themselves.
+"""
+from django.core.cache import cache
+from django.db.models import Count
+from django.urls import reverse
+from oscar.core.loading import get_model
+
+from .category_names import clean_category_name, beautify_category_name
+
+Category = get_model('catalogue', 'Category')
+ProductCategory = get_model('catalogue', 'ProductCategory')
+
+CACHE_KEY = 'motorpartsdata:category_menu'
+# Also bounds staleness in other processes when the cache is per-process (LocMem)
+CACHE_TIMEOUT = 60 * 15
+
+
+class MenuCategory:
+    """The parts of a Category the menus render, with the same template API"""
+    __slots__ = ('pk', 'name', 'clean_name', 'display_name', 'slug', 'depth', 'url', 'num_products', 'children')
+
+    def __init__(self, pk, name, slug, depth, url, num_products=0):
+        self.pk = pk
+        self.name = name
+        # Precomputed |clean_category_name and |beautify_category_name
+        self.clean_name = clean_category_name(name)
+        self.display_name = beautify_category_name(name)
+        self.slug = slug
+        self.depth = depth
+        self.url = url
+        self.num_products = num_products
+        self.children = []
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f'<MenuCategory {self.pk}: {self.name}>'
+
+    @property
+    def id(self):
+        return self.pk
+
+    def get_children(self):
+        return self.children
+
+    def get_num_products(self):
+        return self.num_products
+
+    def get_absolute_url(self):
+        return self.url
+
+
+def build_category_tree():
+    """Root MenuCategory nodes in tree order, each with its descendants attached"""
+    counts = dict(
+        ProductCategory.objects.order_by().values_list('category_id').annotate(count=Count('id'))
+    )
+    roots = []
+    by_path = {}
+    rows = Category.objects.order_by('path').values_list('pk', 'name', 'slug', 'depth', 'path')
+    for pk, name, slug, depth, path in rows:
+        url = reverse('catalogue:category', kwargs={'category_slug': slug, 'pk': pk})
+        node = MenuCategory(pk, name, slug, depth, url, counts.get(pk, 0))
+        by_path[path] = node
+        if depth == 1:
+            roots.append(node)
+            continue
+        parent = by_path.get(path[:-Category.steplen])
+        if parent is not None:  # a broken tree (missing parent) hides the node, as get_children() would
+            parent.children.append(node)
+    return roots
+
+
+def category_tree():
+    """The cached tree, rebuilt on a miss"""
+    tree = cache.get(CACHE_KEY)
+    if tree is None:
+        tree = build_category_tree()
+        cache.set(CACHE_KEY, tree, CACHE_TIMEOUT)
+    return tree
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,123 @@
+"""
+Display names for catalogue categories.
+
+Category names are created from EPC titles ("Serial LSH14C4C5NA129710",
+"JE140A001 - Seat Belts") and are cleaned up for the storefront menus. The
+regexes are compiled once and results are memoised, since the header renders
+hundreds of names per page. category_menu stores the results on its cached
+nodes, so menus normally read them as plain attributes.
+"""
+import re
+from functools import lru_cache
+
+# Serial codes like JE140A001, LSH14C4C5NA129710, etc.
+SERIAL_CODE = re.compile(r'[A-Z]{2,}\d+[A-Z]*\d*')
+SERIAL_PREFIX = re.compile(r'Serial\s+')
+WHITESPACE = re.compile(r'\s+')
+
+# Common terms mapped to better names; the first entry found in a name wins
+REPLACEMENTS = {
+    'sealant & body attachment': 'Sealant & Body Parts',
+    'rear lamp': 'Rear Lights',
+    'front lamp': 'Front Lights',
+    'engine mount': 'Engine Mounting',
+    'brake pad': 'Brake Pads',
+    'brake disc': 'Brake Discs',
+    'suspension arm': 'Suspension Arms',
+    'fuel pump': 'Fuel Pumps',
+    'air filter': 'Air Filters',
+    'oil filter': 'Oil Filters',
+    'spark plug': 'Spark Plugs',
+    'timing belt': 'Timing Belts',
+    'water pump': 'Water Pumps',
+    'radiator': 'Radiators',
+    'exhaust': 'Exhaust System',
+    'clutch': 'Clutch System',
+    'transmission': 'Transmission Parts',
+    'steering': 'Steering Components',
+    'wheel bearing': 'Wheel Bearings',
+    'cv joint': 'CV Joints',
+    'shock absorber': 'Shock Absorbers',
+    'strut': 'Struts',
+    'spring': 'Springs',
+    'bushing': 'Bushings',
+    'sensor': 'Sensors',
+    'switch': 'Switches',
+    'relay': 'Relays',
+    'fuse': 'Fuses',
+    'wire': 'Wiring',
+    'cable': 'Cables',
+    'hose': 'Hoses',
+    'gasket': 'Gaskets',
+    'seal': 'Seals',
+    'bearing': 'Bearings',
+    'belt': 'Belts',
+    'chain': 'Chains',
+    'pulley': 'Pulleys',
+    'tensioner': 'Tensioners',
+    'alternator': 'Alternators',
+    'starter': 'Starters',
+    'battery': 'Batteries',
+    'ignition': 'Ignition System',
+    'cooling': 'Cooling System',
+    'heating': 'Heating System',
+    'air conditioning': 'Air Conditioning',
+    'windshield': 'Windshield',
+    'mirror': 'Mirrors',
+    'door': 'Door Parts',
+    'window': 'Window Parts',
+    'seat': 'Seats',
+    'dashboard': 'Dashboard',
+    'console': 'Console',
+    'trim': 'Interior Trim',
+    'carpet': 'Carpets',
+    'mat': 'Floor Mats',
+    'bumper': 'Bumpers',
+    'fender': 'Fenders',
+    'hood': 'Hoods',
+    'trunk': 'Trunk Parts',
+    'roof': 'Roof Parts',
+    'spoiler': 'Spoilers',
+    'grille': 'Grilles',
+    'molding': 'Moldings',
+    'emblem': 'Emblems',
+    'badge': 'Badges',
+}
+PRIORITY = {term: index for index, term in enumerate(REPLACEMENTS)}
+# A lookahead finds every position a term starts at, overlapping ones included;
+# at each position the alternation yields that position's highest-priority term
+REPLACEMENT_TERMS = re.compile('(?=(' + '|'.join(re.escape(term) for term in REPLACEMENTS) + '))')
+
+CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _clean(value):
+    cleaned = SERIAL_CODE.sub('', value)
+    cleaned = SERIAL_PREFIX.sub('', cleaned)
+    return WHITESPACE.sub(' ', cleaned).strip()
+
+
+def clean_category_name(value):
+    """Category name without serial codes or the "Serial" prefix (the name itself if nothing is left)"""
+    if not value:
+        return value
+    return _clean(str(value)) or value
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _beautify(value):
+    cleaned = _clean(value) or value
+    terms = [match.group(1) for match in REPLACEMENT_TERMS.finditer(cleaned.lower())]
+    if not terms:
+        return cleaned.title()
+    replacement = REPLACEMENTS[min(terms, key=PRIORITY.__getitem__)]
+    # A replacement identical to the cleaned name is title-cased like an unmatched one
+    return replacement.title() if replacement == cleaned else replacement
+
+
+def beautify_category_name(value):
+    """Cleaned category name mapped to a friendlier term, or title-cased"""
+    if not value:
+        return value
+    return _beautify(str(value))
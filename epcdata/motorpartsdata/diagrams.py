@@ -0,0 +1,119 @@
+"""
+Cached UPC -> ChildTitle SVG lookups for product templates.
+
+Products are matched to a Part by UPC: the part number itself or
+import_to_oscar's "EPC-<part number>", compared exactly or normalised (see
+PartNumber.normalize). When a part number appears on several diagrams
+(or VINs) the lowest Part id wins, so the answer is stable instead of
+raising MultipleObjectsReturned.
+
+Both the UPC -> ChildTitle mapping and the SVG bodies are cached under a
+global version number. Any ChildTitle or Part save/delete (see signals.py)
+and every ingest run bump the version, which retires all entries at once.
+"""
+from django.core.cache import cache
+
+from .models import ChildTitle, Part, PartNumber, SvgBlob
+from .part_lookup import part_number_for_upc
+
+CACHE_PREFIX = 'motorpartsdata:svg'
+VERSION_KEY = f'{CACHE_PREFIX}:version'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Cached in place of a ChildTitle id for UPCs with no matching part
+NO_DIAGRAM = 0
+
+# Attribute used to memoise the lookup on product instances for one render
+PRODUCT_ATTR = '_epc_diagram'
+
+
+def cache_version():
+    return cache.get_or_set(VERSION_KEY, 1, None)
+
+
+def invalidate():
+    """Retire every cached mapping and SVG"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+def _upc_key(version, upc):
+    return f'{CACHE_PREFIX}:{version}:upc:{upc}'
+
+
+def _child_key(version, child_id):
+    return f'{CACHE_PREFIX}:{version}:child:{child_id}'
+
+
+def child_title_ids_for_upcs(upcs):
+    """Map each UPC to the ChildTitle id of its first Part (or NO_DIAGRAM), one query for all misses"""
+    version = cache_version()
+    upcs = {upc for upc in upcs if upc}
+    keys = {_upc_key(version, upc): upc for upc in upcs}
+    found = {keys[key]: child_id for key, child_id in cache.get_many(list(keys)).items()}
+
+    missing = upcs - set(found)
+    if missing:
+        loaded = dict.fromkeys(missing, NO_DIAGRAM)
+        numbers = {upc: part_number_for_upc(upc) for upc in missing}
+        rows = (
+            Part.objects.filter(canonical__normalized__in={PartNumber.normalize(number) for number in numbers.values()})
+            .order_by('-id')
+            .values_list('canonical__number', 'canonical__normalized', 'child_title_id')
+        )
+        # Descending ids so the lowest id is written last and wins
+        exact, normalised = {}, {}
+        for number, key, child_id in rows:
+            exact[number] = child_id
+            normalised[key] = child_id
+        for upc, number in numbers.items():
+            child_id = exact.get(number) or normalised.get(PartNumber.normalize(number))
+            if child_id:
+                loaded[upc] = child_id
+        cache.set_many({_upc_key(version, upc): child_id for upc, child_id in loaded.items()}, CACHE_TIMEOUT)
+        found.update(loaded)
+    return found
+
+
+def diagrams_for_child_titles(child_ids):
+    """Map ChildTitle id -> {'title', 'hash', 'svg_code'}, one query for all cache misses"""
+    version = cache_version()
+    child_ids = {child_id for child_id in child_ids if child_id}
+    keys = {_child_key(version, child_id): child_id for child_id in child_ids}
+    found = {keys[key]: diagram for key, diagram in cache.get_many(list(keys)).items()}
+
+    missing = child_ids - set(found)
+    if missing:
+        rows = ChildTitle.objects.filter(id__in=missing).values_list('id', 'title', 'svg_blob_id', 'svg_blob__data')
+        loaded = {
+            child_id: {'title': title, 'hash': digest, 'svg_code': SvgBlob.decompress(data) if data else ''}
+            for child_id, title, digest, data in rows
+        }
+        cache.set_many({_child_key(version, child_id): diagram for child_id, diagram in loaded.items()}, CACHE_TIMEOUT)
+        found.update(loaded)
+    return found
+
+
+def diagrams_for_upcs(upcs):
+    """Map UPC -> {'title', 'hash', 'svg_code'} or None, using at most two queries in total"""
+    child_ids = child_title_ids_for_upcs(upcs)
+    diagrams = diagrams_for_child_titles(child_ids.values())
+    return {upc: diagrams.get(child_id) for upc, child_id in child_ids.items()}
+
+
+def prefetch_product_diagrams(products):
+    """Resolve diagrams for a whole product list and memoise them on each product"""
+    products = [product for product in products if not hasattr(product, PRODUCT_ATTR)]
+    diagrams = diagrams_for_upcs(product.upc for product in products)
+    for product in products:
+        setattr(product, PRODUCT_ATTR, diagrams.get(product.upc))
+    return products
+
+
+def product_diagram(product):
+    """Diagram for one product, served from the memo or cache when possible"""
+    if not hasattr(product, PRODUCT_ATTR):
+        prefetch_product_diagrams([product])
+    return getattr(product, PRODUCT_ATTR)
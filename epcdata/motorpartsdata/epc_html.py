@@ -0,0 +1,130 @@
+"""
+Parser for saved EPC diagram pages (<serial>/<section>/<diagram>.html).
+
+This module deliberately has no Django imports so it can run inside worker
+processes of the ingest pool without setting up the ORM.
+"""
+import os
+
+from bs4 import BeautifulSoup
+
+from .svg_optimize import optimize_svg
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:  # pragma: no cover - lxml is in requirements.txt
+    HTML_PARSER = 'html.parser'
+
+
+def parse_extra_info(soup):
+    """Orientation and remark columns from the right-hand parts table"""
+    extra = []
+    container = soup.find('div', class_='condition-entity')
+    if not container:
+        return extra
+    right_div = container.find('div', class_='parts-table-tbody parts-table-tbody-dflz')
+    if not right_div:
+        return extra
+
+    right_rows = right_div.find_all('div', class_='parts-item')
+    filtered_items = [item for item in right_rows if 'dn' not in item.get('class', [])]
+    for item in filtered_items:
+        first_column = item.find(lambda tag: tag.name == "span" and tag.get("class") == ["column"])
+        orientation = first_column.text.strip() if first_column else "N/A"
+
+        note_column = item.select_one('.text-column-note span')
+        remark = note_column.text.strip() if note_column else "N/A"
+
+        extra.append({
+            'orientation': orientation,
+            'remark': remark
+        })
+    return extra
+
+
+def parse_parts(soup, extra):
+    """
+    Part rows of a diagram, in page order.
+
+    Each row still carries the raw callout text; rows missing a callout, part
+    number or description are dropped, as the original loader did.
+    """
+    parts_items = soup.find_all(lambda tag: tag.name == "div" and
+                                "parts-item" in tag.get("class", []) and
+                                tag.has_attr("data-callout"))
+
+    filtered_items = [item for item in parts_items if 'dn' not in item.get('class', [])]
+    parts = []
+    for item in filtered_items:
+        count = len(parts)
+        # Get orientation and notes from extra if available
+        orientation = extra[count]['orientation'] if count < len(extra) else "N/A"
+        notes = extra[count]['remark'] if count < len(extra) else "N/A"
+
+        order_number_elem = item.select_one('.column.ordernumber')
+        order_number = order_number_elem.text.strip() if order_number_elem else "N/A"
+
+        part_number_elem = item.select_one('.part-number a.text-link')
+        part_number = part_number_elem.text.strip() if part_number_elem else "N/A"
+
+        description_elem = item.select_one('.column.describe')
+        description = description_elem.text.strip() if description_elem else "N/A"
+
+        quantity_elem = item.select_one('.column.quantity')
+        quantity = quantity_elem.text.strip() if quantity_elem else "1"
+
+        # Skip this item if any required field is "N/A"
+        if "N/A" in [order_number, part_number, description]:
+            continue
+
+        parts.append({
+            "call_out_order": int(order_number) if order_number.isdigit() else count + 1,
+            "part_number": part_number,
+            "usage_name": description,
+            "unit_qty": quantity,
+            "lr": orientation,
+            "remark": notes,
+            "nn_note": "",
+        })
+    return parts
+
+
+def parse_diagram_html(html, default_title='', parser=HTML_PARSER):
+    """Parse diagram page markup into {'title', 'svg_code', 'parts'}"""
+    soup = BeautifulSoup(html, parser)
+
+    # Extract the title from legend-title
+    legend_title = soup.find('span', id='legend-title')
+    title = legend_title.text.strip() if legend_title else default_title
+
+    svg_element = soup.find('svg', attrs={"xmlns": "http://www.w3.org/2000/svg"})
+    svg_code = str(svg_element) if svg_element else "<svg></svg>"
+
+    return {
+        'title': title,
+        'svg_code': svg_code,
+        'parts': parse_parts(soup, parse_extra_info(soup)),
+    }
+
+
+def parse_diagram_file(html_path, parser=HTML_PARSER, optimize=False):
+    """
+    Parse one diagram file. Safe to run in a worker process.
+
+    Returns the parsed diagram with its 'path', or a dict with an 'error'
+    message if the file could not be read or parsed. With optimize=True the
+    SVG is passed through svg_optimize and the markup as captured is kept in
+    'original_svg_code'.
+    """
+    try:
+        with open(html_path, 'r', encoding='utf-8') as file:
+            html = file.read()
+        diagram = parse_diagram_html(html, os.path.basename(html_path).replace('.html', ''), parser)
+        if optimize:
+            diagram['original_svg_code'] = diagram['svg_code']
+            diagram['svg_code'] = optimize_svg(diagram['svg_code'])
+    except Exception as e:
+        return {'path': html_path, 'error': str(e)}
+    diagram['path'] = html_path
+    return diagram
@@ -0,0 +1,202 @@
+"""
+Fitment: which serials (VINs) a part number fits.
+
+Fitment holds one row per part number with the ids of the serials whose
+diagrams use it, derived from SerialPart. Each id set is stored the way
+roaring bitmaps store a container: a sorted array of 32-bit ids while the
+set is sparse, a bitmap over serial ids once that is smaller. A fitment
+check is then a bisect or a single bit test on bytes already in the cache,
+instead of a Part -> ChildTitle -> ParentTitle -> SerialNumber join.
+
+Migration 0017 fills Fitment from SerialPart. Lookups are cached under a
+global version number, as in diagrams.py. Writes go through
+update_part_numbers() (called by ingest and refresh_serial_parts) or
+rebuild(), which bump the version.
+"""
+import logging
+import sys
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Fitment, SerialNumber, SerialPart
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+CACHE_PREFIX = 'motorpartsdata:fitment'
+VERSION_KEY = f'{CACHE_PREFIX}:version'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# First byte of an encoded SerialSet
+ARRAY = b'a'
+BITMAP = b'b'
+
+# Cached for part numbers with no Fitment row and for unknown serials
+NOT_FOUND = b''
+NO_SERIAL = 0
+
+
+def _ids_array(body):
+    ids = array('I')
+    ids.frombytes(body)
+    if sys.byteorder == 'big':
+        ids.byteswap()
+    return ids
+
+
+class SerialSet:
+    """A set of serial ids encoded as bytes: a sorted id array or a bitmap, whichever is smaller"""
+
+    def __init__(self, data=ARRAY):
+        self.data = bytes(data)
+        self._ids = None
+
+    @classmethod
+    def of(cls, serial_ids):
+        unique = sorted(set(serial_ids))
+        ids = array('I', unique)
+        if sys.byteorder == 'big':
+            ids.byteswap()
+        encoded = ARRAY + ids.tobytes()
+        if unique:
+            bitmap = bytearray((unique[-1] >> 3) + 1)
+            for serial_id in unique:
+                bitmap[serial_id >> 3] |= 1 << (serial_id & 7)
+            encoded = min(encoded, BITMAP + bytes(bitmap), key=len)
+        return cls(encoded)
+
+    def _array(self):
+        if self._ids is None:
+            self._ids = _ids_array(self.data[1:])
+        return self._ids
+
+    def __contains__(self, serial_id):
+        if self.data[:1] == BITMAP:
+            index = (serial_id >> 3) + 1
+            return 0 < index < len(self.data) and bool(self.data[index] >> (serial_id & 7) & 1)
+        ids = self._array()
+        position = bisect_left(ids, serial_id)
+        return position < len(ids) and ids[position] == serial_id
+
+    def __iter__(self):
+        if self.data[:1] == BITMAP:
+            for index, byte in enumerate(self.data[1:]):
+                if byte:
+                    for bit in range(8):
+                        if byte >> bit & 1:
+                            yield index * 8 + bit
+        else:
+            yield from self._array()
+
+    def __len__(self):
+        if self.data[:1] == BITMAP:
+            return sum(bin(byte).count('1') for byte in self.data[1:])
+        return len(self.data[1:]) // 4
+
+
+def cache_version():
+    return cache.get_or_set(VERSION_KEY, 1, None)
+
+
+def invalidate():
+    """Retire every cached fitment lookup"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+def _rows(serials_by_number):
+    return [
+        Fitment(part_number_id=part_number_id, serials=SerialSet.of(serial_ids).data, serial_count=len(serial_ids))
+        for part_number_id, serial_ids in serials_by_number.items()
+    ]
+
+
+def update_part_numbers(part_number_ids):
+    """Recompute the Fitment rows of the given PartNumber ids from SerialPart; returns rows written"""
+    part_number_ids = sorted(set(part_number_ids))
+    written = 0
+    with transaction.atomic():
+        for start in range(0, len(part_number_ids), BATCH_SIZE):
+            chunk = part_number_ids[start:start + BATCH_SIZE]
+            serials_by_number = defaultdict(list)
+            for part_number_id, serial_id in SerialPart.objects.filter(part_number_id__in=chunk).values_list(
+                'part_number_id', 'serial_number_id',
+            ).distinct():
+                serials_by_number[part_number_id].append(serial_id)
+            Fitment.objects.filter(part_number_id__in=chunk).delete()
+            Fitment.objects.bulk_create(_rows(serials_by_number))
+            written += len(serials_by_number)
+    if part_number_ids:
+        invalidate()
+    return written
+
+
+def rebuild():
+    """Rebuild every Fitment row from SerialPart; returns {'part_numbers', 'serials'}"""
+    serials = set()
+    written = 0
+    with transaction.atomic():
+        Fitment.objects.all().delete()
+        serials_by_number = defaultdict(list)
+        for part_number_id, serial_id in SerialPart.objects.order_by('part_number_id').values_list(
+            'part_number_id', 'serial_number_id',
+        ).distinct().iterator(chunk_size=10000):
+            if part_number_id not in serials_by_number and len(serials_by_number) >= BATCH_SIZE:
+                Fitment.objects.bulk_create(_rows(serials_by_number))
+                written += len(serials_by_number)
+                serials_by_number = defaultdict(list)
+            serials_by_number[part_number_id].append(serial_id)
+            serials.add(serial_id)
+        Fitment.objects.bulk_create(_rows(serials_by_number))
+        written += len(serials_by_number)
+    invalidate()
+    logger.info(f"Fitment rebuilt: {written} part numbers across {len(serials)} serials")
+    return {'part_numbers': written, 'serials': len(serials)}
+
+
+def serial_set(number):
+    """SerialSet of the serials a part number fits, or None if it has no fitment"""
+    key = f'{CACHE_PREFIX}:{cache_version()}:number:{number}'
+    data = cache.get(key)
+    if data is None:
+        data = Fitment.objects.filter(part_number__number=number).values_list('serials', flat=True).first()
+        data = NOT_FOUND if data is None else bytes(data)
+        cache.set(key, data, CACHE_TIMEOUT)
+    return SerialSet(data) if data else None
+
+
+def serial_id(serial):
+    """SerialNumber id of a serial, or None if unknown"""
+    key = f'{CACHE_PREFIX}:{cache_version()}:serial:{serial}'
+    found = cache.get(key)
+    if found is None:
+        found = SerialNumber.objects.filter(serial=serial).values_list('id', flat=True).first() or NO_SERIAL
+        cache.set(key, found, CACHE_TIMEOUT)
+    return found or None
+
+
+def fits(number, serial):
+    """Whether a part number is used on the diagrams of a serial"""
+    found = serial_id(serial)
+    serials = serial_set(number) if found else None
+    return serials is not None and found in serials
+
+
+def compatible_serials(number):
+    """Sorted serials a part number fits"""
+    key = f'{CACHE_PREFIX}:{cache_version()}:serials:{number}'
+    found = cache.get(key)
+    if found is None:
+        ids = list(serial_set(number) or [])
+        found = []
+        for start in range(0, len(ids), BATCH_SIZE):
+            found += SerialNumber.objects.filter(id__in=ids[start:start + BATCH_SIZE]).values_list('serial', flat=True)
+        found.sort()
+        cache.set(key, found, CACHE_TIMEOUT)
+    return found
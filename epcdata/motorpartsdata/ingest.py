@@ -0,0 +1,317 @@
+"""
+Bulk ingestion of saved EPC diagram folders (<serial>/<section>/<diagram>.html).
+
+HTML parsing (motorpartsdata.epc_html) runs in a process pool and the parsed
+diagrams are streamed, in directory order, to a single writer in the calling
+process. The writer inserts each section's ChildTitles and Parts with one
+bulk_create per model inside a transaction, and re-indexes the section's
+part numbers for search (motorpartsdata.part_search).
+
+Every loaded file is recorded in DiagramSource with its content hash, so a
+re-run only parses and rewrites diagrams whose HTML changed.
+
+SVGs are minified by motorpartsdata.svg_optimize in the workers unless
+optimize=False; keep_original=True also stores the SVG as captured.
+"""
+import functools
+import hashlib
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .diagrams import invalidate as invalidate_diagram_cache
+from .epc_html import parse_diagram_file
+from .fitment import update_part_numbers as update_fitment
+from .models import SerialNumber, ParentTitle, ChildTitle, Part, PartNumber, DiagramSource, SerialPart, SvgBlob
+from .part_search import index_part_numbers
+from .serial_parts import rows_for_parts
+
+logger = logging.getLogger(__name__)
+
+# Fields the DRF serializers used to insist on being non-blank
+CHILD_REQUIRED = ('title',)
+PART_REQUIRED = ('part_number', 'usage_name', 'unit_qty')
+
+
+def invalid_fields(model, values, required=()):
+    """Names of values that are blank-but-required or longer than their column"""
+    errors = []
+    for name, value in values.items():
+        if name in required and not value:
+            errors.append(name)
+            continue
+        max_length = model._meta.get_field(name).max_length
+        if max_length and value and len(str(value)) > max_length:
+            errors.append(name)
+    return errors
+
+
+def parent_title_for(dirpath):
+    """ParentTitle.title for a section directory"""
+    # Replace underscores and handle other formatting if needed
+    return os.path.basename(dirpath).replace('_', ' ').title()
+
+
+def find_sections(root_dir):
+    """[(parent_name, [html paths])] for every directory below root_dir holding HTML files"""
+    sections = []
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames.sort()
+        # Skip the root directory itself
+        if os.path.relpath(dirpath, root_dir) == '.':
+            continue
+        html_files = sorted(f for f in filenames if f.lower().endswith('.html'))
+        if html_files:
+            sections.append((parent_title_for(dirpath), [os.path.join(dirpath, f) for f in html_files]))
+    return sections
+
+
+def get_or_create_serial(serial_name):
+    serial, created = SerialNumber.objects.get_or_create(serial=serial_name)
+    if created:
+        logger.info(f"Created serial number: {serial_name}")
+    else:
+        logger.info(f"Serial number {serial_name} already exists, using it")
+    return serial
+
+
+def get_or_create_parent(serial, title):
+    parent = ParentTitle.objects.filter(title=title, serial_number=serial).first()
+    if parent:
+        logger.info(f"Parent title {title} already exists, using it")
+        return parent
+    logger.info(f"Created parent title: {title}")
+    return ParentTitle.objects.create(title=title, serial_number=serial)
+
+
+def iter_parsed(paths, workers=None, chunksize=4, optimize=True):
+    """
+    Yield parsed diagrams for paths in order.
+
+    workers=1 parses in-process; otherwise a process pool of that many workers
+    (default: one per CPU) parses ahead while the caller consumes results.
+    """
+    parse = functools.partial(parse_diagram_file, optimize=optimize)
+    if workers == 1 or len(paths) <= 1:
+        for path in paths:
+            yield parse(path)
+        return
+    # Forked workers must not inherit (and later close) the writer's DB socket. The
+    # workers only parse HTML, so a caller's open transaction is left alone rather
+    # than closed under it.
+    if not any(conn.in_atomic_block for conn in connections.all()):
+        connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(parse, paths, chunksize=chunksize)
+
+
+def original_svg(diagram):
+    """The SVG as captured, or None if the optimiser did not run or left it unchanged"""
+    original = diagram.get('original_svg_code')
+    return original if original != diagram['svg_code'] else None
+
+
+def write_section(parent, diagrams, replace_ids=(), keep_original=False):
+    """
+    Insert the ChildTitles and Parts of one section.
+
+    ChildTitles in replace_ids (and their Parts) are deleted first, in the same
+    transaction. Returns ([(diagram, child_title)], parts_created); diagrams or
+    parts that would not fit the model columns are logged and skipped.
+    keep_original also links each ChildTitle to the SVG as captured when the
+    optimiser changed it.
+    """
+    loaded = []
+    for diagram in diagrams:
+        if 'error' in diagram:
+            logger.error(f"Error processing {diagram['path']}: {diagram['error']}")
+            continue
+        errors = invalid_fields(ChildTitle, {'title': diagram['title']}, CHILD_REQUIRED)
+        if not diagram['svg_code']:
+            errors.append('svg_code')
+        if errors:
+            logger.error(f"Child title errors in {diagram['path']}: {errors}")
+            continue
+        loaded.append((diagram, ChildTitle(parent=parent, title=diagram['title'])))
+
+    with transaction.atomic():
+        # Numbers losing diagrams are re-indexed for search and fitment along with the new ones
+        reindex = set()
+        if replace_ids:
+            reindex.update(Part.objects.filter(child_title_id__in=list(replace_ids)).values_list('canonical_id', flat=True))
+            ChildTitle.objects.filter(id__in=list(replace_ids)).delete()
+        svg_codes = [diagram['svg_code'] for diagram, _ in loaded]
+        if keep_original:
+            svg_codes += [original_svg(diagram) for diagram, _ in loaded if original_svg(diagram)]
+        # Diagrams shared with other VINs resolve to the blob already stored
+        hashes = SvgBlob.store(svg_codes)
+        for diagram, child in loaded:
+            child.svg_blob_id = hashes[diagram['svg_code']]
+            if keep_original and original_svg(diagram):
+                child.original_svg_blob_id = hashes[original_svg(diagram)]
+        ChildTitle.objects.bulk_create([child for _, child in loaded])
+        parts = []
+        for diagram, child in loaded:
+            for row in diagram['parts']:
+                errors = invalid_fields(Part, row, PART_REQUIRED)
+                if errors:
+                    logger.error(f"Part errors for {row['part_number']} in {child.title}: {errors}")
+                    continue
+                parts.append(Part(child_title=child, **row))
+        # bulk_create skips Part.save(), so canonical part numbers are resolved in one pass
+        numbers = PartNumber.resolve(part.part_number for part in parts)
+        for part in parts:
+            part.canonical_id = numbers[part.part_number]
+        Part.objects.bulk_create(parts, batch_size=1000)
+        SerialPart.objects.bulk_create(rows_for_parts(parent.serial_number_id, parts), batch_size=1000)
+        reindex.update(numbers.values())
+        index_part_numbers(reindex)
+        update_fitment(reindex)
+
+    return loaded, len(parts)
+
+
+def hash_file(path):
+    """sha256 hex digest of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def plan_section(root_dir, paths, manifest, force=False):
+    """
+    Split a section's files into ones to (re)load and DiagramSource rows to touch.
+
+    A file whose size and mtime match its manifest row is skipped without being
+    read; otherwise it is hashed, and skipped only if the hash still matches.
+    Returns ([(path, relative_path, stat, digest)], [touched sources]).
+    """
+    changed, touched = [], []
+    for path in paths:
+        relative_path = os.path.relpath(path, root_dir).replace(os.sep, '/')
+        stat = os.stat(path)
+        source = manifest.get(relative_path)
+        if not force and source and source.child_title_id:
+            if source.size == stat.st_size and source.mtime_ns == stat.st_mtime_ns:
+                continue
+            digest = hash_file(path)
+            if source.content_hash == digest:
+                source.size, source.mtime_ns = stat.st_size, stat.st_mtime_ns
+                touched.append(source)
+                continue
+        else:
+            digest = hash_file(path)
+        changed.append((path, relative_path, stat, digest))
+    return changed, touched
+
+
+def record_sources(serial, manifest, loaded, files):
+    """Create or update the DiagramSource rows of freshly loaded diagrams"""
+    now = timezone.now()
+    to_create, to_update = [], []
+    for diagram, child in loaded:
+        relative_path, stat, digest = files[diagram['path']]
+        source = manifest.get(relative_path)
+        if source is None:
+            source = DiagramSource(serial_number=serial, path=relative_path)
+            manifest[relative_path] = source
+            to_create.append(source)
+        else:
+            to_update.append(source)
+        source.content_hash = digest
+        source.size = stat.st_size
+        source.mtime_ns = stat.st_mtime_ns
+        source.child_title = child
+        source.loaded_at = now
+    DiagramSource.objects.bulk_create(to_create)
+    DiagramSource.objects.bulk_update(to_update, ['content_hash', 'size', 'mtime_ns', 'child_title', 'loaded_at'])
+
+
+def replaced_child_ids(parent, diagrams, manifest, files):
+    """
+    ChildTitle ids superseded by reloading these diagrams: the one recorded in
+    the manifest, or for files loaded before the manifest existed, any
+    unrecorded ChildTitle of the parent with the same title.
+    """
+    claimed = {source.child_title_id for source in manifest.values()}
+    unclaimed_by_title = {}
+    for child_id, title in parent.child_titles.values_list('id', 'title'):
+        if child_id not in claimed:
+            unclaimed_by_title.setdefault(title, []).append(child_id)
+
+    replace_ids = set()
+    for diagram in diagrams:
+        if 'error' in diagram:
+            continue
+        source = manifest.get(files[diagram['path']][0])
+        if source and source.child_title_id:
+            replace_ids.add(source.child_title_id)
+        else:
+            replace_ids.update(unclaimed_by_title.pop(diagram['title'], []))
+    return replace_ids
+
+
+def ingest_directory(root_dir, workers=None, force=False, optimize=True, keep_original=False):
+    """
+    Load a VIN folder: one ParentTitle per section directory, one ChildTitle
+    per diagram file and its Parts.
+
+    Files already recorded in the DiagramSource manifest with unchanged content
+    are skipped without parsing; changed files replace the ChildTitle they
+    produced last time. force=True reloads every file; optimize and
+    keep_original control SVG minification (see write_section). Returns
+    counts and elapsed seconds.
+    """
+    started = time.perf_counter()
+    stats = {'files': 0, 'unchanged': 0, 'child_titles': 0, 'parts': 0}
+
+    root_dir = os.path.normpath(root_dir)
+    serial = get_or_create_serial(os.path.basename(root_dir))
+    manifest = {source.path: source for source in serial.diagram_sources.all()}
+
+    plan = []
+    touched = []
+    files = {}
+    for parent_name, section_paths in find_sections(root_dir):
+        stats['files'] += len(section_paths)
+        changed, section_touched = plan_section(root_dir, section_paths, manifest, force)
+        touched.extend(section_touched)
+        stats['unchanged'] += len(section_paths) - len(changed)
+        if changed:
+            plan.append((parent_name, [path for path, _, _, _ in changed]))
+            for path, relative_path, stat, digest in changed:
+                files[path] = (relative_path, stat, digest)
+    DiagramSource.objects.bulk_update(touched, ['size', 'mtime_ns'])
+
+    paths = [path for _, section_paths in plan for path in section_paths]
+    parsed = iter_parsed(paths, workers=workers, optimize=optimize)
+    replaced = 0
+    try:
+        for parent_name, section_paths in plan:
+            parent = get_or_create_parent(serial, parent_name)
+            diagrams = list(itertools.islice(parsed, len(section_paths)))
+            with transaction.atomic():
+                replace_ids = replaced_child_ids(parent, diagrams, manifest, files)
+                loaded, parts = write_section(parent, diagrams, replace_ids, keep_original)
+                record_sources(serial, manifest, loaded, files)
+            logger.info(f"{parent_name}: {len(loaded)} child titles, {parts} parts")
+            stats['child_titles'] += len(loaded)
+            stats['parts'] += parts
+            replaced += len(replace_ids)
+    finally:
+        parsed.close()
+        # bulk_create sends no signals, so retire cached UPC -> diagram lookups here
+        invalidate_diagram_cache()
+
+    if replaced:
+        SvgBlob.delete_orphans()
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,66 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from motorpartsdata.catalogue_diff import ADDED, diff_serials, part_numbers, summarise
+from motorpartsdata.models import SerialNumber
+from motorpartsdata.scrape_queue import enqueue
+
+CSV_FIELDS = ('part_number', 'status', 'serials', 'has_pricing')
+
+
+class Command(BaseCommand):
+    help = 'Diff the part numbers of a base serial against one or more other serials'
+
+    def add_arguments(self, parser):
+        parser.add_argument('base', help='Serial to compare against')
+        parser.add_argument('others', nargs='+', help='Serial(s) compared with the base')
+        parser.add_argument('--format', choices=('json', 'csv'), default='json')
+        parser.add_argument('--output', help='Write the diff to this file instead of stdout')
+        parser.add_argument('--queue', metavar='PATH',
+                            help='Also write the added part numbers without pricing as a scraper '
+                                 'work list (the next.txt format)')
+        parser.add_argument('--enqueue', action='store_true',
+                            help='Queue the added part numbers without pricing for the price scraper')
+
+    def handle(self, *args, **options):
+        names = [options['base']] + options['others']
+        if len(set(names)) != len(names):
+            raise CommandError('Each serial can only be given once')
+        serials = SerialNumber.objects.in_bulk(names, field_name='serial')
+        unknown = [name for name in names if name not in serials]
+        if unknown:
+            raise CommandError(f"Unknown serial(s): {', '.join(unknown)}")
+
+        base = serials[options['base']]
+        diff = diff_serials(base, [serials[name] for name in options['others']])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as file:
+                self._write(file, options, diff)
+        else:
+            self._write(self.stdout, options, diff)
+
+        if options['queue']:
+            queued = part_numbers(diff, ADDED, unpriced_only=True)
+            with open(options['queue'], 'w', encoding='utf-8') as file:
+                file.write(str(queued))
+            self.stderr.write(f"Queued {len(queued)} unpriced part numbers in {options['queue']}")
+        if options['enqueue']:
+            stats = enqueue(part_numbers(diff, ADDED, unpriced_only=True))
+            self.stderr.write(f"Queued {stats['created']} new price scrape jobs, re-queued {stats['requeued']}")
+
+    def _write(self, file, options, diff):
+        if options['format'] == 'csv':
+            writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(diff)
+        else:
+            json.dump({
+                'base': options['base'],
+                'others': options['others'],
+                'summary': summarise(diff),
+                'parts': diff,
+            }, file, indent=2)
+            file.write('\n')
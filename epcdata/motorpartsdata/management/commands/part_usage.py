@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from motorpartsdata.models import SerialNumber
+from motorpartsdata.pricing import serial_part_numbers
+from motorpartsdata.serial_parts import serials_using
+
+
+class Command(BaseCommand):
+    help = 'List the serials using a part number, or the part numbers a serial needs'
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument('--part', help='Part number to find the serials of')
+        group.add_argument('--serial', help='Serial to list the part numbers of')
+
+    def handle(self, *args, **options):
+        if options['part']:
+            values = serials_using(options['part'])
+        else:
+            serial = SerialNumber.objects.filter(serial=options['serial']).first()
+            if serial is None:
+                raise CommandError(f"Unknown serial: {options['serial']}")
+            values = sorted(serial_part_numbers(serial))
+        for value in values:
+            self.stdout.write(value)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from motorpartsdata import fitment
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the part number -> serials fitment index from SerialPart (ingest and refresh_serial_parts keep it current)'
+
+    def handle(self, *args, **options):
+        stats = fitment.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Fitment rebuilt: {stats['part_numbers']} part numbers across {stats['serials']} serials"
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from motorpartsdata.models import SerialNumber, SerialPart
+from motorpartsdata.part_search import index_part_numbers, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the part search index used by the shop search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--serial', action='append', dest='serials', metavar='SERIAL',
+                            help="Only re-index this serial's part numbers (repeatable); default rebuilds everything")
+
+    def handle(self, *args, **options):
+        if not options['serials']:
+            stats = rebuild_index()
+            self.stdout.write(self.style.SUCCESS(
+                f"Part search index rebuilt: {stats['part_numbers']} part numbers, {stats['terms']} terms"
+            ))
+            return
+
+        found = dict(SerialNumber.objects.filter(serial__in=options['serials']).values_list('serial', 'id'))
+        unknown = sorted(set(options['serials']) - set(found))
+        if unknown:
+            raise CommandError(f"Unknown serial(s): {', '.join(unknown)}")
+        ids = SerialPart.objects.filter(serial_number_id__in=list(found.values())).values_list('part_number_id', flat=True)
+        indexed = index_part_numbers(ids)
+        self.stdout.write(self.style.SUCCESS(f"Re-indexed {indexed} part numbers"))
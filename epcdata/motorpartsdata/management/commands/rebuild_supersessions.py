@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from motorpartsdata import supersession
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the part number supersession closure from the pricing data (loadprices does this after each run)'
+
+    def handle(self, *args, **options):
+        stats = supersession.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Supersessions rebuilt: {stats['numbers']} superseded numbers, {stats['rows']} closure rows, "
+            f"{stats['cycles']} in cycles"
+        ))
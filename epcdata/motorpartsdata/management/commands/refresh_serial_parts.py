@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from motorpartsdata.models import SerialNumber
+from motorpartsdata.serial_parts import refresh_serial_parts
+
+
+class Command(BaseCommand):
+    help = 'Bring the SerialPart VIN -> part number lookup in line with the Part table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--serial', action='append', dest='serials', metavar='SERIAL',
+                            help='Only refresh this serial (repeatable); default is every serial')
+        parser.add_argument('--full', action='store_true',
+                            help='Delete and rebuild the rows in scope instead of repairing only stale/missing ones')
+
+    def handle(self, *args, **options):
+        serial_ids = None
+        if options['serials']:
+            found = dict(SerialNumber.objects.filter(serial__in=options['serials']).values_list('serial', 'id'))
+            unknown = sorted(set(options['serials']) - set(found))
+            if unknown:
+                raise CommandError(f"Unknown serial(s): {', '.join(unknown)}")
+            serial_ids = list(found.values())
+
+        stats = refresh_serial_parts(serial_ids, full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"SerialPart refreshed: {stats['created']} rows written, {stats['deleted']} removed"
+        ))
@@ -0,0 +1,50 @@
+import ast
+
+from django.core.management.base import BaseCommand, CommandError
+
+from motorpartsdata.models import SerialNumber
+from motorpartsdata.pricing import serial_part_numbers
+from motorpartsdata.scrape_queue import enqueue, queue_summary
+
+
+class Command(BaseCommand):
+    help = 'Queue part numbers for price scraping and show the queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('numbers', nargs='*', help='Part numbers to queue')
+        parser.add_argument('--unpriced', action='store_true',
+                            help='Queue every part number used by a serial that has no pricing')
+        parser.add_argument('--serial', action='append', dest='serials', metavar='SERIAL',
+                            help="Queue a serial's part numbers (repeatable)")
+        parser.add_argument('--from-file', metavar='PATH',
+                            help='Queue the part numbers of a next.txt style list')
+        parser.add_argument('--all', action='store_true',
+                            help='With --serial/--from-file/numbers, also queue numbers that already have pricing')
+
+    def handle(self, *args, **options):
+        numbers = set(options['numbers'])
+        for name in options['serials'] or ():
+            serial = SerialNumber.objects.filter(serial=name).first()
+            if serial is None:
+                raise CommandError(f"Unknown serial: {name}")
+            numbers |= serial_part_numbers(serial)
+        if options['from_file']:
+            with open(options['from_file'], encoding='utf-8') as file:
+                try:
+                    numbers |= set(ast.literal_eval(file.read()))
+                except (ValueError, SyntaxError) as e:
+                    raise CommandError(f"{options['from_file']} is not a list of part numbers: {e}")
+
+        if options['unpriced']:
+            stats = enqueue(unpriced_only=True)
+        elif numbers:
+            stats = enqueue(numbers, unpriced_only=not options['all'])
+        else:
+            stats = None
+        if stats:
+            self.stdout.write(self.style.SUCCESS(
+                f"Queued {stats['created']} new jobs, re-queued {stats['requeued']}"
+            ))
+
+        summary = queue_summary()
+        self.stdout.write(', '.join(f"{status}: {count}" for status, count in summary.items()))
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.23 on 2026-10-17 14:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0005_alter_shippingmethod_countries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiagramSource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('size', models.BigIntegerField()),
+                ('mtime_ns', models.BigIntegerField()),
+                ('loaded_at', models.DateTimeField(auto_now=True)),
+                ('child_title', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sources', to='motorpartsdata.childtitle')),
+                ('serial_number', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='diagram_sources', to='motorpartsdata.serialnumber')),
+            ],
+            options={
+                'unique_together': {('serial_number', 'path')},
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.23 on 2026-10-17 14:39
+
+import gzip
+import hashlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_svgs_to_blobs(apps, schema_editor):
+    """Copy every ChildTitle.svg_code into a shared, gzip-compressed SvgBlob"""
+    ChildTitle = apps.get_model('motorpartsdata', 'ChildTitle')
+    SvgBlob = apps.get_model('motorpartsdata', 'SvgBlob')
+
+    ids = list(ChildTitle.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), 200):
+        children = list(ChildTitle.objects.filter(id__in=ids[start:start + 200]).only('id', 'svg_code'))
+        blobs = {}
+        for child in children:
+            raw = (child.svg_code or '').encode('utf-8')
+            if not raw:
+                continue
+            digest = hashlib.sha256(raw).hexdigest()
+            if digest not in blobs:
+                blobs[digest] = SvgBlob(hash=digest, data=gzip.compress(raw, mtime=0), size=len(raw))
+            child.svg_blob_id = digest
+        SvgBlob.objects.bulk_create(blobs.values(), ignore_conflicts=True)
+        ChildTitle.objects.bulk_update(children, ['svg_blob'])
+
+
+def move_blobs_to_svgs(apps, schema_editor):
+    ChildTitle = apps.get_model('motorpartsdata', 'ChildTitle')
+    for child in ChildTitle.objects.select_related('svg_blob').iterator(chunk_size=200):
+        if child.svg_blob_id:
+            child.svg_code = gzip.decompress(bytes(child.svg_blob.data)).decode('utf-8')
+            child.save(update_fields=['svg_code'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0006_diagramsource'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SvgBlob',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('size', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='childtitle',
+            name='svg_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='child_titles', to='motorpartsdata.svgblob'),
+        ),
+        migrations.AlterField(
+            model_name='childtitle',
+            name='svg_code',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(move_svgs_to_blobs, move_blobs_to_svgs),
+    ]
@@ -0,0 +1,19 @@
+# Dropped in its own migration: on PostgreSQL the svg_blob FK writes of
+# 0007_svgblob leave deferred trigger events, and ALTER TABLE refuses to run
+# on childtitle until that transaction has committed.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0007_svgblob'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='childtitle',
+            name='svg_code',
+        ),
+    ]
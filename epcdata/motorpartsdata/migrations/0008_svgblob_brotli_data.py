@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-17 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0007b_remove_childtitle_svg_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='svgblob',
+            name='brotli_data',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.23 on 2026-10-17 14:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0008_svgblob_brotli_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='childtitle',
+            name='original_svg_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='original_for', to='motorpartsdata.svgblob'),
+        ),
+    ]
@@ -0,0 +1,148 @@
+# Typed pricing columns: the scraped text is parsed into new columns, which
+# then replace the CharFields (an in-place ALTER ... TYPE would fail on
+# blanks and "£" prefixes).
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+
+TYPED_PRICES = ('list_price', 'vor', 'stock_order')
+BATCH_SIZE = 1000
+
+# The parsers as they were when this migration was written, copied from
+# motorpartsdata.pricing_values so later changes there don't alter it
+PRICE_PLACES = Decimal('0.01')
+MAX_PRICE = Decimal('99999999.99')
+ACTIVE_CODE = 'A'
+INACTIVE_CODE = 'S'
+
+
+def parse_price(value):
+    """A price such as "£1,234.50" as a 2 place Decimal, or None"""
+    if value is None or value == '':
+        return None
+    try:
+        price = Decimal(str(value).replace('£', '').replace(',', '').strip())
+    except (InvalidOperation, ValueError):
+        return None
+    if not price.is_finite() or abs(price) > MAX_PRICE:
+        return None
+    return price.quantize(PRICE_PLACES)
+
+
+def parse_stock(value):
+    """A stock level such as "Nil", "10+" or "3" as a count ("10+" counts as 10)"""
+    if not value:
+        return 0
+    stock_str = str(value).strip()
+    if stock_str.lower() == 'nil' or stock_str == '0':
+        return 0
+    if stock_str.endswith('+'):
+        try:
+            return int(stock_str.replace('+', ''))
+        except ValueError:
+            return 10
+    try:
+        return int(float(stock_str.replace(',', '')))
+    except (ValueError, TypeError):
+        return 0
+
+
+def parse_active(value):
+    """The EPC status code: "A" (active) is True, any other code False, blank None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().upper() == ACTIVE_CODE
+
+
+def parse_pricing(apps, schema_editor):
+    PricingData = apps.get_model('motorpartsdata', 'PricingData')
+    batch = []
+    for pricing in PricingData.objects.only('id', 'active', 'stock_available', *TYPED_PRICES).iterator(chunk_size=BATCH_SIZE):
+        for name in TYPED_PRICES:
+            setattr(pricing, f'{name}_typed', parse_price(getattr(pricing, name)))
+        pricing.active_typed = parse_active(pricing.active)
+        pricing.stock_qty = parse_stock(pricing.stock_available) if pricing.stock_available else None
+        batch.append(pricing)
+        if len(batch) >= BATCH_SIZE:
+            PricingData.objects.bulk_update(batch, [f'{name}_typed' for name in TYPED_PRICES] + ['active_typed', 'stock_qty'])
+            batch = []
+    if batch:
+        PricingData.objects.bulk_update(batch, [f'{name}_typed' for name in TYPED_PRICES] + ['active_typed', 'stock_qty'])
+
+
+def format_pricing(apps, schema_editor):
+    PricingData = apps.get_model('motorpartsdata', 'PricingData')
+    batch = []
+    for pricing in PricingData.objects.only('id', 'active_typed', *[f'{name}_typed' for name in TYPED_PRICES]).iterator(chunk_size=BATCH_SIZE):
+        for name in TYPED_PRICES:
+            value = getattr(pricing, f'{name}_typed')
+            setattr(pricing, name, None if value is None else str(value))
+        pricing.active = None if pricing.active_typed is None else (ACTIVE_CODE if pricing.active_typed else INACTIVE_CODE)
+        batch.append(pricing)
+        if len(batch) >= BATCH_SIZE:
+            PricingData.objects.bulk_update(batch, list(TYPED_PRICES) + ['active'])
+            batch = []
+    if batch:
+        PricingData.objects.bulk_update(batch, list(TYPED_PRICES) + ['active'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0009_childtitle_original_svg_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricingdata',
+            name='stock_qty',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pricingdata',
+            name='active_typed',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pricingdata',
+            name='list_price_typed',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='pricingdata',
+            name='vor_typed',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='pricingdata',
+            name='stock_order_typed',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(parse_pricing, format_pricing),
+        migrations.RemoveField(model_name='pricingdata', name='active'),
+        migrations.RemoveField(model_name='pricingdata', name='list_price'),
+        migrations.RemoveField(model_name='pricingdata', name='vor'),
+        migrations.RemoveField(model_name='pricingdata', name='stock_order'),
+        migrations.RenameField(model_name='pricingdata', old_name='active_typed', new_name='active'),
+        migrations.RenameField(model_name='pricingdata', old_name='list_price_typed', new_name='list_price'),
+        migrations.RenameField(model_name='pricingdata', old_name='vor_typed', new_name='vor'),
+        migrations.RenameField(model_name='pricingdata', old_name='stock_order_typed', new_name='stock_order'),
+        migrations.AlterField(
+            model_name='pricingdata',
+            name='active',
+            field=models.BooleanField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='pricingdata',
+            name='list_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='pricingdata',
+            name='range_code',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+    ]
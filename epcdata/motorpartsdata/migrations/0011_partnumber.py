@@ -0,0 +1,49 @@
+# Canonical part numbers: one PartNumber row per distinct Part.part_number,
+# referenced by every Part using it. Pricing moves from each Part instance to
+# the PartNumber, keeping the first (lowest id) PricingData row of each number.
+# The columns are added here, filled in 0011b and the old ones dropped in
+# 0011c: each step commits on its own, since PostgreSQL will not ALTER a
+# table with FK trigger events still pending from the data step.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0010_pricingdata_typed_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartNumber',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='part',
+            name='part_number',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='part',
+            name='canonical',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='parts', to='motorpartsdata.partnumber'),
+        ),
+        migrations.AddField(
+            model_name='pricingdata',
+            name='canonical_part',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='+', to='motorpartsdata.partnumber'),
+        ),
+        migrations.AlterField(
+            model_name='pricingdata',
+            name='part_number',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='pricing_data', to='motorpartsdata.part'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Fills the canonical columns added by 0011_partnumber.
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 1000
+
+
+def link_part_numbers(apps, schema_editor):
+    Part = apps.get_model('motorpartsdata', 'Part')
+    PartNumber = apps.get_model('motorpartsdata', 'PartNumber')
+    PricingData = apps.get_model('motorpartsdata', 'PricingData')
+
+    numbers = Part.objects.order_by().values_list('part_number', flat=True).distinct()
+    PartNumber.objects.bulk_create([PartNumber(number=number) for number in numbers], batch_size=BATCH_SIZE)
+    Part.objects.update(canonical_id=Subquery(
+        PartNumber.objects.filter(number=OuterRef('part_number')).values('id')[:1]
+    ))
+
+    kept = {}
+    duplicates = []
+    for pricing_id, canonical_id in PricingData.objects.order_by('id').values_list('id', 'part_number__canonical_id'):
+        if canonical_id in kept:
+            duplicates.append(pricing_id)
+        else:
+            kept[canonical_id] = pricing_id
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        PricingData.objects.filter(id__in=duplicates[start:start + BATCH_SIZE]).delete()
+    batch = []
+    for canonical_id, pricing_id in kept.items():
+        batch.append(PricingData(id=pricing_id, canonical_part_id=canonical_id))
+        if len(batch) >= BATCH_SIZE:
+            PricingData.objects.bulk_update(batch, ['canonical_part_id'])
+            batch = []
+    if batch:
+        PricingData.objects.bulk_update(batch, ['canonical_part_id'])
+
+
+def unlink_part_numbers(apps, schema_editor):
+    # Each Part instance gets its own copy of its number's pricing again
+    Part = apps.get_model('motorpartsdata', 'Part')
+    PricingData = apps.get_model('motorpartsdata', 'PricingData')
+
+    part_ids = {}
+    for part_id, canonical_id in Part.objects.order_by('id').values_list('id', 'canonical_id'):
+        part_ids.setdefault(canonical_id, []).append(part_id)
+    for pricing in PricingData.objects.order_by('id').iterator(chunk_size=BATCH_SIZE):
+        instances = part_ids.get(pricing.canonical_part_id, [])
+        if not instances:
+            pricing.delete()
+            continue
+        pricing.part_number_id = instances[0]
+        pricing.save()
+        values = {field.attname: getattr(pricing, field.attname)
+                  for field in PricingData._meta.concrete_fields if not field.primary_key}
+        copies = [PricingData(**dict(values, part_number_id=part_id)) for part_id in instances[1:]]
+        PricingData.objects.bulk_create(copies, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0011_partnumber'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_part_numbers, unlink_part_numbers),
+    ]
@@ -0,0 +1,29 @@
+# Pricing now hangs off PartNumber: drop the per-Part link and tighten the
+# columns filled by 0011b_link_part_numbers.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0011b_link_part_numbers'),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name='pricingdata', name='part_number'),
+        migrations.RenameField(model_name='pricingdata', old_name='canonical_part', new_name='part_number'),
+        migrations.AlterField(
+            model_name='pricingdata',
+            name='part_number',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE,
+                                       related_name='pricing_data', to='motorpartsdata.partnumber'),
+        ),
+        migrations.AlterField(
+            model_name='part',
+            name='canonical',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='parts', to='motorpartsdata.partnumber'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.23 on 2026-10-17 15:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Rows for the parts already loaded, in one set-based statement
+POPULATE_SQL = """
+INSERT INTO motorpartsdata_serialpart (part_id, serial_number_id, part_number_id, child_title_id, call_out_order)
+SELECT part.id, parent.serial_number_id, part.canonical_id, part.child_title_id, part.call_out_order
+FROM motorpartsdata_part part
+JOIN motorpartsdata_childtitle child ON child.id = part.child_title_id
+JOIN motorpartsdata_parenttitle parent ON parent.id = child.parent_id
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0011c_pricingdata_part_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerialPart',
+            fields=[
+                ('part', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='serial_part', serialize=False, to='motorpartsdata.part')),
+                ('call_out_order', models.IntegerField()),
+                ('child_title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='motorpartsdata.childtitle')),
+                ('part_number', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='serial_parts', to='motorpartsdata.partnumber')),
+                ('serial_number', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='serial_parts', to='motorpartsdata.serialnumber')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['serial_number', 'part_number'], name='serialpart_serial_number_idx'), models.Index(fields=['part_number', 'serial_number'], name='serialpart_number_serial_idx')],
+            },
+        ),
+        migrations.RunSQL(POPULATE_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-17 15:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0012_serialpart'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceScrapeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('claimed', 'Claimed'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('priority', models.IntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField()),
+                ('claimed_by', models.CharField(blank=True, default='', max_length=100)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('part_number', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='scrape_job', to='motorpartsdata.partnumber')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', '-priority', 'next_attempt_at'], name='scrapejob_claim_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 4.2.23 on 2026-10-17 15:52
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# The index is filled here so the shop search, switched over to it in the same
+# release, has results straight after migrate. Tokenising is copied from
+# motorpartsdata.part_search as it was when this migration was written.
+WEIGHTS = {'number': 4, 'usage_name': 3, 'description': 2, 'title': 1}
+MAX_TERM_LENGTH = 100
+BATCH_SIZE = 1000
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    return WORD_RE.findall(text.lower()) if text else []
+
+
+def trigrams(term):
+    return {f" {term} "[i:i + 3] for i in range(len(term))}
+
+
+def document_terms(number, usage_names, description, titles):
+    fields = [('number', [number]), ('usage_name', usage_names), ('description', [description]), ('title', titles)]
+    terms = {}
+    for field, texts in fields:
+        weight = WEIGHTS[field]
+        for text in texts:
+            words = tokenize(text)
+            if field == 'number':
+                words.append(''.join(tokenize(text)))
+            for word in words:
+                word = word[:MAX_TERM_LENGTH]
+                if terms.get(word, 0) < weight:
+                    terms[word] = weight
+    return terms
+
+
+def build_index(apps, schema_editor):
+    PartNumber = apps.get_model('motorpartsdata', 'PartNumber')
+    Part = apps.get_model('motorpartsdata', 'Part')
+    PricingData = apps.get_model('motorpartsdata', 'PricingData')
+    SearchTerm = apps.get_model('motorpartsdata', 'SearchTerm')
+    SearchTrigram = apps.get_model('motorpartsdata', 'SearchTrigram')
+    SearchPosting = apps.get_model('motorpartsdata', 'SearchPosting')
+
+    term_ids = {}
+    ids = list(PartNumber.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        chunk = ids[start:start + BATCH_SIZE]
+        numbers = dict(PartNumber.objects.filter(id__in=chunk).values_list('id', 'number'))
+        usage_names = {part_number_id: set() for part_number_id in numbers}
+        titles = {part_number_id: set() for part_number_id in numbers}
+        for part_number_id, usage_name, child, parent in Part.objects.filter(canonical_id__in=chunk).values_list(
+            'canonical_id', 'usage_name', 'child_title__title', 'child_title__parent__title',
+        ).distinct():
+            usage_names[part_number_id].add(usage_name)
+            titles[part_number_id].update((child, parent))
+        descriptions = dict(PricingData.objects.filter(part_number_id__in=chunk).values_list('part_number_id', 'description'))
+        documents = {
+            part_number_id: document_terms(number, usage_names[part_number_id], descriptions.get(part_number_id),
+                                           titles[part_number_id])
+            for part_number_id, number in numbers.items()
+        }
+
+        missing = sorted({term for terms in documents.values() for term in terms} - set(term_ids))
+        SearchTerm.objects.bulk_create([SearchTerm(term=term) for term in missing], batch_size=BATCH_SIZE)
+        created = {}
+        for term_start in range(0, len(missing), BATCH_SIZE):
+            created.update(SearchTerm.objects.filter(term__in=missing[term_start:term_start + BATCH_SIZE]).values_list('term', 'id'))
+        SearchTrigram.objects.bulk_create(
+            [SearchTrigram(trigram=trigram, term_id=term_id) for term, term_id in created.items() for trigram in trigrams(term)],
+            batch_size=BATCH_SIZE,
+        )
+        term_ids.update(created)
+        SearchPosting.objects.bulk_create([
+            SearchPosting(term_id=term_ids[term], part_number_id=part_number_id, weight=weight)
+            for part_number_id, terms in documents.items()
+            for term, weight in terms.items()
+        ], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0013_pricescrapejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='motorpartsdata.searchterm')),
+            ],
+            options={
+                'unique_together': {('trigram', 'term')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.SmallIntegerField()),
+                ('part_number', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='motorpartsdata.partnumber')),
+                ('term', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='motorpartsdata.searchterm')),
+            ],
+            options={
+                'unique_together': {('term', 'part_number')},
+            },
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Normalised part-number key (upper case, letters and digits only) and its
+# one-deletion variants for typo-tolerant lookups, filled in for the
+# existing PartNumber rows.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def normalize(text):
+    # PartNumber.normalize at the time of writing
+    return ''.join(ch for ch in text.upper() if ch.isascii() and ch.isalnum())
+
+
+def variants(key):
+    # PartNumberVariant.of at the time of writing
+    return {key} | {key[:i] + key[i + 1:] for i in range(len(key)) if len(key) > 1}
+
+
+def fill_normalized(apps, schema_editor):
+    PartNumber = apps.get_model('motorpartsdata', 'PartNumber')
+    PartNumberVariant = apps.get_model('motorpartsdata', 'PartNumberVariant')
+    batch = []
+    for part_number in PartNumber.objects.only('id', 'number').iterator(chunk_size=BATCH_SIZE):
+        part_number.normalized = normalize(part_number.number)
+        batch.append(part_number)
+        if len(batch) >= BATCH_SIZE:
+            write(PartNumber, PartNumberVariant, batch)
+            batch = []
+    if batch:
+        write(PartNumber, PartNumberVariant, batch)
+
+
+def write(PartNumber, PartNumberVariant, batch):
+    PartNumber.objects.bulk_update(batch, ['normalized'])
+    PartNumberVariant.objects.bulk_create([
+        PartNumberVariant(variant=variant, part_number_id=part_number.id)
+        for part_number in batch if part_number.normalized
+        for variant in variants(part_number.normalized)
+    ], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0014_part_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partnumber',
+            name='normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='PartNumberVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variant', models.CharField(max_length=100)),
+                ('part_number', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='motorpartsdata.partnumber')),
+            ],
+            options={
+                'unique_together': {('variant', 'part_number')},
+            },
+        ),
+        migrations.RunPython(fill_normalized, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.23 on 2026-10-17 16:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0015_partnumber_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Supersession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('is_current', models.BooleanField(default=False)),
+                ('part_number', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='supersessions', to='motorpartsdata.partnumber')),
+                ('successor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='supersedes', to='motorpartsdata.partnumber')),
+            ],
+            options={
+                'unique_together': {('part_number', 'successor')},
+            },
+        ),
+    ]
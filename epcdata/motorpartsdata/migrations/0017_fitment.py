@@ -0,0 +1,68 @@
+# Generated by Django 4.2.23 on 2026-10-17 16:11
+
+import sys
+from array import array
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Fitment is filled here so fitment checks, answered from it in the same
+# release, are right straight after migrate. The encoding is copied from
+# motorpartsdata.fitment.SerialSet as it was when this migration was written.
+BATCH_SIZE = 1000
+ARRAY = b'a'
+BITMAP = b'b'
+
+
+def encode(serial_ids):
+    unique = sorted(set(serial_ids))
+    ids = array('I', unique)
+    if sys.byteorder == 'big':
+        ids.byteswap()
+    encoded = ARRAY + ids.tobytes()
+    if unique:
+        bitmap = bytearray((unique[-1] >> 3) + 1)
+        for serial_id in unique:
+            bitmap[serial_id >> 3] |= 1 << (serial_id & 7)
+        encoded = min(encoded, BITMAP + bytes(bitmap), key=len)
+    return encoded
+
+
+def build_fitment(apps, schema_editor):
+    SerialPart = apps.get_model('motorpartsdata', 'SerialPart')
+    Fitment = apps.get_model('motorpartsdata', 'Fitment')
+
+    def write(serials_by_number):
+        Fitment.objects.bulk_create([
+            Fitment(part_number_id=part_number_id, serials=encode(serial_ids), serial_count=len(serial_ids))
+            for part_number_id, serial_ids in serials_by_number.items()
+        ], batch_size=BATCH_SIZE)
+
+    serials_by_number = {}
+    for part_number_id, serial_id in SerialPart.objects.order_by('part_number_id').values_list(
+        'part_number_id', 'serial_number_id',
+    ).distinct().iterator(chunk_size=10000):
+        if part_number_id not in serials_by_number and len(serials_by_number) >= BATCH_SIZE:
+            write(serials_by_number)
+            serials_by_number = {}
+        serials_by_number.setdefault(part_number_id, []).append(serial_id)
+    write(serials_by_number)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motorpartsdata', '0016_supersession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Fitment',
+            fields=[
+                ('part_number', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fitment', serialize=False, to='motorpartsdata.partnumber')),
+                ('serials', models.BinaryField()),
+                ('serial_count', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.RunPython(build_fitment, migrations.RunPython.noop),
+    ]
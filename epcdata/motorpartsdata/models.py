@@ -1,6 +1,16 @@
+import gzip
+import hashlib
+
 from django.db import models
 from django_countries.fields import CountryField
 
+from .pricing_values import parse_stock
+
+try:
+    import brotli
+except ImportError:  # optional: without it diagrams are served gzip-only
+    brotli = None
+
 # Serial number, always unique
 class SerialNumber(models.Model):
     serial = models.CharField(max_length=100, unique=True)
@@ -16,21 +26,170 @@ class ParentTitle(models.Model):
     def __str__(self):
         return self.title
 
-# Child title, linked to ParentTitle, with its own SVG code
+# Content-addressed SVG store: identical diagrams shared across VINs are kept once
+class SvgBlob(models.Model):
+    hash = models.CharField(max_length=64, primary_key=True)  # sha256 of the SVG text
+    data = models.BinaryField()  # gzip-compressed SVG, servable as-is with Content-Encoding: gzip
+    brotli_data = models.BinaryField(null=True, blank=True)  # brotli variant, filled lazily if missing
+    size = models.IntegerField()  # uncompressed length in bytes
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.hash
+
+    @staticmethod
+    def digest(svg_code):
+        return hashlib.sha256(svg_code.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def build(cls, svg_code):
+        """Unsaved blob for an SVG string"""
+        raw = svg_code.encode('utf-8')
+        return cls(
+            hash=hashlib.sha256(raw).hexdigest(),
+            data=gzip.compress(raw, mtime=0),
+            brotli_data=brotli.compress(raw) if brotli else None,
+            size=len(raw),
+        )
+
+    @classmethod
+    def store(cls, svg_codes):
+        """Save blobs for the given SVG strings (existing ones untouched); returns {svg_code: hash}"""
+        blobs = {svg_code: cls.build(svg_code) for svg_code in set(svg_codes)}
+        cls.objects.bulk_create(blobs.values(), ignore_conflicts=True, batch_size=100)
+        return {svg_code: blob.hash for svg_code, blob in blobs.items()}
+
+    @classmethod
+    def delete_orphans(cls):
+        """Remove blobs no ChildTitle refers to any more"""
+        return cls.objects.filter(child_titles__isnull=True, original_for__isnull=True).delete()[0]
+
+    @staticmethod
+    def decompress(data):
+        return gzip.decompress(bytes(data)).decode('utf-8')
+
+    @property
+    def svg_code(self):
+        return self.decompress(self.data)
+
+
+# Child title, linked to ParentTitle, with its SVG kept in SvgBlob
 class ChildTitle(models.Model):
     title = models.CharField(max_length=200)
     parent = models.ForeignKey(ParentTitle, on_delete=models.CASCADE, related_name='child_titles')
-    svg_code = models.TextField()
+    svg_blob = models.ForeignKey(SvgBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='child_titles')
+    # SVG as captured, kept when ingest optimises svg_blob and was asked to keep the original
+    original_svg_blob = models.ForeignKey(SvgBlob, on_delete=models.PROTECT, null=True, blank=True,
+                                          related_name='original_for')
 
     def __str__(self):
         return self.title
 
+    @property
+    def svg_code(self):
+        """SVG markup: as assigned if not saved yet, else loaded from the blob store on first access"""
+        pending = self.__dict__.get('_pending_svg_code')
+        if pending:
+            return pending
+        return self.svg_blob.svg_code if self.svg_blob_id else ''
+
+    @svg_code.setter
+    def svg_code(self, value):
+        # Kept on the instance until save() stores the blob, so ChildTitle(svg_code=...)
+        # keeps working; bulk loaders should use SvgBlob.store() and set svg_blob_id instead
+        self._pending_svg_code = value or None
+        if not value:
+            self.svg_blob = None
+
+    def save(self, *args, **kwargs):
+        pending = self.__dict__.pop('_pending_svg_code', None)
+        if pending:
+            self.svg_blob_id = SvgBlob.store([pending])[pending]
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'svg_blob'}
+        super().save(*args, **kwargs)
+
+# Canonical part number, one row per distinct number however many diagrams use it
+class PartNumber(models.Model):
+    number = models.CharField(max_length=100, unique=True)
+    # normalize(number), so "b0000 3507" finds B00003507 with one index probe (see part_lookup.py)
+    normalized = models.CharField(max_length=100, db_index=True, editable=False)
+
+    def __str__(self):
+        return self.number
+
+    @staticmethod
+    def normalize(text):
+        """Upper-cased, with everything but letters and digits dropped: 'b0000-3507 ' -> 'B00003507'"""
+        return ''.join(ch for ch in text.upper() if ch.isascii() and ch.isalnum())
+
+    def save(self, *args, **kwargs):
+        self.normalized = self.normalize(self.number)
+        super().save(*args, **kwargs)
+        self.variants.all().delete()
+        PartNumberVariant.objects.bulk_create(PartNumberVariant.build({self.pk: self.normalized}))
+
+    @classmethod
+    def resolve(cls, numbers, batch_size=1000):
+        """{number: PartNumber id} for the given numbers, creating the missing ones"""
+        numbers = list(set(numbers))
+        ids = {}
+        for start in range(0, len(numbers), batch_size):
+            ids.update(cls.objects.filter(number__in=numbers[start:start + batch_size]).values_list('number', 'id'))
+        missing = [number for number in numbers if number not in ids]
+        if missing:
+            # ignore_conflicts: a concurrent loader may have created some meanwhile
+            cls.objects.bulk_create(
+                [cls(number=number, normalized=cls.normalize(number)) for number in missing],
+                ignore_conflicts=True, batch_size=batch_size,
+            )
+            normalized = {}
+            for start in range(0, len(missing), batch_size):
+                rows = cls.objects.filter(number__in=missing[start:start + batch_size]).values_list('id', 'number', 'normalized')
+                for part_number_id, number, key in rows:
+                    ids[number] = part_number_id
+                    normalized[part_number_id] = key
+            PartNumberVariant.objects.bulk_create(PartNumberVariant.build(normalized), ignore_conflicts=True, batch_size=batch_size)
+        return ids
+
+
+# Normalised part number and every form of it with one character deleted, so a
+# number typed with one typo shares a variant with the real one (symmetric
+# delete). One IN probe on variant answers exact, normalised and near-miss
+# lookups; see part_lookup.py.
+class PartNumberVariant(models.Model):
+    variant = models.CharField(max_length=100)
+    part_number = models.ForeignKey(PartNumber, on_delete=models.CASCADE, related_name='variants')
+
+    class Meta:
+        unique_together = ('variant', 'part_number')  # its index serves variant lookups too
+
+    def __str__(self):
+        return f"{self.variant} -> {self.part_number_id}"
+
+    @staticmethod
+    def of(key):
+        """The key and its one-deletion forms"""
+        return {key} | {key[:i] + key[i + 1:] for i in range(len(key)) if len(key) > 1}
+
+    @classmethod
+    def build(cls, normalized):
+        """Unsaved rows for {PartNumber id: normalized key}"""
+        return [
+            cls(variant=variant, part_number_id=part_number_id)
+            for part_number_id, key in normalized.items() if key
+            for variant in cls.of(key)
+        ]
+
+
 # Part details, linked to ChildTitle (which indirectly gives us SVG and parent info)
 class Part(models.Model):
     child_title = models.ForeignKey(ChildTitle, on_delete=models.CASCADE, related_name='parts')
     
     call_out_order = models.IntegerField()
-    part_number = models.CharField(max_length=100)
+    part_number = models.CharField(max_length=100, db_index=True)
+    # Set from part_number on save(); bulk loaders set canonical_id from PartNumber.resolve()
+    canonical = models.ForeignKey(PartNumber, on_delete=models.PROTECT, related_name='parts', editable=False)
     usage_name = models.CharField(max_length=200)
     unit_qty = models.CharField(max_length=100)
     lr = models.CharField(max_length=10, blank=True, null=True)  # Left/Right
@@ -39,25 +198,193 @@ class Part(models.Model):
 
     def __str__(self):
         return f"{self.part_number} - {self.usage_name}"
-    
+
+    def save(self, *args, **kwargs):
+        # A save(update_fields=...) that leaves the number and diagram position
+        # alone has nothing to resolve or record
+        update_fields = kwargs.get('update_fields')
+        fields = None if update_fields is None else set(update_fields)
+        if fields is None or 'part_number' in fields:
+            self.canonical_id = PartNumber.resolve([self.part_number])[self.part_number]
+            if fields is not None:
+                kwargs['update_fields'] = fields | {'canonical'}
+        super().save(*args, **kwargs)
+        if fields is None or not fields.isdisjoint(SerialPart.RECORDED_FIELDS):
+            SerialPart.record(self)
+
+
+# Denormalised Part -> serial lookup, so "which parts does VIN Y need" and
+# "which VINs use part X" are index scans instead of Serial -> Parent -> Child
+# -> Part joins. Kept in step by Part.save() and ingest; refresh_serial_parts
+# repairs it after bulk changes that bypass both.
+class SerialPart(models.Model):
+    part = models.OneToOneField(Part, on_delete=models.CASCADE, primary_key=True, related_name='serial_part')
+    serial_number = models.ForeignKey(SerialNumber, on_delete=models.CASCADE, related_name='serial_parts',
+                                      db_index=False)  # leading column of both indexes below
+    part_number = models.ForeignKey(PartNumber, on_delete=models.CASCADE, related_name='serial_parts', db_index=False)
+    child_title = models.ForeignKey(ChildTitle, on_delete=models.CASCADE, related_name='+')
+    call_out_order = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['serial_number', 'part_number'], name='serialpart_serial_number_idx'),
+            models.Index(fields=['part_number', 'serial_number'], name='serialpart_number_serial_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.serial_number_id} / {self.part_number_id}"
+
+    # Part fields the row is derived from, by name and attname
+    RECORDED_FIELDS = {'part_number', 'child_title', 'child_title_id', 'call_out_order'}
+
+    @classmethod
+    def record(cls, part):
+        """Create or update the row of one saved Part, unless it is already up to date"""
+        serial_id = ChildTitle.objects.filter(pk=part.child_title_id).values_list('parent__serial_number_id', flat=True).get()
+        row = cls(part_id=part.pk, serial_number_id=serial_id, part_number_id=part.canonical_id,
+                  child_title_id=part.child_title_id, call_out_order=part.call_out_order)
+        fields = ('serial_number_id', 'part_number_id', 'child_title_id', 'call_out_order')
+        previous = cls.objects.filter(pk=part.pk).values_list(*fields).first()
+        if previous == tuple(getattr(row, field) for field in fields):
+            return
+        # Read here already, so the pre_save signal needn't (see signals.py)
+        row._previous_fitment = previous[:2] if previous else None
+        row.save(force_insert=previous is None, force_update=previous is not None)
+
+
+# One row per diagram HTML file loaded by scrapeandpush.py, so re-runs only
+# re-parse files whose content changed
+class DiagramSource(models.Model):
+    serial_number = models.ForeignKey(SerialNumber, on_delete=models.CASCADE, related_name='diagram_sources')
+    path = models.CharField(max_length=500)  # relative to the VIN folder, '/' separated
+    content_hash = models.CharField(max_length=64)  # sha256 hex digest
+    size = models.BigIntegerField()
+    mtime_ns = models.BigIntegerField()
+    child_title = models.ForeignKey(ChildTitle, on_delete=models.SET_NULL, null=True, blank=True, related_name='sources')
+    loaded_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('serial_number', 'path')
+
+    def __str__(self):
+        return f"{self.serial_number} / {self.path}"
 
 
 class PricingData(models.Model):
-    part_number = models.ForeignKey(Part, on_delete=models.CASCADE, related_name='pricing_data') #index 3 in json
+    # Stored once per part number, shared by every Part row (any VIN) with that number
+    part_number = models.OneToOneField(PartNumber, on_delete=models.CASCADE, related_name='pricing_data') #index 3 in json
     replacement = models.CharField(max_length=100, blank=True, null=True) #index 8
     description = models.CharField(max_length=100, blank=True, null=True) #index 4
-    active = models.CharField(max_length=100, blank=True, null=True) #index 5
+    active = models.BooleanField(blank=True, null=True, db_index=True) #index 5, status "A" (active) or "S"
     oldest = models.CharField(max_length=100, blank=True, null=True) # index 10
-    range_code = models.CharField(max_length=100, blank=True, null=True) #index 55
+    range_code = models.CharField(max_length=100, blank=True, null=True, db_index=True) #index 55
     discount_code= models.CharField(max_length=100, blank=True, null=True) #index 13
     class_code = models.CharField(max_length=100, blank=True, null=True) #index 14
     vat_code  = models.CharField(max_length=100, blank=True, null=True)
-    list_price = models.CharField(max_length=100, blank=True, null=True)
-    vor = models.CharField(max_length=100, blank=True, null=True)
-    stock_order = models.CharField(max_length=100, blank=True, null=True)
+    list_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, db_index=True)
+    vor = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    stock_order = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     replacement_code = models.CharField(max_length=100, blank=True, null=True)
     whs = models.CharField(max_length=100, blank=True, null=True)
-    stock_available = models.CharField(max_length=100, blank=True, null=True)
+    stock_available = models.CharField(max_length=100, blank=True, null=True)  # as shown, e.g. "Nil", "10+"
+    stock_qty = models.IntegerField(blank=True, null=True, db_index=True)  # stock_available parsed, "10+" -> 10
+
+    def save(self, *args, **kwargs):
+        # Bulk loaders bypass save() and set stock_qty themselves
+        self.stock_qty = parse_stock(self.stock_available) if self.stock_available else None
+        super().save(*args, **kwargs)
+
+
+# Transitive closure of the supersession graph built from PricingData.replacement
+# (and .oldest): one row per (number, any later number in its chain), so a number's
+# current replacement is one indexed lookup. Rebuilt by supersession.rebuild().
+class Supersession(models.Model):
+    part_number = models.ForeignKey(PartNumber, on_delete=models.CASCADE, related_name='supersessions')
+    successor = models.ForeignKey(PartNumber, on_delete=models.CASCADE, related_name='supersedes')
+    depth = models.PositiveSmallIntegerField()  # 1 for the direct replacement
+    is_current = models.BooleanField(default=False)  # successor ends the chain: the number to order
+
+    class Meta:
+        unique_together = ('part_number', 'successor')
+
+    def __str__(self):
+        return f"{self.part_number_id} -> {self.successor_id} ({self.depth})"
+
+
+# Which serials a part number fits, one compact serial id set per number (see
+# fitment.SerialSet), derived from SerialPart by fitment.update_part_numbers().
+class Fitment(models.Model):
+    part_number = models.OneToOneField(PartNumber, on_delete=models.CASCADE, primary_key=True, related_name='fitment')
+    serials = models.BinaryField()
+    serial_count = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.part_number_id}: {self.serial_count} serials"
+
+
+# Price scraping work queue: one job per part number, highest priority first
+class PriceScrapeJob(models.Model):
+    PENDING = 'pending'
+    CLAIMED = 'claimed'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (CLAIMED, 'Claimed'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    part_number = models.OneToOneField(PartNumber, on_delete=models.CASCADE, related_name='scrape_job')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    priority = models.IntegerField(default=0)  # see scrape_queue.priority_for()
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField()  # backoff after a failed attempt
+    claimed_by = models.CharField(max_length=100, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-priority', 'next_attempt_at'], name='scrapejob_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.part_number} ({self.status})"
+
+
+# Inverted part search index (see motorpartsdata.part_search): the vocabulary of
+# indexed words, their trigrams for typo-tolerant matching, and which part
+# numbers each word occurs in
+class SearchTerm(models.Model):
+    term = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.term
+
+
+class SearchTrigram(models.Model):
+    trigram = models.CharField(max_length=3)
+    term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE, related_name='trigrams')
+
+    class Meta:
+        unique_together = ('trigram', 'term')  # its index serves trigram lookups too
+
+    def __str__(self):
+        return f"{self.trigram} -> {self.term_id}"
+
+
+class SearchPosting(models.Model):
+    term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE, related_name='postings', db_index=False)
+    part_number = models.ForeignKey(PartNumber, on_delete=models.CASCADE, related_name='search_postings')
+    weight = models.SmallIntegerField()  # strongest field the term occurs in, see part_search.WEIGHTS
+
+    class Meta:
+        unique_together = ('term', 'part_number')  # its index serves term lookups too
+
+    def __str__(self):
+        return f"{self.term_id} / {self.part_number_id} ({self.weight})"
 
 
 class ShippingAddress(models.Model):
@@ -0,0 +1,234 @@
+"""
+Bulk import of EPC parts into the Oscar catalogue.
+
+``import_to_oscar --bulk`` uses BulkImporter instead of saving one part at a
+time (around fifteen statements per part). Pricing and each diagram's SVG are
+preloaded per serial, existing products and stock records are looked up per
+batch, and Products, ProductCategory links, attribute values and StockRecords
+are built in memory and written with bulk_create. A VIN then costs a handful
+of statements per thousand parts.
+
+bulk_create skips save() and signals, so callers invalidate the category menu
+(category_menu.invalidate()) once the import has committed.
+"""
+import logging
+
+from django.db import connection
+from oscar.core.loading import get_model
+
+from .models import ChildTitle, Part, PricingData, SvgBlob
+
+logger = logging.getLogger(__name__)
+
+Product = get_model('catalogue', 'Product')
+ProductAttribute = get_model('catalogue', 'ProductAttribute')
+ProductAttributeValue = get_model('catalogue', 'ProductAttributeValue')
+ProductCategory = get_model('catalogue', 'ProductCategory')
+StockRecord = get_model('partner', 'StockRecord')
+
+DEFAULT_BATCH_SIZE = 1000
+# Every product of a diagram carries its SVG, so attribute value INSERTs are
+# also split by size to keep single statements well below server limits
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+LOW_STOCK_THRESHOLD = 5
+
+PART_FIELDS = (
+    'id', 'child_title_id', 'canonical_id', 'part_number', 'usage_name', 'call_out_order', 'unit_qty', 'lr', 'remark',
+    'nn_note',
+)
+
+
+class StatementCounter:
+    """Counts SQL statements run on the default connection while active"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._wrapper.__exit__(*exc_info)
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def attribute_value_size(value):
+    return len(value.value_text or '') + len(value.value_richtext or '')
+
+
+class BulkImporter:
+    """Writes the parts of one serial at a time as Oscar products, in batches"""
+
+    def __init__(self, partner, product_class, batch_size=DEFAULT_BATCH_SIZE):
+        self.partner = partner
+        self.product_class = product_class
+        self.batch_size = batch_size
+        self.attributes = {a.code: a for a in ProductAttribute.objects.filter(product_class=product_class)}
+        self.upc_length = Product._meta.get_field('upc').max_length
+        self.title_length = Product._meta.get_field('title').max_length
+        self.sku_length = StockRecord._meta.get_field('partner_sku').max_length
+
+    def import_serial(self, serial_number, category_map, stats):
+        """
+        Import every part of serial_number into the child categories in
+        category_map (keyed "child_<ChildTitle id>"), adding to stats.
+        Returns the number of parts processed.
+        """
+        parts = list(
+            Part.objects.filter(child_title__parent__serial_number=serial_number)
+            .order_by('child_title__parent_id', 'child_title_id', 'id')
+            .only(*PART_FIELDS)
+        )
+        self.pricing = self._load_pricing(serial_number)
+        self.svg_data = dict(
+            ChildTitle.objects.filter(parent__serial_number=serial_number).values_list('id', 'svg_blob__data')
+        )
+        self.svg_codes = {}
+        # UPC -> product id for products written (or found) earlier in this serial
+        self.seen = {}
+
+        for batch in chunks(parts, self.batch_size):
+            self._import_batch(batch, category_map, stats)
+        return len(parts)
+
+    def _load_pricing(self, serial_number):
+        """PartNumber id -> (price, num_in_stock) for the part numbers a serial uses"""
+        rows = (
+            PricingData.objects.filter(part_number__serial_parts__serial_number=serial_number)
+            .order_by()
+            .values_list('part_number_id', 'list_price', 'stock_qty')
+            .distinct()
+        )
+        return {part_number_id: (list_price, stock_qty or 0) for part_number_id, list_price, stock_qty in rows}
+
+    def _svg_code(self, child_title_id):
+        """Each diagram's SVG is decompressed once, however many parts it has"""
+        if child_title_id not in self.svg_codes:
+            data = self.svg_data.get(child_title_id)
+            self.svg_codes[child_title_id] = SvgBlob.decompress(data) if data else ''
+        return self.svg_codes[child_title_id]
+
+    def _valid(self, part, upc, stats):
+        if len(upc) > self.upc_length or len(part.part_number) > self.sku_length:
+            problem = 'part number too long'
+        elif len(f"{part.part_number} - {part.usage_name}") > self.title_length:
+            problem = 'title too long'
+        else:
+            return True
+        logger.error(f"Skipped part {part.part_number} (Part {part.id}): {problem}")
+        stats['errors'] += 1
+        return False
+
+    def _import_batch(self, parts, category_map, stats):
+        upcs = {f"EPC-{part.part_number}" for part in parts} - self.seen.keys()
+        existing = dict(Product.objects.filter(upc__in=upcs).values_list('upc', 'id')) if upcs else {}
+        stocked = set(
+            StockRecord.objects.filter(partner=self.partner, product_id__in=existing.values())
+            .values_list('product_id', flat=True)
+        ) if existing else set()
+
+        new_parts = []
+        new_products = []
+        # (product id, part) pairs for existing products that still need a stock record
+        restock = []
+        for part in parts:
+            upc = f"EPC-{part.part_number}"
+            if upc in self.seen:
+                stats['products_existing'] += 1
+                stats['stock_records_existing'] += 1
+                continue
+            if upc in existing:
+                product_id = self.seen[upc] = existing[upc]
+                stats['products_existing'] += 1
+                if product_id in stocked:
+                    stats['stock_records_existing'] += 1
+                else:
+                    restock.append((product_id, part))
+                continue
+            category = category_map.get(f"child_{part.child_title_id}")
+            if category is None:
+                logger.error(f"No category found for child title {part.child_title_id}")
+                stats['errors'] += 1
+                continue
+            if not self._valid(part, upc, stats):
+                continue
+            self.seen[upc] = None
+            new_parts.append((part, category))
+            new_products.append(Product(
+                upc=upc,
+                title=f"{part.part_number} - {part.usage_name}",
+                slug=f"part-{part.part_number.lower()}",
+                product_class=self.product_class,
+                description=part.usage_name,
+                is_discountable=True,
+                structure=Product.STANDALONE,
+            ))
+
+        Product.objects.bulk_create(new_products, batch_size=self.batch_size)
+        links = []
+        values = []
+        for product, (part, category) in zip(new_products, new_parts):
+            self.seen[product.upc] = product.id
+            links.append(ProductCategory(product=product, category=category))
+            values.extend(self._attribute_values(product, part))
+            restock.append((product.id, part))
+        ProductCategory.objects.bulk_create(links, batch_size=self.batch_size)
+        self._write_attribute_values(values)
+
+        stock_records = []
+        for product_id, part in restock:
+            price, num_in_stock = self.pricing.get(part.canonical_id, (None, 0))
+            stock_records.append(StockRecord(
+                product_id=product_id,
+                partner=self.partner,
+                partner_sku=part.part_number,
+                price=price,
+                price_currency='GBP',
+                num_in_stock=num_in_stock,
+                low_stock_threshold=LOW_STOCK_THRESHOLD,
+            ))
+        StockRecord.objects.bulk_create(stock_records, batch_size=self.batch_size)
+
+        stats['products_created'] += len(new_products)
+        stats['stock_records_created'] += len(stock_records)
+
+    def _attribute_values(self, product, part):
+        attributes = {
+            'part_number': part.part_number,
+            'call_out_order': part.call_out_order,
+            'unit_qty': part.unit_qty or '',
+            'lr_orientation': part.lr or '',
+            'remark': part.remark or '',
+            'nn_note': part.nn_note or '',
+            'svg_diagram': self._svg_code(part.child_title_id),
+        }
+        for code, value in attributes.items():
+            attribute = self.attributes.get(code)
+            if value and attribute is not None:  # Only set non-empty values
+                attribute_value = ProductAttributeValue(product=product, attribute=attribute)
+                setattr(attribute_value, f"value_{attribute.type}", value)
+                yield attribute_value
+
+    def _write_attribute_values(self, values):
+        batch = []
+        size = 0
+        for value in values:
+            batch.append(value)
+            size += attribute_value_size(value)
+            if len(batch) >= self.batch_size or size >= MAX_BATCH_BYTES:
+                ProductAttributeValue.objects.bulk_create(batch)
+                batch = []
+                size = 0
+        if batch:
+            ProductAttributeValue.objects.bulk_create(batch)
+
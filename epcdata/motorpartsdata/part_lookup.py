@@ -0,0 +1,63 @@
+"""
+Part number lookups that tolerate how people type them.
+
+A typed number is matched, in order of preference, as:
+  exact       the number as stored
+  normalised  the same letters and digits ignoring case, spaces and
+              punctuation ("b0000 3507" -> B00003507)
+  near        a number one typo away: a character wrong, missing, extra or
+              swapped with its neighbour ("B00003570")
+
+All three come from one IN probe of PartNumberVariant, which holds each
+normalised number and its one-deletion forms: two numbers within one typo
+always share a variant, so the typed number's variants find them, and the
+few candidates are checked by edit distance.
+"""
+from .models import PartNumber, PartNumberVariant
+from .part_search import edit_distance
+
+EXACT = 'exact'
+NORMALISED = 'normalised'
+NEAR = 'near'
+MAX_TYPOS = 1
+
+# import_to_oscar creates products with UPC 'EPC-<part number>'
+UPC_PREFIX = 'EPC-'
+
+
+def part_number_for_upc(upc):
+    return upc[len(UPC_PREFIX):] if upc.startswith(UPC_PREFIX) else upc
+
+
+def matches(text):
+    """[(PartNumber, EXACT | NORMALISED | NEAR)] for a typed number, best first"""
+    key = PartNumber.normalize(text or '')
+    if not key:
+        return []
+    candidates = PartNumber.objects.filter(variants__variant__in=PartNumberVariant.of(key)).distinct()
+    ranked = []
+    for part_number in candidates:
+        if part_number.number == text:
+            ranked.append((0, part_number, EXACT))
+        elif part_number.normalized == key:
+            ranked.append((1, part_number, NORMALISED))
+        else:
+            # Shared variants also pair up some numbers two edits apart
+            distance = edit_distance(key, part_number.normalized, MAX_TYPOS)
+            if distance <= MAX_TYPOS:
+                ranked.append((1 + distance, part_number, NEAR))
+    ranked.sort(key=lambda row: (row[0], row[1].number))
+    return [(part_number, match) for _, part_number, match in ranked]
+
+
+def lookup(text, near=True):
+    """(PartNumber, EXACT | NORMALISED | NEAR) of the best match for a typed number, or (None, None)"""
+    found = matches(text)
+    if found and (near or found[0][1] != NEAR):
+        return found[0]
+    return None, None
+
+
+def near_misses(text, limit=5):
+    """PartNumbers one typo away from a typed number"""
+    return [part_number for part_number, match in matches(text) if match == NEAR][:limit]
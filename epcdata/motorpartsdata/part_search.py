@@ -0,0 +1,246 @@
+"""
+Inverted part search index kept in the database.
+
+Each PartNumber is indexed once, however many VINs use it, as the words of
+its number, the usage names of its Parts, its PricingData description and
+the child/parent diagram titles it appears under (WEIGHTS). A query word
+matches indexed words exactly or by prefix through the unique term index,
+and falls back to trigram candidates checked by edit distance when nothing
+starts with it, so "bracekt" still finds "bracket". Every query word must
+match (AND) and results are ranked by summed weights.
+
+Queries touch only the postings of the matched words, so their cost follows
+the number of distinct part numbers rather than Part rows across VINs, and
+are scored, ranked and paged in the database.
+ingest and loadprices re-index the numbers they write; rebuild_part_search
+rebuilds everything.
+"""
+import functools
+import logging
+import operator
+import re
+
+from django.db import transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, Max, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Part, PartNumber, PricingData, SearchPosting, SearchTerm, SearchTrigram
+
+logger = logging.getLogger(__name__)
+
+WEIGHTS = {'number': 4, 'usage_name': 3, 'description': 2, 'title': 1}
+# Score multiplier by how a query word matched the indexed word
+EXACT, PREFIX, FUZZY = 1.0, 0.75, 0.5
+MIN_PREFIX_LENGTH = 2  # shorter query words only match exactly
+MAX_TERM_LENGTH = SearchTerm._meta.get_field('term').max_length
+MAX_EXPANSIONS = 100  # indexed words a prefix may expand to
+FUZZY_MIN_LENGTH = 4
+FUZZY_CANDIDATES = 50
+BATCH_SIZE = 1000
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Lower-cased alphanumeric words of a text"""
+    return WORD_RE.findall(text.lower()) if text else []
+
+
+def compact(text):
+    """A part number with case and separators removed: 'B0000-3507' -> 'b00003507'"""
+    return ''.join(tokenize(text))
+
+
+def trigrams(term):
+    return {f" {term} "[i:i + 3] for i in range(len(term))}
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (a transposition counts as one edit), or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def max_typos(word):
+    # One wrong digit already names a different part, so numbers get one edit
+    return 1 if len(word) < 8 or not word.isalpha() else 2
+
+
+def document_terms(number, usage_names=(), description=None, titles=()):
+    """{term: weight} for one part number's text, keeping each term's strongest field"""
+    fields = [('number', [number]), ('usage_name', usage_names), ('description', [description]), ('title', titles)]
+    terms = {}
+    for field, texts in fields:
+        weight = WEIGHTS[field]
+        for text in texts:
+            words = tokenize(text)
+            if field == 'number':
+                words.append(compact(text))
+            for word in words:
+                word = word[:MAX_TERM_LENGTH]
+                if terms.get(word, 0) < weight:
+                    terms[word] = weight
+    return terms
+
+
+def resolve_terms(terms):
+    """{term: SearchTerm id}, creating missing terms and their trigrams"""
+    terms = list(set(terms))
+    ids = {}
+    for start in range(0, len(terms), BATCH_SIZE):
+        ids.update(SearchTerm.objects.filter(term__in=terms[start:start + BATCH_SIZE]).values_list('term', 'id'))
+    missing = [term for term in terms if term not in ids]
+    if missing:
+        # ignore_conflicts: a concurrent indexer may have created some meanwhile
+        SearchTerm.objects.bulk_create(
+            [SearchTerm(term=term) for term in missing],
+            ignore_conflicts=True, batch_size=BATCH_SIZE,
+        )
+        created = {}
+        for start in range(0, len(missing), BATCH_SIZE):
+            created.update(SearchTerm.objects.filter(term__in=missing[start:start + BATCH_SIZE]).values_list('term', 'id'))
+        SearchTrigram.objects.bulk_create(
+            [SearchTrigram(trigram=trigram, term_id=term_id) for term, term_id in created.items() for trigram in trigrams(term)],
+            ignore_conflicts=True, batch_size=BATCH_SIZE,
+        )
+        ids.update(created)
+    return ids
+
+
+def index_part_numbers(part_number_ids):
+    """(Re)index the given PartNumber ids from their current Parts and pricing; returns how many were indexed"""
+    part_number_ids = sorted(set(part_number_ids))
+    indexed = 0
+    for start in range(0, len(part_number_ids), BATCH_SIZE):
+        chunk = part_number_ids[start:start + BATCH_SIZE]
+        numbers = dict(PartNumber.objects.filter(id__in=chunk).values_list('id', 'number'))
+        usage_names = {part_number_id: set() for part_number_id in numbers}
+        titles = {part_number_id: set() for part_number_id in numbers}
+        for part_number_id, usage_name, child, parent in Part.objects.filter(canonical_id__in=chunk).values_list(
+            'canonical_id', 'usage_name', 'child_title__title', 'child_title__parent__title',
+        ).distinct():
+            usage_names[part_number_id].add(usage_name)
+            titles[part_number_id].update((child, parent))
+        descriptions = dict(PricingData.objects.filter(part_number_id__in=chunk).values_list('part_number_id', 'description'))
+
+        documents = {
+            part_number_id: document_terms(number, usage_names[part_number_id], descriptions.get(part_number_id),
+                                           titles[part_number_id])
+            for part_number_id, number in numbers.items()
+        }
+        with transaction.atomic():
+            term_ids = resolve_terms(term for terms in documents.values() for term in terms)
+            SearchPosting.objects.filter(part_number_id__in=chunk).delete()
+            SearchPosting.objects.bulk_create([
+                SearchPosting(term_id=term_ids[term], part_number_id=part_number_id, weight=weight)
+                for part_number_id, terms in documents.items()
+                for term, weight in terms.items()
+            ], batch_size=BATCH_SIZE)
+        indexed += len(documents)
+    return indexed
+
+
+def rebuild_index():
+    """Drop and rebuild the whole index; returns {'part_numbers': n, 'terms': n}"""
+    with transaction.atomic():
+        SearchPosting.objects.all().delete()
+        SearchTrigram.objects.all().delete()
+        SearchTerm.objects.all().delete()
+        indexed = index_part_numbers(PartNumber.objects.values_list('id', flat=True))
+    stats = {'part_numbers': indexed, 'terms': SearchTerm.objects.count()}
+    logger.info(f"Part search index rebuilt: {stats['part_numbers']} part numbers, {stats['terms']} terms")
+    return stats
+
+
+def _fuzzy_terms(word):
+    """{term id: FUZZY} for indexed words within max_typos() edits of word"""
+    grams = trigrams(word)
+    candidates = (
+        SearchTrigram.objects.filter(trigram__in=grams).values('term_id')
+        .annotate(shared=Count('id')).order_by('-shared')[:FUZZY_CANDIDATES]
+    )
+    ids = [row['term_id'] for row in candidates]
+    limit = max_typos(word)
+    return {
+        term_id: FUZZY
+        for term_id, term in SearchTerm.objects.filter(id__in=ids).values_list('id', 'term')
+        if edit_distance(word, term, limit) <= limit
+    }
+
+
+def matching_terms(word, fuzzy=True):
+    """{term id: match factor} for one query word: exact and prefix matches, else near misses"""
+    if len(word) < MIN_PREFIX_LENGTH:
+        return {term_id: EXACT for term_id in SearchTerm.objects.filter(term=word).values_list('id', flat=True)}
+    # startswith is served by the unique index on PostgreSQL (varchar_pattern_ops)
+    terms = dict(SearchTerm.objects.filter(term__startswith=word).order_by('term').values_list('id', 'term')[:MAX_EXPANSIONS])
+    if terms:
+        return {term_id: EXACT if term == word else PREFIX for term_id, term in terms.items()}
+    if fuzzy and len(word) >= FUZZY_MIN_LENGTH:
+        return _fuzzy_terms(word)
+    return {}
+
+
+def _word_score(factors):
+    """A part number's best weight x match factor over the terms in factors, NULL if it has none of them"""
+    by_factor = {}
+    for term_id, factor in factors.items():
+        by_factor.setdefault(factor, []).append(term_id)
+    return Max(Case(
+        *[When(term_id__in=ids, then=ExpressionWrapper(F('weight') * Value(factor), output_field=FloatField()))
+          for factor, ids in sorted(by_factor.items(), reverse=True)],
+        default=None, output_field=FloatField(),
+    ))
+
+
+def ranked(query, part_numbers=None):
+    """
+    Queryset of (part number id, score) matching every word of the query,
+    best first, ranked and counted by the database so callers can slice a
+    page and count() without reading every hit. A query of several words
+    including a number also matches a part number typed with separators
+    ("b0000 3507"). part_numbers (a PartNumber queryset) restricts the hits.
+    """
+    words = [word[:MAX_TERM_LENGTH] for word in tokenize(query)]
+    factors = [matching_terms(word) for word in words]
+    compact_factors = {}
+    if len(words) > 1 and any(word.isdigit() for word in words):
+        compact_factors = matching_terms(compact(query)[:MAX_TERM_LENGTH], fuzzy=False)
+    if not (words and all(factors)) and not compact_factors:
+        return SearchPosting.objects.none().values_list('part_number_id', 'weight')
+
+    scores = {}
+    total = Value(0.0)
+    if words and all(factors):
+        scores = {f'word{index}': _word_score(word_factors) for index, word_factors in enumerate(factors)}
+        # NULL, so 0, unless every word matched
+        total = Coalesce(functools.reduce(operator.add, (F(name) for name in scores)), Value(0.0))
+    if compact_factors:
+        scores['compact'] = _word_score(compact_factors)
+        total = Greatest(total, Coalesce(F('compact'), Value(0.0)))
+
+    term_ids = set(compact_factors).union(*factors)
+    postings = SearchPosting.objects.filter(term_id__in=list(term_ids))
+    if part_numbers is not None:
+        postings = postings.filter(part_number__in=part_numbers)
+    return (
+        postings.values('part_number_id').annotate(**scores).annotate(score=total)
+        .filter(score__gt=0).order_by('-score', 'part_number_id').values_list('part_number_id', 'score')
+    )
+
+
+def search(query, limit=None):
+    """[(part number id, score)] of the part numbers matching every word of the query, best first"""
+    hits = ranked(query)
+    return list(hits[:limit] if limit is not None else hits)
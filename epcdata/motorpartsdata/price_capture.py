@@ -0,0 +1,144 @@
+"""
+Capture of one part's pricing from the XT pricing page.
+
+Instead of sleeping a fixed time after each search and dumping every input,
+select and textarea on the page, the scraper polls one small script that
+reads just the INDEX_MAPPING inputs and the warehouse/stock row, and stops
+once they differ from what the page showed before the search, include the
+warehouse/stock row and have held still for a few hundred milliseconds, so
+a page filled in over several steps is not saved half-updated. A search
+whose result renders exactly like the previous one (e.g. two unknown codes),
+or that never shows a stock row, is accepted after the settle window. The result
+is written in the same JSON shape loadprices reads. Works with any
+object exposing Selenium's execute_script(), and needs neither Selenium nor
+Django to import.
+"""
+import logging
+import statistics
+import time
+from datetime import datetime
+
+from .pricing_values import INDEX_MAPPING
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_INDEXES = sorted(INDEX_MAPPING)
+# The search box is one of the captured inputs, so it is not a sign the page has updated
+SEARCH_INDEX = 3
+# Inline styles identifying the row that holds the warehouse and stock cells
+WHS_ROW_STYLES = (
+    'overflow: hidden', 'user-select: none', 'height: 19px', 'position: relative',
+    'z-index: 0', 'width: 1072px', 'border-bottom-color: transparent',
+)
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_POLL = 0.05
+# How long a changed page must stay the same before it counts as updated
+DEFAULT_STABLE = 0.3
+# How long an unchanged page is waited on before it is taken as the result (the old fixed sleep)
+DEFAULT_SETTLE = 2.0
+
+CAPTURE_SCRIPT = """
+const wanted = arguments[0];
+const rowStyles = arguments[1];
+const inputs = document.querySelectorAll('input');
+const values = {};
+wanted.forEach(i => { values[i] = i < inputs.length ? (inputs[i].value || '') : ''; });
+let whsStock = {};
+for (const row of document.querySelectorAll('div[style]')) {
+    const style = row.getAttribute('style');
+    if (!rowStyles.every(part => style.includes(part))) continue;
+    const cells = Array.from(row.querySelectorAll('div[style]'))
+        .filter(cell => cell.getAttribute('style').includes('z-index: 3'));
+    if (cells.length >= 2) {
+        whsStock = {whs: cells[0].textContent.trim(), stock_available: cells[1].textContent.trim()};
+    }
+    break;
+}
+return {values: values, whs_stock: whsStock};
+"""
+
+
+class CaptureTimeout(Exception):
+    pass
+
+
+def capture(driver):
+    """{'values': {index: value}, 'whs_stock': {...}} as the page shows them now (one round trip)"""
+    snapshot = driver.execute_script(CAPTURE_SCRIPT, CAPTURE_INDEXES, list(WHS_ROW_STYLES))
+    # JSON object keys come back as strings
+    snapshot['values'] = {int(index): value for index, value in snapshot['values'].items()}
+    return snapshot
+
+
+def signature(snapshot):
+    """What must change for the page to count as showing the next part"""
+    values = tuple(value for index, value in sorted(snapshot['values'].items()) if index != SEARCH_INDEX)
+    return values, tuple(sorted(snapshot['whs_stock'].items()))
+
+
+def wait_for_update(driver, previous, timeout=DEFAULT_TIMEOUT, poll=DEFAULT_POLL, stable=DEFAULT_STABLE,
+                    settle=DEFAULT_SETTLE):
+    """
+    Poll capture() until the page differs from the previous snapshot, shows
+    its warehouse/stock row and has stayed the same for stable seconds, and
+    return that snapshot. A page still matching the previous snapshot, or
+    without a stock row, after settle seconds is returned as it is. Raises
+    CaptureTimeout if the page is still changing after timeout seconds.
+    """
+    started = time.monotonic()
+    before = signature(previous) if previous is not None else None
+    last = None
+    changed_at = started
+    while True:
+        snapshot = capture(driver)
+        current = signature(snapshot)
+        now = time.monotonic()
+        if current != last:
+            last, changed_at = current, now
+        elif now - changed_at >= stable:
+            if (current != before and snapshot['whs_stock']) or now - started >= settle:
+                return snapshot
+        if now - started >= timeout:
+            raise CaptureTimeout(f"pricing page did not settle within {timeout:.1f}s")
+        time.sleep(poll)
+
+
+def to_form_data(snapshot):
+    """The snapshot in the scraper's JSON format, with only the captured positions of allInputs filled"""
+    all_inputs = [{} for _ in range(max(CAPTURE_INDEXES) + 1)]
+    for index, value in snapshot['values'].items():
+        all_inputs[index] = {'index': index, 'value': value}
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'allInputs': all_inputs,
+        'whs_stock': snapshot['whs_stock'],
+    }
+
+
+class LatencyStats:
+    """Per-part timings of a scraping session"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.waits = []
+        self.totals = []
+
+    def add(self, code, wait, total):
+        self.waits.append(wait)
+        self.totals.append(total)
+        logger.info(f"{code}: page updated after {wait * 1000:.0f} ms, {total * 1000:.0f} ms in total")
+
+    def summary(self):
+        if not self.totals:
+            return {'parts': 0}
+        totals = sorted(self.totals)
+        elapsed = time.perf_counter() - self.started
+        return {
+            'parts': len(totals),
+            'mean_ms': round(statistics.mean(totals) * 1000),
+            'p50_ms': round(statistics.median(totals) * 1000),
+            'p95_ms': round(totals[min(len(totals) - 1, int(len(totals) * 0.95))] * 1000),
+            'max_ms': round(totals[-1] * 1000),
+            'mean_wait_ms': round(statistics.mean(self.waits) * 1000),
+            'parts_per_minute': round(len(totals) * 60 / elapsed, 1) if elapsed else None,
+        }
@@ -0,0 +1,138 @@
+"""
+Set-based pricing lookups for the Serial -> ParentTitle -> ChildTitle -> Part chain.
+
+Every function here issues a fixed number of queries no matter how many
+parents, diagrams or parts a serial has, so they are safe to call from views
+and from the maintenance scripts (missing_pricing_parts.py, findmissing.py).
+"""
+from django.db.models import Exists, F, OuterRef
+
+from .models import Part, PricingData, SerialPart
+
+MISSING = 'Data Missing'
+
+# Columns pulled in the single joined query behind serial_parts_pricing()
+PRICING_ROW_FIELDS = (
+    'id',
+    'part_number',
+    'usage_name',
+    'child_title__title',
+    'child_title__parent__title',
+    'canonical__pricing_data__id',
+    'canonical__pricing_data__description',
+    'canonical__pricing_data__list_price',
+    'canonical__pricing_data__stock_order',
+)
+
+
+def serial_parts_queryset(serial):
+    """All Part rows for a serial (SerialNumber instance or id), in catalogue order"""
+    return Part.objects.filter(child_title__parent__serial_number=serial).order_by(
+        'child_title__parent_id', 'child_title_id', 'id'
+    )
+
+
+def serial_parts_pricing(serial):
+    """
+    Return one row per distinct part number used by a serial, with its pricing.
+
+    The first Part instance seen for a part number (in parent -> child -> part
+    order) is the one reported, matching the old nested-loop behaviour. Rows
+    are plain dicts shaped for the parts_pricing templates; missing pricing
+    columns are filled with 'Data Missing'. Runs exactly one query.
+    """
+    rows = serial_parts_queryset(serial).values_list(*PRICING_ROW_FIELDS)
+
+    parts_data = []
+    seen_part_numbers = set()
+    for (part_id, part_number, usage_name, child_title, parent_title,
+         pricing_id, description, list_price, stock_order) in rows:
+        if part_number in seen_part_numbers:
+            continue
+        seen_part_numbers.add(part_number)
+
+        has_pricing = pricing_id is not None
+        if has_pricing:
+            description = description or 'N/A'
+            list_price = 'N/A' if list_price is None else list_price
+            stock_order = 'N/A' if stock_order is None else stock_order
+        else:
+            description = list_price = stock_order = MISSING
+
+        parts_data.append({
+            'part': {'id': part_id, 'part_number': part_number, 'usage_name': usage_name},
+            'description': description,
+            'list_price': list_price,
+            'stock_order': stock_order,
+            'has_pricing': has_pricing,
+            'parent_title': parent_title,
+            'child_title': child_title,
+        })
+
+    # "Data Missing" entries first; sort is stable so catalogue order is kept
+    parts_data.sort(key=lambda x: x['has_pricing'])
+    return parts_data
+
+
+def pricing_summary(parts_data):
+    """Totals shown in the header cards of the parts pricing pages"""
+    with_pricing = sum(1 for p in parts_data if p['has_pricing'])
+    return {
+        'total_parts': len(parts_data),
+        'missing_pricing': len(parts_data) - with_pricing,
+        'with_pricing': with_pricing,
+    }
+
+
+def serial_part_numbers(serial):
+    """Set of distinct part numbers used by a serial (one query on SerialPart's index)"""
+    return set(
+        SerialPart.objects.filter(serial_number=serial).order_by()
+        .values_list('part_number__number', flat=True).distinct()
+    )
+
+
+def missing_pricing_part_numbers(serial):
+    """Sorted part numbers of a serial that have no pricing (one query)"""
+    return list(
+        SerialPart.objects.filter(serial_number=serial, part_number__pricing_data__isnull=True)
+        .order_by('part_number__number').values_list('part_number__number', flat=True).distinct()
+    )
+
+
+def part_instances_pricing(part_numbers):
+    """
+    Map part number -> [(part_id, has_pricing), ...] for every Part instance
+    sharing those numbers, across all serials (one query).
+    """
+    instances = {}
+    rows = (
+        Part.objects.filter(part_number__in=list(part_numbers))
+        .annotate(has_pricing=Exists(PricingData.objects.filter(part_number=OuterRef('canonical_id'))))
+        .order_by('id')
+        .values_list('part_number', 'id', 'has_pricing')
+    )
+    for part_number, part_id, has_pricing in rows:
+        instances.setdefault(part_number, []).append((part_id, has_pricing))
+    return instances
+
+
+def in_stock_parts_under(serial, max_price):
+    """
+    Active, in-stock parts of a serial priced at or below max_price, cheapest
+    first, as dicts (one query on the indexed typed pricing columns).
+    """
+    return list(
+        serial_parts_queryset(serial)
+        .filter(
+            canonical__pricing_data__active=True,
+            canonical__pricing_data__stock_qty__gt=0,
+            canonical__pricing_data__list_price__lte=max_price,
+        )
+        .order_by('canonical__pricing_data__list_price', 'part_number', 'id')
+        .values(
+            'id', 'part_number', 'usage_name',
+            list_price=F('canonical__pricing_data__list_price'),
+            stock_qty=F('canonical__pricing_data__stock_qty'),
+        )
+    )
@@ -0,0 +1,73 @@
+"""
+Where the pricing scraper finds each value on the pricing page, and parsing of
+the captured text into PricingData's typed columns. Kept free of Django
+imports so the scraper and loaders can both use it (migration 0010 keeps
+its own copy of the parsers).
+"""
+from decimal import Decimal, InvalidOperation
+
+PRICE_PLACES = Decimal('0.01')
+# PricingData price columns are DecimalField(max_digits=10, decimal_places=2)
+MAX_PRICE = Decimal('99999999.99')
+
+# Position of each PricingData value among the pricing page's <input>s
+# (see the comments in models.py); the scraper captures only these
+INDEX_MAPPING = {
+    3: 'part_number_value',  # Used to lookup Part instance
+    8: 'replacement',        # index 8
+    4: 'description',        # index 4
+    5: 'active',            # index 5
+    10: 'oldest',           # index 10
+    55: 'range_code',       # index 55
+    13: 'discount_code',    # index 13
+    14: 'class_code',       # index 14
+    22: 'vat_code',         # index 22
+    24: 'list_price',       # index 24
+    29: 'vor',              # index 29
+    34: 'stock_order',      # index 34
+    41: 'replacement_code', # index 41
+}
+
+ACTIVE_CODE = 'A'
+INACTIVE_CODE = 'S'
+
+
+def parse_price(value):
+    """A price such as "£1,234.50" as a 2 place Decimal, or None"""
+    if value is None or value == '':
+        return None
+    try:
+        price = Decimal(str(value).replace('£', '').replace(',', '').strip())
+    except (InvalidOperation, ValueError):
+        return None
+    if not price.is_finite() or abs(price) > MAX_PRICE:
+        return None
+    return price.quantize(PRICE_PLACES)
+
+
+def parse_stock(value):
+    """A stock level such as "Nil", "10+" or "3" as a count ("10+" counts as 10)"""
+    if not value:
+        return 0
+    stock_str = str(value).strip()
+    if stock_str.lower() == 'nil' or stock_str == '0':
+        return 0
+    if stock_str.endswith('+'):
+        # For values like '10+', the number is used as the minimum
+        try:
+            return int(stock_str.replace('+', ''))
+        except ValueError:
+            return 10
+    try:
+        return int(float(stock_str.replace(',', '')))
+    except (ValueError, TypeError):
+        return 0
+
+
+def parse_active(value):
+    """The EPC status code: "A" (active) is True, any other code False, blank None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().upper() == ACTIVE_CODE
@@ -0,0 +1,171 @@
+"""
+Persistent work queue of part numbers whose pricing should be scraped.
+
+There is one PriceScrapeJob per PartNumber, so enqueueing is de-duplicated.
+Part numbers without pricing come first, then those used by the most
+serials. Scrapers claim a batch, report each job done or failed, and a
+failed job is retried after an exponential backoff until MAX_ATTEMPTS.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import PartNumber, PriceScrapeJob, PricingData
+
+logger = logging.getLogger(__name__)
+
+# Outranks any serial count, so unpriced numbers are always scraped first
+UNPRICED_WEIGHT = 100000
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 60
+MAX_BACKOFF_SECONDS = 6 * 60 * 60
+# Claimed jobs not reported back within this time are handed out again
+CLAIM_TIMEOUT = timedelta(minutes=30)
+BATCH_SIZE = 1000
+
+
+def priority_for(serials, has_pricing):
+    return serials + (0 if has_pricing else UNPRICED_WEIGHT)
+
+
+def backoff(attempts):
+    """Delay before retrying a job that has failed attempts times"""
+    return timedelta(seconds=min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS))
+
+
+def enqueue(numbers=None, unpriced_only=False):
+    """
+    Queue part numbers (all used by any serial if numbers is None), returning
+    {'created': n, 'requeued': n}.
+
+    Jobs already pending get their priority refreshed; finished or failed ones
+    are queued again with their attempts reset. Claimed jobs are left alone.
+    Unknown numbers are ignored.
+    """
+    if numbers is None:
+        candidates = PartNumber.objects.filter(serial_parts__isnull=False)
+    else:
+        candidates = PartNumber.objects.filter(number__in=list(numbers))
+    rows = candidates.annotate(
+        serials=Count('serial_parts__serial_number', distinct=True),
+        has_pricing=Exists(PricingData.objects.filter(part_number_id=OuterRef('pk'))),
+    ).order_by().values_list('id', 'serials', 'has_pricing')
+    priorities = {
+        part_number_id: priority_for(serials, has_pricing)
+        for part_number_id, serials, has_pricing in rows
+        if not (unpriced_only and has_pricing)
+    }
+
+    now = timezone.now()
+    stats = {'created': 0, 'requeued': 0}
+    ids = list(priorities)
+    with transaction.atomic():
+        existing = {}
+        for start in range(0, len(ids), BATCH_SIZE):
+            for job in PriceScrapeJob.objects.filter(part_number_id__in=ids[start:start + BATCH_SIZE]):
+                existing[job.part_number_id] = job
+
+        to_create = []
+        to_update = []
+        for part_number_id, priority in priorities.items():
+            job = existing.get(part_number_id)
+            if job is None:
+                to_create.append(PriceScrapeJob(part_number_id=part_number_id, priority=priority, next_attempt_at=now))
+            elif job.status != PriceScrapeJob.CLAIMED:
+                if job.status != PriceScrapeJob.PENDING:
+                    job.status = PriceScrapeJob.PENDING
+                    job.attempts = 0
+                    job.next_attempt_at = now
+                    job.last_error = ''
+                    stats['requeued'] += 1
+                job.priority = priority
+                job.updated_at = now
+                to_update.append(job)
+        # ignore_conflicts: a concurrent enqueue may have created some meanwhile
+        PriceScrapeJob.objects.bulk_create(to_create, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        PriceScrapeJob.objects.bulk_update(
+            to_update, ['status', 'priority', 'attempts', 'next_attempt_at', 'last_error', 'updated_at'],
+            batch_size=BATCH_SIZE,
+        )
+    stats['created'] = len(to_create)
+    logger.info(f"Queued {stats['created']} new price scrape jobs, re-queued {stats['requeued']}")
+    return stats
+
+
+def claim(batch_size, worker):
+    """
+    Hand the next batch_size due jobs to worker, highest priority first.
+    Returns them with part_number loaded.
+    """
+    now = timezone.now()
+    due = Q(status=PriceScrapeJob.PENDING, next_attempt_at__lte=now) | Q(
+        status=PriceScrapeJob.CLAIMED, claimed_at__lt=now - CLAIM_TIMEOUT,
+    )
+    with transaction.atomic():
+        # skip_locked lets concurrent workers claim disjoint batches (no-op on SQLite)
+        jobs = list(
+            PriceScrapeJob.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(due).select_related('part_number').order_by('-priority', 'id')[:batch_size]
+        )
+        PriceScrapeJob.objects.filter(id__in=[job.id for job in jobs]).update(
+            status=PriceScrapeJob.CLAIMED, claimed_by=worker, claimed_at=now, updated_at=now,
+        )
+    for job in jobs:
+        job.status, job.claimed_by, job.claimed_at = PriceScrapeJob.CLAIMED, worker, now
+    return jobs
+
+
+def complete(job):
+    job.status = PriceScrapeJob.DONE
+    job.attempts += 1
+    job.last_error = ''
+    job.save(update_fields=['status', 'attempts', 'last_error', 'updated_at'])
+
+
+def fail(job, error):
+    """Record a failed attempt: retry after backoff, or give up after MAX_ATTEMPTS"""
+    job.attempts += 1
+    job.last_error = str(error)
+    if job.attempts >= MAX_ATTEMPTS:
+        job.status = PriceScrapeJob.FAILED
+    else:
+        job.status = PriceScrapeJob.PENDING
+        job.next_attempt_at = timezone.now() + backoff(job.attempts)
+    job.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at', 'updated_at'])
+
+
+def work(scrape, worker, batch_size=50, limit=None):
+    """
+    Claim and process jobs until the queue has nothing due (or limit jobs ran).
+
+    scrape(part_number) does the capture and raises on failure; anything it
+    raises fails the job rather than stopping the run. Returns
+    {'done': n, 'failed': n}.
+    """
+    stats = {'done': 0, 'failed': 0}
+    while limit is None or stats['done'] + stats['failed'] < limit:
+        size = batch_size if limit is None else min(batch_size, limit - stats['done'] - stats['failed'])
+        jobs = claim(size, worker)
+        if not jobs:
+            break
+        for job in jobs:
+            try:
+                scrape(job.part_number.number)
+            except Exception as e:
+                logger.warning(f"Scrape of {job.part_number.number} failed (attempt {job.attempts + 1}): {e}")
+                fail(job, e)
+                stats['failed'] += 1
+            else:
+                complete(job)
+                stats['done'] += 1
+    return stats
+
+
+def queue_summary():
+    """Job count per status"""
+    summary = dict.fromkeys([status for status, _ in PriceScrapeJob.STATUS_CHOICES], 0)
+    summary.update(PriceScrapeJob.objects.order_by().values_list('status').annotate(n=Count('id')))
+    return summary
@@ -0,0 +1,159 @@
+"""
+Haystack engine for Oscar's product search, answered from the part search
+index (motorpartsdata.part_search) instead of SimpleEngine's icontains scans.
+
+Matches are the products of the matched part numbers, found by their
+'EPC-<part number>' UPC (import_to_oscar) or the bare part number
+(scrapeandpush_oscar) and ranked by the index score, each superseded number
+followed by its current replacement. The database ranks, pages and counts
+the hits, so a page costs the same however many products a word matches.
+
+    HAYSTACK_CONNECTIONS = {'default': {'ENGINE': 'motorpartsdata.search_backend.PartSearchEngine'}}
+"""
+from itertools import islice
+
+from django.db.models import CharField, Exists, OuterRef, Q, Value
+from django.db.models.functions import Concat
+from haystack.backends import BaseEngine, log_query
+from haystack.backends.simple_backend import SimpleSearchBackend, SimpleSearchQuery
+from haystack.models import SearchResult
+from oscar.core.loading import get_model
+
+from . import part_search
+from .models import PartNumber, Supersession
+from .part_lookup import UPC_PREFIX, part_number_for_upc
+
+BATCH_SIZE = 1000
+
+
+def follow_replacements(chunks, successors=None):
+    """
+    Yield (part number id, score) from chunks of ranked hits, each superseded
+    hit followed by its current replacement (limited to the successors
+    queryset when given), and nothing listed twice. Each chunk is one query,
+    so taking a prefix reads only the chunks it needs.
+    """
+    listed = set()
+    for chunk in chunks:
+        rows = Supersession.objects.filter(part_number_id__in=[part_number_id for part_number_id, _ in chunk],
+                                           is_current=True)
+        if successors is not None:
+            rows = rows.filter(successor__in=successors)
+        replacements = dict(rows.values_list('part_number_id', 'successor_id'))
+        for part_number_id, score in chunk:
+            for listed_id in (part_number_id, replacements.get(part_number_id)):
+                if listed_id is not None and listed_id not in listed:
+                    listed.add(listed_id)
+                    yield listed_id, score
+
+
+def with_replacements(ranked):
+    """Follow each superseded hit with its current replacement, unless that is already listed"""
+    return list(follow_replacements(ranked[start:start + BATCH_SIZE] for start in range(0, len(ranked), BATCH_SIZE)))
+
+
+def with_products():
+    """PartNumbers with a browsable product, under either UPC form"""
+    Product = get_model('catalogue', 'Product')
+    return PartNumber.objects.filter(Exists(Product.objects.browsable().filter(
+        Q(upc=OuterRef('number')) | Q(upc=Concat(Value(UPC_PREFIX), OuterRef('number'), output_field=CharField())),
+    )))
+
+
+def hit_chunks(hits, size):
+    """Successive slices of a ranked queryset, one query each"""
+    offset = 0
+    while True:
+        chunk = list(hits[offset:offset + size])
+        if chunk:
+            yield chunk
+        if len(chunk) < size:
+            return
+        offset += size
+
+
+class PartSearchBackend(SimpleSearchBackend):
+    def update(self, indexer, iterable, commit=True):
+        numbers = [part_number_for_upc(product.upc) for product in iterable if product.upc]
+        ids = PartNumber.objects.filter(number__in=numbers).values_list('id', flat=True)
+        part_search.index_part_numbers(ids)
+
+    def remove(self, obj, commit=True):
+        # The index is kept per part number, not per product
+        pass
+
+    def clear(self, models=None, commit=True):
+        if models is None or get_model('catalogue', 'Product') in models:
+            part_search.rebuild_index()
+
+    @log_query
+    def search(self, query_string, start_offset=0, end_offset=None, models=None, result_class=None, **kwargs):
+        Product = get_model('catalogue', 'Product')
+        empty = {'results': [], 'hits': 0, 'facets': {}, 'spelling_suggestion': None}
+        if not query_string or query_string == '*' or (models and Product not in models):
+            return empty
+
+        part_numbers = with_products()
+        hits = part_search.ranked(query_string, part_numbers)
+        # Replacements that aren't hits themselves are extra rows
+        hit_ids = hits.values_list('part_number_id', flat=True)
+        extra = (
+            Supersession.objects.filter(part_number_id__in=hit_ids, is_current=True, successor__in=part_numbers)
+            .exclude(successor_id__in=hit_ids).values('successor_id').distinct().count()
+        )
+        hit_count = hits.count() + extra
+        if not hit_count:
+            return empty
+
+        # Only the hits up to the end of the page are read: one query, unless
+        # replacements listed earlier leave it a few rows short
+        size = min(end_offset or BATCH_SIZE, BATCH_SIZE) or 1
+        ranked = list(islice(follow_replacements(hit_chunks(hits, size), part_numbers), start_offset, end_offset))
+        numbers = dict(PartNumber.objects.filter(id__in=[part_number_id for part_number_id, _ in ranked])
+                       .values_list('id', 'number'))
+        products = {}
+        number_list = list(numbers.values())
+        for upc, product_id in Product.objects.browsable().filter(
+            upc__in=number_list + [f"{UPC_PREFIX}{number}" for number in number_list],
+        ).values_list('upc', 'id'):
+            # An EPC- product wins over a bare-UPC one for the same number
+            number = part_number_for_upc(upc)
+            if number not in products or upc.startswith(UPC_PREFIX):
+                products[number] = product_id
+        page = [
+            (products[numbers[part_number_id]], score) for part_number_id, score in ranked
+            if numbers.get(part_number_id) in products
+        ]
+
+        objects = Product.objects.browsable().base_queryset().in_bulk([product_id for product_id, _ in page])
+        result_class = result_class or SearchResult
+        results = []
+        for product_id, score in page:
+            product = objects.get(product_id)
+            if product is None:
+                continue
+            result = result_class(Product._meta.app_label, Product._meta.model_name, product_id, score)
+            # For efficiency, as in SimpleSearchBackend
+            result._model = Product
+            result._object = product
+            results.append(result)
+        return dict(empty, results=results, hits=hit_count)
+
+
+class PartSearchQuery(SimpleSearchQuery):
+    def _build_sub_query(self, search_node):
+        # part_search tokenises the text itself, so pass it through without
+        # the escaping and NOT handling that AutoQuery would add
+        term_list = []
+        for child in search_node.children:
+            if hasattr(child, 'children'):
+                term_list.append(self._build_sub_query(child))
+            else:
+                value = child[1]
+                term_list.append(str(getattr(value, 'query_string', value)))
+        return ' '.join(term_list)
+
+
+class PartSearchEngine(BaseEngine):
+    backend = PartSearchBackend
+    query = PartSearchQuery
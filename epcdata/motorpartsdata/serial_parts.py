@@ -0,0 +1,102 @@
+"""
+Queries on, and maintenance of, the SerialPart lookup table.
+
+SerialPart holds one row per Part with its serial and canonical part number
+denormalised, indexed both ways round, so serial-scoped questions no longer
+walk Serial -> ParentTitle -> ChildTitle -> Part.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import F
+
+from . import fitment
+from .models import Part, SerialPart
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def rows_for_parts(serial_id, parts):
+    """Unsaved SerialPart rows for saved Parts of one serial"""
+    return [
+        SerialPart(
+            part_id=part.pk,
+            serial_number_id=serial_id,
+            part_number_id=part.canonical_id,
+            child_title_id=part.child_title_id,
+            call_out_order=part.call_out_order,
+        )
+        for part in parts
+    ]
+
+
+def serials_using(part_number):
+    """Sorted serials whose diagrams use a part number (see pricing.serial_part_numbers for the reverse)"""
+    return list(
+        SerialPart.objects.filter(part_number__number=part_number).order_by('serial_number__serial')
+        .values_list('serial_number__serial', flat=True).distinct()
+    )
+
+
+def _stale(serial_ids):
+    rows = SerialPart.objects.exclude(
+        serial_number_id=F('part__child_title__parent__serial_number_id'),
+        part_number_id=F('part__canonical_id'),
+        child_title_id=F('part__child_title_id'),
+        call_out_order=F('part__call_out_order'),
+    )
+    return rows if serial_ids is None else rows.filter(serial_number_id__in=serial_ids)
+
+
+def refresh_serial_parts(serial_ids=None, full=False):
+    """
+    Bring SerialPart in line with Part, for the given serial ids or all of them.
+
+    Incremental by default: rows that no longer match their Part are rebuilt
+    and Parts without a row get one (rows of deleted Parts cascade away).
+    full deletes and rebuilds every row in scope. Returns
+    {'created': n, 'deleted': n}.
+    """
+    stats = {'created': 0, 'deleted': 0}
+    # Part numbers whose fitment may change: those losing rows and those gaining them
+    changed = set()
+    with transaction.atomic():
+        if full:
+            scope = SerialPart.objects.all()
+            if serial_ids is not None:
+                scope = scope.filter(serial_number_id__in=serial_ids)
+            changed.update(scope.values_list('part_number_id', flat=True).distinct())
+            stats['deleted'] = scope.delete()[0]
+        else:
+            stale = []
+            for part_id, part_number_id in _stale(serial_ids).values_list('part_id', 'part_number_id'):
+                stale.append(part_id)
+                changed.add(part_number_id)
+            for start in range(0, len(stale), BATCH_SIZE):
+                stats['deleted'] += SerialPart.objects.filter(part_id__in=stale[start:start + BATCH_SIZE]).delete()[0]
+
+        missing = Part.objects.filter(serial_part__isnull=True)
+        if serial_ids is not None:
+            missing = missing.filter(child_title__parent__serial_number_id__in=serial_ids)
+        batch = []
+        for part_id, serial_id, canonical_id, child_title_id, call_out_order in missing.order_by('id').values_list(
+            'id', 'child_title__parent__serial_number_id', 'canonical_id', 'child_title_id', 'call_out_order',
+        ):
+            changed.add(canonical_id)
+            batch.append(SerialPart(
+                part_id=part_id, serial_number_id=serial_id, part_number_id=canonical_id,
+                child_title_id=child_title_id, call_out_order=call_out_order,
+            ))
+            if len(batch) >= BATCH_SIZE:
+                SerialPart.objects.bulk_create(batch)
+                stats['created'] += len(batch)
+                batch = []
+        if batch:
+            SerialPart.objects.bulk_create(batch)
+            stats['created'] += len(batch)
+        fitment.update_part_numbers(changed)
+
+    logger.info(f"SerialPart refresh: {stats['created']} rows written, {stats['deleted']} removed")
+    return stats
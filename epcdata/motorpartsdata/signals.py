@@ -0,0 +1,78 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from oscar.core.loading import get_model
+
+from . import category_menu, diagrams, fitment
+from .models import ChildTitle, Part, SerialNumber, SerialPart
+
+Category = get_model('catalogue', 'Category')
+ProductCategory = get_model('catalogue', 'ProductCategory')
+
+
+@receiver(post_save, sender=ChildTitle)
+@receiver(post_delete, sender=ChildTitle)
+@receiver(post_save, sender=Part)
+@receiver(post_delete, sender=Part)
+def invalidate_diagram_cache(sender, **kwargs):
+    """Diagram lookups are cached per version; any catalogue edit retires them"""
+    diagrams.invalidate()
+
+
+@receiver(pre_save, sender=SerialPart)
+def remember_fitment(sender, instance, **kwargs):
+    """A renumbered Part takes its old number's fitment with it"""
+    if '_previous_fitment' not in instance.__dict__:
+        instance._previous_fitment = (
+            SerialPart.objects.filter(pk=instance.pk).values_list('serial_number_id', 'part_number_id').first()
+        )
+
+
+@receiver(post_save, sender=SerialPart)
+def update_part_fitment(sender, instance, **kwargs):
+    """Only a new row, or a changed serial or part number, changes fitment"""
+    previous = instance.__dict__.pop('_previous_fitment', None)
+    if previous == (instance.serial_number_id, instance.part_number_id):
+        return
+    fitment.update_part_numbers({instance.part_number_id, previous[1] if previous else None} - {None})
+
+
+@receiver(post_delete, sender=SerialPart)
+def remove_part_fitment(sender, instance, origin=None, **kwargs):
+    """
+    Deletes of objects only: queryset deletes come from ingest, which updates
+    fitment itself, or are bulk changes that refresh_serial_parts repairs.
+    A cascade (e.g. a deleted SerialNumber) sends this once per SerialPart
+    with the same origin, so the numbers are gathered on it and updated once
+    the delete commits.
+    """
+    if isinstance(origin, QuerySet):
+        return
+    origin = instance if origin is None else origin
+    pending = origin.__dict__.get('_fitment_part_number_ids')
+    if pending is None:
+        pending = origin.__dict__['_fitment_part_number_ids'] = set()
+
+        def update():
+            del origin.__dict__['_fitment_part_number_ids']
+            fitment.update_part_numbers(pending)
+
+        transaction.on_commit(update)
+    pending.add(instance.part_number_id)
+
+
+@receiver(post_save, sender=SerialNumber)
+@receiver(post_delete, sender=SerialNumber)
+def invalidate_fitment_cache(sender, **kwargs):
+    """Fitment caches serial -> id; a deleted serial's id may linger in the stored sets"""
+    fitment.invalidate()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+def invalidate_category_menu(sender, **kwargs):
+    """The menu tree holds names, urls and product counts"""
+    category_menu.invalidate()
@@ -0,0 +1,109 @@
+"""
+Supersession chains: which later numbers replace a part number, and which
+one is current (the number to order).
+
+The graph comes from the pricing records. PricingData.replacement names a
+number's direct replacement. PricingData.oldest names the first number of
+the chain a priced number belongs to, which gives an old number with no
+pricing of its own a way into the chain. rebuild() walks every chain once
+and stores the transitive closure in Supersession, so lookups are single
+indexed queries instead of row-by-row walks. Cycles in the data are cut
+where they close, and their numbers get no current replacement.
+"""
+import logging
+
+from django.db import transaction
+
+from .models import PartNumber, PricingData, Supersession
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def successors(records):
+    """
+    {number: next number} from (number, replacement, oldest) records.
+
+    Explicit replacements win. A number only known as the oldest of other
+    records is linked to one of them, preferring one that is itself current.
+    """
+    replaced_by = {}
+    implied = {}
+    for number, replacement, oldest in records:
+        replacement = (replacement or '').strip()
+        oldest = (oldest or '').strip()
+        if replacement and replacement != number:
+            replaced_by[number] = replacement
+        if oldest and oldest != number:
+            implied.setdefault(oldest, []).append(number)
+    for oldest, numbers in implied.items():
+        if oldest not in replaced_by:
+            replaced_by[oldest] = min(numbers, key=lambda number: (number in replaced_by, number))
+    return replaced_by
+
+
+def closure(replaced_by):
+    """
+    ([(number, successor, depth, is_current)], cycles): every later number
+    in each chain, with the chain's last number flagged current.
+    """
+    rows = []
+    cycles = 0
+    for number in replaced_by:
+        chain = [number]
+        seen = {number}
+        while chain[-1] in replaced_by:
+            following = replaced_by[chain[-1]]
+            if following in seen:
+                break
+            chain.append(following)
+            seen.add(following)
+        current = chain[-1] not in replaced_by
+        if not current:
+            cycles += 1
+        for depth, successor in enumerate(chain[1:], 1):
+            rows.append((number, successor, depth, current and successor == chain[-1]))
+    return rows, cycles
+
+
+def rebuild():
+    """Recompute the Supersession table from pricing; returns {'numbers', 'rows', 'cycles'}"""
+    records = PricingData.objects.values_list('part_number__number', 'replacement', 'oldest')
+    rows, cycles = closure(successors(records))
+    # Replacement numbers need not be on any diagram yet
+    ids = PartNumber.resolve({number for row in rows for number in row[:2]})
+    with transaction.atomic():
+        Supersession.objects.all().delete()
+        Supersession.objects.bulk_create([
+            Supersession(part_number_id=ids[number], successor_id=ids[successor], depth=depth, is_current=is_current)
+            for number, successor, depth, is_current in rows
+        ], batch_size=BATCH_SIZE)
+    stats = {'numbers': len({row[0] for row in rows}), 'rows': len(rows), 'cycles': cycles}
+    if cycles:
+        logger.warning(f"{cycles} part numbers lead into a supersession cycle and have no current replacement")
+    logger.info(f"Supersessions rebuilt: {stats['numbers']} superseded numbers, {stats['rows']} closure rows")
+    return stats
+
+
+def current_replacements(part_number_ids):
+    """{PartNumber id: current replacement PartNumber} for those that are superseded, one query"""
+    rows = Supersession.objects.filter(part_number_id__in=list(part_number_ids), is_current=True).select_related('successor')
+    return {row.part_number_id: row.successor for row in rows}
+
+
+def current_replacement(number):
+    """The current replacement PartNumber of a part number, or None if it is not superseded"""
+    row = (
+        Supersession.objects.filter(part_number__number=number, is_current=True)
+        .select_related('successor').first()
+    )
+    return row.successor if row else None
+
+
+def superseded_numbers(number):
+    """Older part numbers replaced, directly or not, by a part number, nearest first"""
+    return list(
+        Supersession.objects.filter(successor__number=number).order_by('depth', 'part_number__number')
+        .values_list('part_number__number', flat=True)
+    )
@@ -0,0 +1,266 @@
+"""
+Lossless-looking size reduction for EPC diagram SVGs.
+
+The SVGs are cut out of saved EPC pages by BeautifulSoup, so they carry the
+editor's whitespace, Snap/Illustrator metadata, full-precision coordinates and
+HTML-parser artefacts (lower-cased viewBox and friends). optimize_svg()
+rewrites them with:
+
+- metadata removed (<metadata>, "Created with ..." <desc>, empty <defs>,
+  editor-only root attributes, enable-background)
+- whitespace between elements and inside path data collapsed
+- coordinates rounded to `precision` decimals (transforms keep two more),
+  identity-scale matrix() transforms written as translate()
+- path data re-serialised with implicit repeated commands and minimal
+  separators
+- the <style> block minified (short hex colours), with rules that declare
+  identical properties merged into one selector list; presentation attributes
+  get short hex colours and lose stroke-miterlimit on round/bevel joins
+- attribute-less <g> wrappers unwrapped
+- SVG's camelCase element/attribute names restored
+
+ids, classes, text and inline styles are kept, since the product pages hook
+callout clicks on them. Like epc_html, this module has no Django imports so
+it runs inside the ingest worker pool.
+"""
+import re
+import xml.etree.ElementTree as ET
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+XML_NS = 'http://www.w3.org/XML/1998/namespace'
+
+ET.register_namespace('', SVG_NS)
+ET.register_namespace('xlink', XLINK_NS)
+
+DEFAULT_PRECISION = 2
+
+# HTML parsers lower-case everything; SVG is case-sensitive once served as XML
+CAMEL_CASE_TAGS = {name.lower(): name for name in (
+    'clipPath', 'linearGradient', 'radialGradient', 'textPath', 'foreignObject',
+    'feGaussianBlur', 'feOffset', 'feBlend', 'feColorMatrix', 'feMerge', 'feMergeNode',
+    'feFlood', 'feComposite', 'feMorphology',
+)}
+CAMEL_CASE_ATTRIBUTES = {name.lower(): name for name in (
+    'viewBox', 'preserveAspectRatio', 'gradientUnits', 'gradientTransform',
+    'patternUnits', 'patternContentUnits', 'patternTransform', 'clipPathUnits',
+    'maskUnits', 'maskContentUnits', 'markerWidth', 'markerHeight', 'markerUnits',
+    'refX', 'refY', 'textLength', 'lengthAdjust', 'startOffset', 'spreadMethod',
+    'stdDeviation', 'baseFrequency', 'numOctaves', 'filterUnits', 'primitiveUnits',
+)}
+
+# Elements whose character data is content, not indentation
+TEXT_TAGS = {'text', 'tspan', 'textPath', 'style', 'title', 'desc'}
+DROPPED_TAGS = {'metadata'}
+COORDINATE_ATTRIBUTES = {
+    'x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'r', 'rx', 'ry',
+    'width', 'height', 'stroke-width', 'font-size',
+}
+# Editor output that has no effect on rendering
+ROOT_DROPPED_ATTRIBUTES = {'version', f'{{{XML_NS}}}space'}
+DROPPED_DECLARATIONS = {'enable-background'}
+DROPPED_ATTRIBUTES = {'enable-background'}
+COLOR_ATTRIBUTES = {'fill', 'stroke', 'stop-color', 'flood-color', 'lighting-color'}
+# Leaf shapes: nothing inherits from them, so attributes they cannot use are dead
+SHAPE_TAGS = {'path', 'line', 'polyline', 'polygon', 'rect', 'circle', 'ellipse'}
+
+NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+PLAIN_NUMBER = re.compile(rf'^\s*{NUMBER.pattern}\s*$')
+PATH_SEGMENT = re.compile(r'([MmZzLlHhVvCcSsQqTtAa])([^MmZzLlHhVvCcSsQqTtAa]*)')
+HEX_COLOR = re.compile(r'#([0-9a-fA-F])\1([0-9a-fA-F])\2([0-9a-fA-F])\3\b')
+IDENTITY_MATRIX = re.compile(r'matrix\(\s*1[ ,]+0[ ,]+0[ ,]+1[ ,]+([^ ,()]+)[ ,]+([^ ,()]+)\s*\)')
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_RULE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+
+
+def format_number(value, precision):
+    """Shortest decimal form of value rounded to precision places"""
+    text = f'{round(float(value), precision):.{precision}f}'
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    if text in ('-0', ''):
+        return '0'
+    if text.startswith('0.'):
+        return text[1:]
+    if text.startswith('-0.'):
+        return '-' + text[2:]
+    return text
+
+
+def round_numbers(text, precision):
+    return NUMBER.sub(lambda match: format_number(match.group(), precision), text)
+
+
+def join_numbers(numbers):
+    """Numbers separated by commas, except where a minus sign already separates them"""
+    return ''.join(number if index == 0 or number.startswith('-') else ',' + number
+                   for index, number in enumerate(numbers))
+
+
+def optimize_path_data(d, precision):
+    segments = PATH_SEGMENT.findall(d)
+    if not segments or PATH_SEGMENT.sub('', d).strip(' \t\r\n,'):
+        return d  # not path data we understand; leave it alone
+    parts = []
+    previous = None
+    for command, arguments in segments:
+        numbers = [format_number(number, precision) for number in NUMBER.findall(arguments)]
+        # A repeated command letter is implied, except after moveto (which would become lineto)
+        if command == previous and command not in 'Mm' and numbers:
+            parts.append(('' if numbers[0].startswith('-') else ',') + join_numbers(numbers))
+        else:
+            parts.append(command + join_numbers(numbers))
+        previous = command
+    return ''.join(parts)
+
+
+def optimize_points(points, precision):
+    points = round_numbers(points, precision)
+    points = re.sub(r'\s*,\s*', ',', points)
+    return re.sub(r'\s+', ' ', points).strip()
+
+
+def minify_declarations(declarations):
+    """'a: b; c: d;' -> 'a:b;c:d', dropping properties that no longer render"""
+    kept = []
+    for declaration in declarations.split(';'):
+        name, _, value = declaration.partition(':')
+        name, value = name.strip(), HEX_COLOR.sub(r'#\1\2\3', ' '.join(value.split()))
+        if not name or not value or name.lower() in DROPPED_DECLARATIONS:
+            continue
+        kept.append(f'{name}:{value}')
+    return ';'.join(kept)
+
+
+def minify_css(css):
+    """
+    Minify a flat stylesheet and merge rules with identical declarations.
+
+    A later rule is only merged into an earlier one when no rule in between
+    sets any of the same properties, so the cascade is unchanged. Stylesheets
+    with nested blocks (@media etc.) are only whitespace-collapsed.
+    """
+    css = CSS_COMMENT.sub('', css)
+    rules = CSS_RULE.findall(css)
+    if not rules or CSS_RULE.sub('', css).strip() or '@' in css:
+        return re.sub(r'\s*([{}:;,])\s*', r'\1', ' '.join(css.split()))
+
+    merged = []  # [selectors, declarations, property names]
+    for selector, declarations in rules:
+        selectors = [part.strip() for part in selector.split(',') if part.strip()]
+        declarations = minify_declarations(declarations)
+        if not declarations:
+            continue
+        properties = {item.split(':', 1)[0] for item in declarations.split(';')}
+        for index in range(len(merged) - 1, -1, -1):
+            if merged[index][1] == declarations:
+                merged[index][0].extend(s for s in selectors if s not in merged[index][0])
+                break
+            if merged[index][2] & properties:
+                merged.append([selectors, declarations, properties])
+                break
+        else:
+            merged.append([selectors, declarations, properties])
+    return ''.join(f"{','.join(selectors)}{{{declarations}}}" for selectors, declarations, _ in merged)
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def restore_case(element):
+    namespace, _, name = element.tag.rpartition('}')
+    if name in CAMEL_CASE_TAGS:
+        element.tag = f'{namespace}}}{CAMEL_CASE_TAGS[name]}' if namespace else CAMEL_CASE_TAGS[name]
+    for attribute in list(element.attrib):
+        if attribute in CAMEL_CASE_ATTRIBUTES:
+            element.set(CAMEL_CASE_ATTRIBUTES[attribute], element.attrib.pop(attribute))
+
+
+def optimize_transform(value, precision):
+    value = ' '.join(round_numbers(value, precision).split())
+    # matrix(1 0 0 1 x y) is a plain translation
+    return IDENTITY_MATRIX.sub(lambda match: f'translate({match.group(1)} {match.group(2)})', value)
+
+
+def optimize_attributes(element, precision):
+    if (element.get('stroke-linejoin') in ('round', 'bevel') and local_name(element.tag) in SHAPE_TAGS
+            and not element.get('class') and not element.get('style')):
+        # stroke-miterlimit only affects miter joins (and no CSS can switch this one back)
+        element.attrib.pop('stroke-miterlimit', None)
+    for attribute, value in list(element.attrib.items()):
+        if attribute in DROPPED_ATTRIBUTES:
+            del element.attrib[attribute]
+            continue
+        if attribute == 'd':
+            value = optimize_path_data(value, precision)
+        elif attribute == 'points':
+            value = optimize_points(value, precision)
+        elif attribute in ('transform', 'gradientTransform', 'patternTransform'):
+            value = optimize_transform(value, precision + 2)
+        elif attribute in COLOR_ATTRIBUTES:
+            value = HEX_COLOR.sub(r'#\1\2\3', value)
+        elif attribute in COORDINATE_ATTRIBUTES and PLAIN_NUMBER.match(value):
+            value = format_number(value, precision)
+        elif attribute == 'style':
+            value = minify_declarations(value)
+            if not value:
+                del element.attrib[attribute]
+                continue
+        element.set(attribute, value)
+
+
+def is_dropped(element):
+    name = local_name(element.tag)
+    if name in DROPPED_TAGS:
+        return True
+    if name == 'desc' and (element.text or '').strip().startswith('Created with'):
+        return True
+    return name == 'defs' and len(element) == 0 and not (element.text or '').strip()
+
+
+def optimize_children(parent, precision):
+    """Clean parent's subtree in place; unwrapped <g> children are spliced into parent"""
+    in_text = local_name(parent.tag) in TEXT_TAGS
+    children = []
+    for child in list(parent):
+        parent.remove(child)
+        if not isinstance(child.tag, str) or is_dropped(child):
+            continue
+        restore_case(child)
+        optimize_attributes(child, precision)
+        if local_name(child.tag) == 'style':
+            child.attrib.pop('type', None)
+            child.text = minify_css(child.text or '')
+        elif local_name(child.tag) not in TEXT_TAGS and child.text and not child.text.strip():
+            child.text = None
+        optimize_children(child, precision)
+        if not in_text and child.tail and not child.tail.strip():
+            child.tail = None
+
+        if local_name(child.tag) == 'g' and not child.attrib and not (child.text or '').strip():
+            children.extend(child)
+        else:
+            children.append(child)
+    parent.extend(children)
+
+
+def optimize_svg(svg_code, precision=DEFAULT_PRECISION):
+    """Optimised copy of svg_code, or svg_code unchanged if it is not well-formed XML"""
+    try:
+        root = ET.fromstring(svg_code)
+    except ET.ParseError:
+        return svg_code
+
+    restore_case(root)
+    for attribute in ROOT_DROPPED_ATTRIBUTES:
+        root.attrib.pop(attribute, None)
+    for attribute in ('x', 'y'):
+        if root.get(attribute) in ('0', '0px'):
+            del root.attrib[attribute]
+    optimize_attributes(root, precision)
+    if root.text and not root.text.strip():
+        root.text = None
+    optimize_children(root, precision)
+    # ElementTree escapes '>' in text and attributes, so this only touches empty-element tags
+    return ET.tostring(root, encoding='unicode').replace(' />', '/>')
@@ -1,120 +1,8 @@
-import re
 from django import template
 
-register = template.Library()
+from motorpartsdata.category_names import clean_category_name, beautify_category_name
 
-@register.filter
-def clean_category_name(value):
-    """
-    Clean category names by removing serial codes and improving formatting.
-    """
-    if not value:
-        return value
-    
-    # Remove serial codes like JE140A001, LSH14C4C5NA129710, etc.
-    cleaned = re.sub(r'[A-Z]{2,}\d+[A-Z]*\d*', '', str(value))
-    
-    # Remove extra spaces and "Serial" prefix
-    cleaned = re.sub(r'Serial\s+', '', cleaned)
-    
-    # Clean up extra spaces
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    
-    # If empty after cleaning, return original
-    if not cleaned:
-        return value
-    
-    return cleaned
+register = template.Library()
 
-@register.filter
-def beautify_category_name(value):
-    """
-    Beautify category names for better display.
-    """
-    if not value:
-        return value
-    
-    # First clean the name
-    cleaned = clean_category_name(value)
-    
-    # Map common terms to better names
-    replacements = {
-        'sealant & body attachment': 'Sealant & Body Parts',
-        'rear lamp': 'Rear Lights',
-        'front lamp': 'Front Lights',
-        'engine mount': 'Engine Mounting',
-        'brake pad': 'Brake Pads',
-        'brake disc': 'Brake Discs',
-        'suspension arm': 'Suspension Arms',
-        'fuel pump': 'Fuel Pumps',
-        'air filter': 'Air Filters',
-        'oil filter': 'Oil Filters',
-        'spark plug': 'Spark Plugs',
-        'timing belt': 'Timing Belts',
-        'water pump': 'Water Pumps',
-        'radiator': 'Radiators',
-        'exhaust': 'Exhaust System',
-        'clutch': 'Clutch System',
-        'transmission': 'Transmission Parts',
-        'steering': 'Steering Components',
-        'wheel bearing': 'Wheel Bearings',
-        'cv joint': 'CV Joints',
-        'shock absorber': 'Shock Absorbers',
-        'strut': 'Struts',
-        'spring': 'Springs',
-        'bushing': 'Bushings',
-        'sensor': 'Sensors',
-        'switch': 'Switches',
-        'relay': 'Relays',
-        'fuse': 'Fuses',
-        'wire': 'Wiring',
-        'cable': 'Cables',
-        'hose': 'Hoses',
-        'gasket': 'Gaskets',
-        'seal': 'Seals',
-        'bearing': 'Bearings',
-        'belt': 'Belts',
-        'chain': 'Chains',
-        'pulley': 'Pulleys',
-        'tensioner': 'Tensioners',
-        'alternator': 'Alternators',
-        'starter': 'Starters',
-        'battery': 'Batteries',
-        'ignition': 'Ignition System',
-        'cooling': 'Cooling System',
-        'heating': 'Heating System',
-        'air conditioning': 'Air Conditioning',
-        'windshield': 'Windshield',
-        'mirror': 'Mirrors',
-        'door': 'Door Parts',
-        'window': 'Window Parts',
-        'seat': 'Seats',
-        'dashboard': 'Dashboard',
-        'console': 'Console',
-        'trim': 'Interior Trim',
-        'carpet': 'Carpets',
-        'mat': 'Floor Mats',
-        'bumper': 'Bumpers',
-        'fender': 'Fenders',
-        'hood': 'Hoods',
-        'trunk': 'Trunk Parts',
-        'roof': 'Roof Parts',
-        'spoiler': 'Spoilers',
-        'grille': 'Grilles',
-        'molding': 'Moldings',
-        'emblem': 'Emblems',
-        'badge': 'Badges',
-    }
-    
-    # Apply replacements
-    cleaned_lower = cleaned.lower()
-    for old, new in replacements.items():
-        if old in cleaned_lower:
-            cleaned = new
-            break
-    
-    # Title case if no replacement found
-    if cleaned == clean_category_name(value):
-        cleaned = cleaned.title()
-    
-    return cleaned
+register.filter('clean_category_name', clean_category_name)
+register.filter('beautify_category_name', beautify_category_name)
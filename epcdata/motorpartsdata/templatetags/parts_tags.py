@@ -1,165 +1,72 @@
 from django import template
-from motorpartsdata.models import Part, ChildTitle
-import re
+from motorpartsdata.category_names import clean_category_name, beautify_category_name
+from motorpartsdata.diagrams import prefetch_product_diagrams, product_diagram
+from motorpartsdata.part_lookup import part_number_for_upc
+from motorpartsdata import fitment, supersession
 
 register = template.Library()
 
+@register.simple_tag
+def prefetch_product_svgs(products):
+    """Resolve SVG diagrams for a whole product list up front (at most two queries, usually none)."""
+    try:
+        prefetch_product_diagrams(products or [])
+    except Exception:
+        pass
+    return ''
+
 @register.simple_tag
 def get_product_svg(product):
     """Get SVG content for a product based on its UPC."""
     try:
-        if product.upc:
-            part = Part.objects.select_related('child_title').get(part_number=product.upc)
-            if part.child_title and part.child_title.svg_code:
-                return part.child_title.svg_code
-    except Part.DoesNotExist:
-        pass
+        diagram = product_diagram(product)
+        if diagram and diagram['svg_code']:
+            return diagram['svg_code']
     except Exception as e:
         # For debugging, you can log the error
         pass
     return None
 
+@register.simple_tag
+def current_replacement(product):
+    """The PartNumber that supersedes a product's part number, or None."""
+    if not product.upc:
+        return None
+    return supersession.current_replacement(part_number_for_upc(product.upc))
+
+@register.simple_tag
+def compatible_serials(product):
+    """Sorted serials (VINs) a product's part number fits."""
+    if not product.upc:
+        return []
+    return fitment.compatible_serials(part_number_for_upc(product.upc))
+
+@register.simple_tag
+def fits_serial(product, serial):
+    """Whether a product's part number fits a serial (VIN)."""
+    if not product.upc or not serial:
+        return False
+    return fitment.fits(part_number_for_upc(product.upc), serial)
+
 @register.filter
 def svg_diagram(product):
     """Filter to get SVG diagram for a product."""
-    try:
-        if product.upc:
-            part = Part.objects.select_related('child_title').get(part_number=product.upc)
-            if part.child_title and part.child_title.svg_code:
-                return part.child_title.svg_code
-    except Part.DoesNotExist:
-        pass
-    except Exception as e:
-        # For debugging, you can log the error
-        pass
-    return None
+    return get_product_svg(product)
 
 @register.simple_tag
 def debug_product_info(product):
     """Debug tag to show product-part relationship info."""
     try:
         if product.upc:
-            part = Part.objects.select_related('child_title').get(part_number=product.upc)
-            return f"Found part: {part.part_number}, SVG available: {bool(part.child_title and part.child_title.svg_code)}"
+            diagram = product_diagram(product)
+            if diagram is None:
+                return f"No part found for UPC: {product.upc}"
+            return f"Found part: {product.upc}, SVG available: {bool(diagram['svg_code'])}"
         else:
             return "No UPC set for product"
-    except Part.DoesNotExist:
-        return f"No part found for UPC: {product.upc}"
     except Exception as e:
         return f"Error: {str(e)}"
 
-@register.filter
-def clean_category_name(value):
-    """
-    Clean category names by removing serial codes and improving formatting.
-    """
-    if not value:
-        return value
-    
-    # Remove serial codes like JE140A001, LSH14C4C5NA129710, etc.
-    cleaned = re.sub(r'[A-Z]{2,}\d+[A-Z]*\d*', '', str(value))
-    
-    # Remove extra spaces and "Serial" prefix
-    cleaned = re.sub(r'Serial\s+', '', cleaned)
-    
-    # Clean up extra spaces
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    
-    # If empty after cleaning, return original
-    if not cleaned:
-        return value
-    
-    return cleaned
-
-@register.filter
-def beautify_category_name(value):
-    """
-    Beautify category names for better display.
-    """
-    if not value:
-        return value
-    
-    # First clean the name
-    cleaned = clean_category_name(value)
-    
-    # Map common terms to better names
-    replacements = {
-        'sealant & body attachment': 'Sealant & Body Parts',
-        'rear lamp': 'Rear Lights',
-        'front lamp': 'Front Lights',
-        'engine mount': 'Engine Mounting',
-        'brake pad': 'Brake Pads',
-        'brake disc': 'Brake Discs',
-        'suspension arm': 'Suspension Arms',
-        'fuel pump': 'Fuel Pumps',
-        'air filter': 'Air Filters',
-        'oil filter': 'Oil Filters',
-        'spark plug': 'Spark Plugs',
-        'timing belt': 'Timing Belts',
-        'water pump': 'Water Pumps',
-        'radiator': 'Radiators',
-        'exhaust': 'Exhaust System',
-        'clutch': 'Clutch System',
-        'transmission': 'Transmission Parts',
-        'steering': 'Steering Components',
-        'wheel bearing': 'Wheel Bearings',
-        'cv joint': 'CV Joints',
-        'shock absorber': 'Shock Absorbers',
-        'strut': 'Struts',
-        'spring': 'Springs',
-        'bushing': 'Bushings',
-        'sensor': 'Sensors',
-        'switch': 'Switches',
-        'relay': 'Relays',
-        'fuse': 'Fuses',
-        'wire': 'Wiring',
-        'cable': 'Cables',
-        'hose': 'Hoses',
-        'gasket': 'Gaskets',
-        'seal': 'Seals',
-        'bearing': 'Bearings',
-        'belt': 'Belts',
-        'chain': 'Chains',
-        'pulley': 'Pulleys',
-        'tensioner': 'Tensioners',
-        'alternator': 'Alternators',
-        'starter': 'Starters',
-        'battery': 'Batteries',
-        'ignition': 'Ignition System',
-        'cooling': 'Cooling System',
-        'heating': 'Heating System',
-        'air conditioning': 'Air Conditioning',
-        'windshield': 'Windshield',
-        'mirror': 'Mirrors',
-        'door': 'Door Parts',
-        'window': 'Window Parts',
-        'seat': 'Seats',
-        'dashboard': 'Dashboard',
-        'console': 'Console',
-        'trim': 'Interior Trim',
-        'carpet': 'Carpets',
-        'mat': 'Floor Mats',
-        'bumper': 'Bumpers',
-        'fender': 'Fenders',
-        'hood': 'Hoods',
-        'trunk': 'Trunk Parts',
-        'roof': 'Roof Parts',
-        'spoiler': 'Spoilers',
-        'grille': 'Grilles',
-        'molding': 'Moldings',
-        'emblem': 'Emblems',
-        'badge': 'Badges',
-    }
-    
-    # Apply replacements
-    cleaned_lower = cleaned.lower()
-    for old, new in replacements.items():
-        if old in cleaned_lower:
-            cleaned = new
-            break
-    
-    # Title case if no replacement found
-    if cleaned == clean_category_name(value):
-        cleaned = cleaned.title()
-    
-    return cleaned
+# Category name filters live in motorpartsdata.category_names (shared with category_filters)
+register.filter('clean_category_name', clean_category_name)
+register.filter('beautify_category_name', beautify_category_name)
@@ -1,4 +1,1712 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from io import StringIO
+from concurrent.futures import Future
+from unittest import mock
 
-# Create your tests here.
-#462  #730
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections
+from django.db.models import F
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from haystack import connections as haystack_connections
+from oscar.core.loading import get_model
+
+from .models import (
+    SerialNumber, ParentTitle, ChildTitle, Part, PartNumber, PriceScrapeJob, PricingData, DiagramSource, SerialPart,
+    SvgBlob, Supersession, Fitment, brotli,
+)
+from .catalogue_diff import diff_serials, part_numbers, summarise
+from .category_builder import CategoryTreeBuilder, build_serial_categories
+from .category_links import link_products_to_categories
+from .category_menu import category_tree
+from .category_names import clean_category_name, beautify_category_name
+from .diagrams import diagrams_for_upcs
+from .epc_html import parse_diagram_file
+from . import fitment
+from .fitment import BITMAP, SerialSet, compatible_serials, fits
+from .fitment import rebuild as rebuild_fitment
+from .ingest import ingest_directory
+from .management.commands.import_to_oscar import Command as ImportCommand, import_serial_worker
+from .oscar_import import BulkImporter, StatementCounter
+from .part_lookup import EXACT, NEAR, NORMALISED, lookup, matches, near_misses
+from .part_search import index_part_numbers, rebuild_index, search
+from .price_capture import CaptureTimeout, LatencyStats, capture, signature, to_form_data, wait_for_update
+from .pricing_values import INDEX_MAPPING, parse_active, parse_price, parse_stock
+from .search_backend import with_replacements
+from .scrape_queue import CLAIM_TIMEOUT, MAX_ATTEMPTS, claim, enqueue, work
+from .serial_parts import refresh_serial_parts, serials_using
+from .supersession import closure, current_replacement, current_replacements, rebuild, successors, superseded_numbers
+from .svg_optimize import optimize_svg, optimize_path_data, minify_css
+from .pricing import (
+    serial_parts_pricing, serial_part_numbers, missing_pricing_part_numbers,
+    part_instances_pricing, in_stock_parts_under,
+)
+
+
+def build_serial(serial, parents=2, children=2, parts=3, priced_every=2, prefix='P'):
+    """Create a serial with parents x children x parts, pricing every Nth part number"""
+    serial_instance = SerialNumber.objects.create(serial=serial)
+    counter = 0
+    for p in range(parents):
+        parent = ParentTitle.objects.create(title=f"Parent {p}", serial_number=serial_instance)
+        for c in range(children):
+            child = ChildTitle.objects.create(title=f"Child {p}-{c}", parent=parent, svg_code='<svg></svg>')
+            for n in range(parts):
+                part = Part.objects.create(
+                    child_title=child,
+                    call_out_order=n + 1,
+                    part_number=f"{prefix}{counter:05d}",
+                    usage_name=f"Usage {counter}",
+                    unit_qty='1',
+                )
+                if counter % priced_every == 0:
+                    # Pricing belongs to the part number, so serials sharing numbers share it
+                    PricingData.objects.get_or_create(part_number=part.canonical, defaults={
+                        'description': f"Desc {counter}", 'list_price': '12.50', 'stock_order': '9.80',
+                    })
+                counter += 1
+    return serial_instance
+
+
+class PartsPricingEngineTests(TestCase):
+
+    def test_rows_deduplicate_part_numbers(self):
+        serial = build_serial('VIN1', parents=1, children=2, parts=2)
+        # Same part number used on a second diagram is reported once
+        child = ChildTitle.objects.filter(parent__serial_number=serial).last()
+        Part.objects.create(child_title=child, call_out_order=9, part_number='P00000',
+                            usage_name='Duplicate', unit_qty='1')
+
+        rows = serial_parts_pricing(serial)
+
+        numbers = [row['part']['part_number'] for row in rows]
+        self.assertEqual(len(numbers), len(set(numbers)))
+        self.assertEqual(set(numbers), {'P00000', 'P00001', 'P00002', 'P00003'})
+
+    def test_missing_pricing_sorted_first(self):
+        serial = build_serial('VIN1', parents=1, children=1, parts=4)
+
+        rows = serial_parts_pricing(serial)
+
+        self.assertEqual([row['has_pricing'] for row in rows], [False, False, True, True])
+        self.assertEqual(rows[0]['description'], 'Data Missing')
+        priced = rows[-1]
+        self.assertEqual(priced['list_price'], Decimal('12.50'))
+        self.assertEqual(priced['parent_title'], 'Parent 0')
+        self.assertEqual(priced['child_title'], 'Child 0-0')
+
+    def test_missing_pricing_part_numbers(self):
+        serial = build_serial('VIN1', parents=1, children=1, parts=4)
+        self.assertEqual(missing_pricing_part_numbers(serial), ['P00001', 'P00003'])
+        self.assertEqual(serial_part_numbers(serial), {'P00000', 'P00001', 'P00002', 'P00003'})
+
+    def test_part_instances_pricing_spans_serials(self):
+        build_serial('VIN1', parents=1, children=1, parts=2)
+        build_serial('VIN2', parents=1, children=1, parts=2, priced_every=3)
+
+        instances = part_instances_pricing(['P00001'])
+
+        self.assertEqual([has for _, has in instances['P00001']], [False, False])
+
+    def test_engine_query_count_is_constant(self):
+        small = build_serial('SMALL', parents=1, children=1, parts=2, prefix='S')
+        large = build_serial('LARGE', parents=4, children=5, parts=10, prefix='L')
+
+        for serial in (small, large):
+            with self.assertNumQueries(1):
+                serial_parts_pricing(serial)
+            with self.assertNumQueries(1):
+                serial_part_numbers(serial)
+
+    def test_views_query_count_independent_of_vin_size(self):
+        build_serial('SMALL', parents=1, children=1, parts=2, prefix='S')
+        build_serial('LARGE', parents=4, children=5, parts=10, prefix='L')
+
+        cache.clear()
+        self.client.get(reverse('parts_pricing', args=['SMALL']))  # warm the category menu cache
+        for url_name in ('parts_pricing', 'parts_pricing_debug'):
+            counts = []
+            for serial in ('SMALL', 'LARGE'):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse(url_name, args=[serial]))
+                self.assertEqual(response.status_code, 200)
+                counts.append(len(queries))
+            self.assertEqual(counts[0], counts[1], url_name)
+
+
+SAMPLE_SECTION = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'LSH14C4C5NA129710', 'safety belt'
+)
+
+
+class EpcIngestTests(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.vin_dir = os.path.join(self.tmp, 'TESTVIN0000000001')
+        shutil.copytree(SAMPLE_SECTION, os.path.join(self.vin_dir, 'safety belt'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_parse_diagram_file(self):
+        diagram = parse_diagram_file(os.path.join(SAMPLE_SECTION, 'Seat Belts.html'))
+
+        self.assertEqual(diagram['title'], 'FE460A001 - Seat Belts')
+        self.assertTrue(diagram['svg_code'].startswith('<svg'))
+        self.assertEqual(diagram['parts'][0]['part_number'], 'C00160309')
+        self.assertEqual(diagram['parts'][0]['lr'], 'Left')
+
+    def test_parse_error_is_reported_not_raised(self):
+        diagram = parse_diagram_file(os.path.join(self.tmp, 'missing.html'))
+        self.assertIn('error', diagram)
+
+    def test_ingest_directory_bulk_inserts_section(self):
+        stats = ingest_directory(self.vin_dir, workers=1)
+
+        serial = SerialNumber.objects.get(serial='TESTVIN0000000001')
+        parent = serial.parent_titles.get()
+        self.assertEqual(parent.title, 'Safety Belt')
+        self.assertEqual(stats['child_titles'], parent.child_titles.count())
+        self.assertEqual(stats['parts'], Part.objects.filter(child_title__parent=parent).count())
+        self.assertTrue(Part.objects.filter(part_number='C00116724', unit_qty='4.0').exists())
+
+    def test_ingest_directory_with_worker_pool_matches_serial_run(self):
+        ingest_directory(self.vin_dir, workers=2)
+        pooled = list(Part.objects.order_by('id').values_list('part_number', 'call_out_order', 'lr'))
+        Part.objects.all().delete()
+        ChildTitle.objects.all().delete()
+
+        ingest_directory(self.vin_dir, workers=1)
+        serial = list(Part.objects.order_by('id').values_list('part_number', 'call_out_order', 'lr'))
+
+        self.assertEqual(pooled, serial)
+
+    def test_worker_pool_leaves_the_callers_transaction_open(self):
+        # TestCase wraps each test in a transaction, as a caller's atomic() would
+        with mock.patch.object(connections, 'close_all') as close_all:
+            ingest_directory(self.vin_dir, workers=2)
+
+        close_all.assert_not_called()
+        self.assertTrue(connection.in_atomic_block)
+        self.assertTrue(Part.objects.exists())
+
+    def test_rerun_skips_unchanged_files_without_parsing(self):
+        first = ingest_directory(self.vin_dir, workers=1)
+        counts = (ChildTitle.objects.count(), Part.objects.count())
+
+        with mock.patch('motorpartsdata.ingest.parse_diagram_file') as parse:
+            second = ingest_directory(self.vin_dir, workers=1)
+
+        parse.assert_not_called()
+        self.assertEqual(second['unchanged'], first['files'])
+        self.assertEqual((ChildTitle.objects.count(), Part.objects.count()), counts)
+        self.assertEqual(DiagramSource.objects.count(), first['files'])
+
+    def test_touched_but_identical_file_is_not_reloaded(self):
+        ingest_directory(self.vin_dir, workers=1)
+        path = os.path.join(self.vin_dir, 'safety belt', 'Seat Belts.html')
+        os.utime(path, ns=(0, 0))
+
+        stats = ingest_directory(self.vin_dir, workers=1)
+
+        self.assertEqual(stats['child_titles'], 0)
+        self.assertEqual(DiagramSource.objects.get(path='safety belt/Seat Belts.html').mtime_ns, 0)
+
+    def test_changed_file_replaces_its_child_title(self):
+        ingest_directory(self.vin_dir, workers=1)
+        path = os.path.join(self.vin_dir, 'safety belt', 'Seat Belts.html')
+        old_child = DiagramSource.objects.get(path='safety belt/Seat Belts.html').child_title_id
+        with open(path, 'r', encoding='utf-8') as file:
+            html = file.read()
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(html.replace('BELT ASSEMBLY-FRONT SEAT', 'BELT ASSEMBLY-FRONT SEAT REV B'))
+
+        stats = ingest_directory(self.vin_dir, workers=1)
+
+        self.assertEqual(stats['child_titles'], 1)
+        self.assertFalse(ChildTitle.objects.filter(id=old_child).exists())
+        self.assertEqual(ChildTitle.objects.filter(title='FE460A001 - Seat Belts').count(), 1)
+        self.assertTrue(Part.objects.filter(usage_name='BELT ASSEMBLY-FRONT SEAT REV B').exists())
+
+    def test_identical_diagrams_share_one_svg_blob(self):
+        ingest_directory(self.vin_dir, workers=1)
+        shutil.copytree(self.vin_dir, os.path.join(self.tmp, 'TESTVIN0000000002'))
+
+        ingest_directory(os.path.join(self.tmp, 'TESTVIN0000000002'), workers=1)
+
+        children = ChildTitle.objects.filter(parent__serial_number__serial='TESTVIN0000000001')
+        self.assertEqual(SvgBlob.objects.count(), children.values('svg_blob').distinct().count())
+        self.assertEqual(ChildTitle.objects.count(), 2 * children.count())
+        child = children.get(title='FE460A001 - Seat Belts')
+        parsed = parse_diagram_file(os.path.join(SAMPLE_SECTION, 'Seat Belts.html'), optimize=True)
+        self.assertEqual(child.svg_code, parsed['svg_code'])
+        self.assertLess(len(child.svg_blob.data), child.svg_blob.size)
+
+    def test_changed_file_drops_orphaned_svg_blob(self):
+        ingest_directory(self.vin_dir, workers=1)
+        path = os.path.join(self.vin_dir, 'safety belt', 'Seat Belts.html')
+        old_blob = ChildTitle.objects.get(title='FE460A001 - Seat Belts').svg_blob_id
+        with open(path, 'r', encoding='utf-8') as file:
+            html = file.read()
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(html.replace('</svg>', '<g id="rev-b"></g></svg>', 1))
+
+        ingest_directory(self.vin_dir, workers=1)
+
+        self.assertFalse(SvgBlob.objects.filter(hash=old_blob).exists())
+        self.assertIn('rev-b', ChildTitle.objects.get(title='FE460A001 - Seat Belts').svg_code)
+
+    def test_keep_original_svg(self):
+        ingest_directory(self.vin_dir, workers=1, keep_original=True)
+
+        child = ChildTitle.objects.get(title='FE460A001 - Seat Belts')
+        original = parse_diagram_file(os.path.join(SAMPLE_SECTION, 'Seat Belts.html'))['svg_code']
+        self.assertEqual(child.original_svg_blob.svg_code, original)
+        self.assertLess(child.svg_blob.size, child.original_svg_blob.size)
+
+    def test_data_loaded_before_manifest_is_replaced_not_duplicated(self):
+        ingest_directory(self.vin_dir, workers=1)
+        counts = (ChildTitle.objects.count(), Part.objects.count())
+        DiagramSource.objects.all().delete()
+
+        ingest_directory(self.vin_dir, workers=1)
+
+        self.assertEqual((ChildTitle.objects.count(), Part.objects.count()), counts)
+
+
+class SvgOptimizeTests(TestCase):
+
+    def test_path_data_is_rounded_and_compacted(self):
+        self.assertEqual(
+            optimize_path_data('M 10.004 10 L 20,20 L -5 -5 c 0.5,1 1,1 2,0 c -1,2 3,4 5,6 z M 1 1 M 2 2', 2),
+            'M10,10L20,20-5-5c.5,1,1,1,2,0-1,2,3,4,5,6zM1,1M2,2',
+        )
+
+    def test_css_rules_merged_only_when_cascade_is_unchanged(self):
+        css = '.a{ fill:none; stroke:#000000 } .b{stroke:red} .c{fill:none;stroke:#000000;} .d{font-size:8} .e{fill:none;stroke:#000}'
+        self.assertEqual(minify_css(css), '.a{fill:none;stroke:#000}.b{stroke:red}.c,.e{fill:none;stroke:#000}.d{font-size:8}')
+
+    def test_markup_is_cleaned_but_hooks_kept(self):
+        svg = (
+            '<svg version="1.1" viewbox="0 0 10 10" x="0px" y="0px" xml:space="preserve" '
+            'xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink">\n'
+            '<g>\n\t<line x1="1.23456" x2="2" y1="3" y2="4" stroke="#FF0000" stroke-linejoin="round" '
+            'stroke-miterlimit="10"></line>\n</g>\n'
+            '<text class="st7" style="cursor: pointer;" transform="matrix(1 0 0 1 387.75 177.25)"> 2 </text>'
+            '<desc>Created with Snap</desc><defs></defs></svg>'
+        )
+        self.assertEqual(
+            optimize_svg(svg),
+            '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10">'
+            '<line x1="1.23" x2="2" y1="3" y2="4" stroke="#F00" stroke-linejoin="round"/>'
+            '<text class="st7" style="cursor:pointer" transform="translate(387.75 177.25)"> 2 </text></svg>',
+        )
+
+    def test_unparseable_svg_is_returned_unchanged(self):
+        self.assertEqual(optimize_svg('<svg><g></svg>'), '<svg><g></svg>')
+
+
+class FakeProduct:
+    def __init__(self, upc):
+        self.upc = upc
+
+
+class ProductSvgLookupTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        build_serial('VIN1', parents=1, children=2, parts=3)
+        # P00000 also appears on a second serial: must not raise MultipleObjectsReturned
+        other = build_serial('VIN2', parents=1, children=1, parts=1)
+        for child in ChildTitle.objects.filter(parent__serial_number=other):
+            child.svg_code = '<svg id="other"></svg>'
+            child.save()
+
+    def test_shared_part_number_resolves_to_first_part(self):
+        diagrams = diagrams_for_upcs(['P00000', 'P00004', 'NOPE'])
+
+        self.assertEqual(diagrams['P00000']['title'], 'Child 0-0')
+        self.assertEqual(diagrams['P00004']['title'], 'Child 0-1')
+        self.assertIsNone(diagrams['NOPE'])
+
+    def test_product_grid_renders_with_no_per_product_queries(self):
+        products = [FakeProduct(f"P{n:05d}") for n in range(6)] + [FakeProduct('NOPE'), FakeProduct('')]
+        template = Template(
+            "{% load parts_tags %}{% prefetch_product_svgs products %}"
+            "{% for product in products %}{% get_product_svg product as svg %}{{ svg|safe }}"
+            "{{ product|svg_diagram|safe }}{% endfor %}"
+        )
+
+        with self.assertNumQueries(2):
+            cold = template.render(Context({'products': products}))
+        self.assertEqual(cold.count('<svg></svg>'), 12)
+
+        # Second page view: everything comes from the cache
+        products = [FakeProduct(product.upc) for product in products]
+        with self.assertNumQueries(0):
+            warm = template.render(Context({'products': products}))
+        self.assertEqual(cold, warm)
+
+    def test_childtitle_edit_invalidates_cache(self):
+        diagrams_for_upcs(['P00000'])
+        child = ChildTitle.objects.get(title='Child 0-0', parent__serial_number__serial='VIN1')
+        child.svg_code = '<svg id="new"></svg>'
+        child.save()
+
+        self.assertEqual(diagrams_for_upcs(['P00000'])['P00000']['svg_code'], '<svg id="new"></svg>')
+
+    def test_svg_code_is_stored_on_save(self):
+        child = ChildTitle.objects.get(title='Child 0-0', parent__serial_number__serial='VIN1')
+        blobs = SvgBlob.objects.count()
+
+        child.svg_code = '<svg id="draft"></svg>'
+        child.svg_code = '<svg id="final"></svg>'
+        self.assertEqual(child.svg_code, '<svg id="final"></svg>')
+        self.assertEqual(SvgBlob.objects.count(), blobs)
+        child.save(update_fields=['title'])
+
+        child.refresh_from_db()
+        self.assertEqual(child.svg_code, '<svg id="final"></svg>')
+        self.assertEqual(SvgBlob.objects.count(), blobs + 1)
+
+
+class SvgFileEndpointTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.svg = '<svg xmlns="http://www.w3.org/2000/svg"><path d="M0 0L10 10"/></svg>'
+        self.digest = SvgBlob.store([self.svg])[self.svg]
+        self.url = reverse('svg_file', args=[self.digest])
+
+    def test_gzip_variant_is_served_precompressed(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], f'"{self.digest}-gzip"')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content).decode(), self.svg)
+
+    def test_brotli_preferred_and_filled_lazily(self):
+        SvgBlob.objects.update(brotli_data=None)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content).decode(), self.svg)
+        self.assertIsNotNone(SvgBlob.objects.get(hash=self.digest).brotli_data)
+
+    def test_identity_when_compression_not_accepted(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content.decode(), self.svg)
+        self.assertEqual(response['ETag'], f'"{self.digest}"')
+
+    def test_matching_etag_returns_304(self):
+        etag = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_unknown_hash_is_404(self):
+        self.assertEqual(self.client.get(reverse('svg_file', args=['0' * 64])).status_code, 404)
+
+    def test_diagram_json_links_to_svg_file(self):
+        serial = build_serial('VIN1', parents=1, children=1, parts=1)
+        child = ChildTitle.objects.get(parent__serial_number=serial)
+        child.svg_code = self.svg
+        child.save()
+
+        data = self.client.get(reverse('svg_diagram', args=['P00000'])).json()
+
+        self.assertTrue(data['success'])
+        self.assertEqual(data['svg_url'], self.url)
+
+
+Category = get_model('catalogue', 'Category')
+
+
+def build_categories(roots=1, children=3, grandchildren=3):
+    for r in range(roots):
+        root = Category.add_root(name=f"Serial {r}")
+        for c in range(children):
+            child = root.add_child(name=f"Section {r}-{c}")
+            for g in range(grandchildren):
+                child.add_child(name=f"Diagram {r}-{c}-{g}")
+
+
+class CategoryNameTests(TestCase):
+
+    def test_clean_category_name(self):
+        self.assertEqual(clean_category_name('Serial JE140A001'), 'Serial JE140A001')
+        self.assertEqual(clean_category_name('FE460A001 - Seat Belts'), '- Seat Belts')
+        self.assertEqual(clean_category_name('Serial  Safety   Belt'), 'Safety Belt')
+        self.assertIsNone(clean_category_name(None))
+
+    def test_first_listed_term_wins_over_first_in_name(self):
+        # 'seal' appears earlier in the name but 'sealant & body attachment' is listed first
+        self.assertEqual(beautify_category_name('seal sealant & body attachment'), 'Sealant & Body Parts')
+        self.assertEqual(beautify_category_name('Door seal'), 'Seals')
+        self.assertEqual(beautify_category_name('Safety Belt'), 'Belts')
+
+    def test_unmatched_and_identical_names_are_title_cased(self):
+        self.assertEqual(beautify_category_name('front axle'), 'Front Axle')
+        self.assertEqual(beautify_category_name('CV Joints'), 'Cv Joints')
+
+    def test_filters_share_one_implementation(self):
+        rendered = Template(
+            "{% load category_filters %}{{ name|beautify_category_name }}|"
+            "{% load parts_tags %}{{ name|beautify_category_name }}"
+        ).render(Context({'name': 'JE140A001 brake pad kit'}))
+        self.assertEqual(rendered, 'Brake Pads|Brake Pads')
+
+
+class CategoryMenuTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_tree_is_built_in_two_queries_then_cached(self):
+        build_categories(roots=2)
+
+        with self.assertNumQueries(2):
+            tree = category_tree()
+        with self.assertNumQueries(0):
+            self.assertEqual([node.name for node in category_tree()], ['Serial 0', 'Serial 1'])
+
+        section = tree[1].children[2]
+        self.assertEqual(section.name, 'Section 1-2')
+        self.assertEqual([node.name for node in section.get_children()],
+                         ['Diagram 1-2-0', 'Diagram 1-2-1', 'Diagram 1-2-2'])
+        category = Category.objects.get(pk=section.pk)
+        self.assertEqual(section.url, reverse('catalogue:category', kwargs={'category_slug': category.slug, 'pk': category.pk}))
+
+    def test_nodes_carry_display_names(self):
+        Category.add_root(name='Serial LSH14C4C5NA129710').add_child(name='JE140A001 - rear lamp assembly')
+
+        section = category_tree()[0].children[0]
+
+        self.assertEqual(section.clean_name, '- rear lamp assembly')
+        self.assertEqual(section.display_name, 'Rear Lights')
+
+    def test_category_edit_invalidates_tree(self):
+        build_categories()
+        category_tree()
+
+        Category.objects.get(name='Section 0-1').add_child(name='Diagram new')
+        Category.objects.filter(name='Diagram 0-0-0').get().delete()
+
+        names = [node.name for node in category_tree()[0].children[1].children]
+        self.assertIn('Diagram new', names)
+        self.assertNotIn('Diagram 0-0-0', [node.name for node in category_tree()[0].children[0].children])
+
+    def test_menus_render_without_per_node_queries(self):
+        request = RequestFactory().get('/')
+        counts = []
+        for size in (1, 4):
+            Category.objects.all().delete()
+            build_categories(roots=size, children=size)
+            cache.clear()
+            tree = category_tree()
+            with CaptureQueriesContext(connection) as queries:
+                html = render_to_string('oscar/partials/header.html', {'categories': tree}, request)
+            counts.append(len(queries))
+            self.assertIn(f'Section {size - 1}-{size - 1}', html)
+        self.assertEqual(counts, [0, 0])
+
+    def test_catalogue_page_query_count_independent_of_tree_size(self):
+        counts = []
+        for size in (1, 4):
+            Category.objects.all().delete()
+            build_categories(roots=size, children=size)
+            cache.clear()
+            self.client.get(reverse('catalogue:index'))  # warm the menu cache
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('catalogue:index'))
+            self.assertContains(response, f'Section {size - 1}-{size - 1}')
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+Product = get_model('catalogue', 'Product')
+ProductCategory = get_model('catalogue', 'ProductCategory')
+ProductAttributeValue = get_model('catalogue', 'ProductAttributeValue')
+StockRecord = get_model('partner', 'StockRecord')
+
+
+class SerialExecutor:
+    """Stands in for the process pool, running each submitted call straight away"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, function, *args):
+        future = Future()
+        future.set_result(function(*args))
+        return future
+
+
+def import_to_oscar(*args):
+    out = StringIO()
+    call_command('import_to_oscar', *args, stdout=out, stderr=out)
+    return out.getvalue()
+
+
+def catalogue_snapshot():
+    """Products with their categories, attribute values and stock records, comparable across imports"""
+    products = {}
+    for product in Product.objects.prefetch_related('categories', 'stockrecords'):
+        products[product.upc] = (
+            product.title, product.slug,
+            sorted(c.name for c in product.categories.all()),
+            sorted((s.partner_sku, s.price, s.num_in_stock) for s in product.stockrecords.all()),
+            sorted(
+                (v.attribute.code, str(v.value))
+                for v in ProductAttributeValue.objects.filter(product=product).select_related('attribute')
+            ),
+        )
+    return products
+
+
+class BulkOscarImportTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bulk_import_matches_per_part_import(self):
+        serial = build_serial('VIN1', parts=3)
+        child = ChildTitle.objects.filter(parent__serial_number=serial).last()
+        # A part number on a second diagram becomes one product, in its first category
+        Part.objects.create(child_title=child, call_out_order=9, part_number='P00000',
+                            usage_name='Duplicate', unit_qty='1', remark='Note')
+        PricingData.objects.filter(part_number__number='P00002').update(
+            list_price=Decimal('1234.50'), stock_available='10+', stock_qty=10)
+
+        import_to_oscar('--serial', 'VIN1')
+        expected = catalogue_snapshot()
+        Product.objects.all().delete()
+        StockRecord.objects.all().delete()
+        output = import_to_oscar('--serial', 'VIN1', '--bulk', '--batch-size', '5')
+
+        self.assertEqual(catalogue_snapshot(), expected)
+        self.assertEqual(len(expected), 12)
+        self.assertEqual(expected['EPC-P00002'][3], [('P00002', Decimal('1234.50'), 10)])
+        self.assertIn('Products created: 12', output)
+        self.assertIn('Products existing: 1', output)
+        self.assertIn('Parts processed: 13', output)
+
+    def test_bulk_rerun_only_adds_missing_stock_records(self):
+        build_serial('VIN1')
+        import_to_oscar('--serial', 'VIN1', '--bulk')
+        StockRecord.objects.filter(product__upc='EPC-P00001').delete()
+
+        output = import_to_oscar('--serial', 'VIN1', '--bulk')
+
+        self.assertEqual(Product.objects.count(), 12)
+        self.assertEqual(StockRecord.objects.count(), 12)
+        self.assertIn('Products created: 0', output)
+        self.assertIn('Stock records created: 1', output)
+
+    def test_bulk_statements_barely_grow_with_part_count(self):
+        counts = []
+        # The first import also creates the partner, product class and attributes
+        for index, parts in enumerate((2, 2, 20)):
+            build_serial(f'VIN{index}', parents=1, children=2, parts=parts, prefix=f'S{index}-')
+            with StatementCounter() as counter:
+                import_to_oscar('--serial', f'VIN{index}', '--bulk')
+            counts.append(counter.count)
+            self.assertEqual(Product.objects.filter(upc__startswith=f'EPC-S{index}-').count(), 2 * parts)
+        # Only SQLite's bound parameter limit splits the larger INSERTs further
+        self.assertLessEqual(counts[2] - counts[1], 3)
+
+    def test_bulk_import_refreshes_category_menu(self):
+        build_serial('VIN1', parents=1, children=1, parts=2)
+        self.assertEqual(category_tree(), [])
+
+        import_to_oscar('--serial', 'VIN1', '--bulk')
+
+        child = category_tree()[0].children[0].children[0]
+        self.assertEqual(child.num_products, 2)
+
+    def test_workers_import_every_serial(self):
+        build_serial('VIN1', parents=1, children=1, parts=3)
+        build_serial('VIN2', parents=1, children=1, parts=3)  # same part numbers as VIN1
+
+        with mock.patch.object(ImportCommand, '_executor', lambda self, workers: SerialExecutor()):
+            output = import_to_oscar('--bulk', '--workers', '2')
+
+        self.assertIn('Success: 2/2', output)
+        self.assertIn('Products created: 3', output)
+        self.assertIn('Products existing: 3', output)
+        self.assertEqual(Category.objects.filter(depth=1).count(), 2)
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_worker_retries_serial_after_product_conflict(self):
+        serial = build_serial('VIN1', parents=1, children=1, parts=2)
+        import_serial = BulkImporter.import_serial
+        calls = []
+
+        def clash_once(importer, *args):
+            calls.append(1)
+            if len(calls) == 1:
+                raise IntegrityError('duplicate key value violates unique constraint "catalogue_product_upc_key"')
+            return import_serial(importer, *args)
+
+        options = {'verbosity': 1, 'dry_run': False, 'bulk': True, 'batch_size': 100}
+        with mock.patch.object(BulkImporter, 'import_serial', clash_once):
+            success, stats, out, err = import_serial_worker(serial.id, options)
+
+        self.assertTrue(success)
+        self.assertEqual(len(calls), 2)
+        self.assertIn('retrying', err)
+        self.assertEqual(stats['products_created'], 2)
+        self.assertEqual(Product.objects.count(), 2)
+
+    def clash_on_first_product(self):
+        set_attributes = ImportCommand._set_product_attributes
+        calls = []
+
+        def clash_once(command, *args):
+            calls.append(1)
+            if len(calls) == 1:
+                raise IntegrityError('duplicate key value violates unique constraint "catalogue_product_upc_key"')
+            return set_attributes(command, *args)
+
+        return mock.patch.object(ImportCommand, '_set_product_attributes', clash_once), calls
+
+    def test_per_part_worker_retries_serial_after_product_conflict(self):
+        serial = build_serial('VIN1', parents=1, children=1, parts=2)
+        patch, calls = self.clash_on_first_product()
+
+        options = {'verbosity': 1, 'dry_run': False, 'bulk': False, 'batch_size': 100}
+        with patch:
+            success, stats, out, err = import_serial_worker(serial.id, options)
+
+        self.assertTrue(success)
+        self.assertIn('retrying', err)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(stats['products_created'], 2)
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_failed_product_does_not_roll_back_the_rest_of_the_serial(self):
+        build_serial('VIN1', parents=1, children=1, parts=2)
+        patch, calls = self.clash_on_first_product()
+
+        with patch:
+            output = import_to_oscar('--serial', 'VIN1')
+
+        self.assertIn('Error creating product for part P00000', output)
+        self.assertIn('Products created: 1', output)
+        self.assertEqual(list(Product.objects.values_list('upc', flat=True)), ['EPC-P00001'])
+
+
+class CategoryTreeBuilderTests(TestCase):
+
+    def build(self, *serials):
+        builder = CategoryTreeBuilder()
+        trees = build_serial_categories(builder, list(serials))
+        builder.save()
+        return builder, trees
+
+    def test_builds_valid_tree_with_one_insert_per_depth(self):
+        Category.add_root(name='Accessories').add_child(name='Mats')
+        serials = [build_serial('VIN1'), build_serial('VIN2', prefix='Q')]
+
+        with CaptureQueriesContext(connection) as queries:
+            builder, trees = self.build(*serials)
+
+        inserts = [q for q in queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(builder.created, 2 * (1 + 2 + 4))
+        self.assertEqual(Category.find_problems(), ([], [], [], [], []))
+        root = Category.objects.get(name='Serial VIN2')
+        self.assertEqual(root.path, '0003')
+        self.assertEqual([c.slug for c in root.get_children()], ['serial-VIN2-parent-1', 'serial-VIN2-parent-2'])
+        serial_category, category_map = trees[serials[1].id]
+        child = ChildTitle.objects.filter(parent__serial_number=serials[1]).last()
+        self.assertEqual(category_map[f"child_{child.id}"].get_parent().get_parent(), serial_category)
+        self.assertEqual(category_map[f"child_{child.id}"].slug, 'serial-VIN2-parent-2-child-2')
+
+    def test_rerun_matches_existing_nodes_and_appends_new_ones(self):
+        serial = build_serial('VIN1', parents=1, children=1)
+        self.build(serial)
+        parent = ParentTitle.objects.get(serial_number=serial)
+        ChildTitle.objects.create(title='Child new', parent=parent, svg_code='<svg></svg>')
+
+        builder, trees = self.build(serial)
+
+        self.assertEqual((builder.created, builder.existing), (1, 3))
+        self.assertEqual(Category.find_problems(), ([], [], [], [], []))
+        section = Category.objects.get(slug='serial-VIN1-parent-1')
+        self.assertEqual(section.numchild, 2)
+        self.assertEqual([c.name for c in section.get_children()], ['Child 0-0', 'Child new'])
+        with self.assertNumQueries(3):
+            self.build(serial)
+
+    def test_new_nodes_inherit_non_public_ancestors(self):
+        serial = build_serial('VIN1', parents=1, children=1)
+        Category.add_root(name='Serial VIN1', slug='serial-VIN1', is_public=False)
+
+        self.build(serial)
+
+        child = Category.objects.get(name='Child 0-0')
+        self.assertFalse(child.ancestors_are_public)
+
+
+class CategoryLinkTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.serial = build_serial('VIN1', parents=1, children=2, parts=2)
+        builder = CategoryTreeBuilder()
+        build_serial_categories(builder, [self.serial])
+        builder.save()
+        product_class = get_model('catalogue', 'ProductClass').objects.create(name='Motor Parts')
+        for upc in ('EPC-P00000', 'P00003', 'EPC-UNKNOWN'):
+            Product.objects.create(upc=upc, title=upc, product_class=product_class)
+
+    def test_dry_run_reports_without_linking(self):
+        ProductCategory.objects.create(product=Product.objects.get(upc='P00003'), category=Category.objects.get(name='Child 0-1'))
+
+        diff = link_products_to_categories(dry_run=True)
+
+        self.assertEqual(len(diff['missing']), 5)
+        self.assertEqual(diff['existing'], 1)
+        self.assertEqual(diff['unmatched'], 1)
+        self.assertEqual(ProductCategory.objects.count(), 1)
+
+    def test_links_serial_parent_and_child_once(self):
+        category_tree()
+        # Parts, categories, serials, parent and child titles, products, links, one INSERT
+        with self.assertNumQueries(8):
+            diff = link_products_to_categories()
+
+        self.assertEqual(len(diff['missing']), 6)
+        names = set(ProductCategory.objects.filter(product__upc='EPC-P00000').values_list('category__name', flat=True))
+        self.assertEqual(names, {'Serial VIN1', 'Parent 0', 'Child 0-0'})
+        self.assertEqual(category_tree()[0].num_products, 2)
+        self.assertEqual(len(link_products_to_categories()['missing']), 0)
+
+    def test_upc_typed_differently_links_by_normalised_number(self):
+        Product.objects.filter(upc='EPC-UNKNOWN').update(upc='EPC-p0000-1')
+
+        diff = link_products_to_categories(dry_run=True)
+
+        self.assertEqual(diff['unmatched'], 0)
+        self.assertEqual(len(diff['missing']), 9)
+
+
+class TypedPricingTests(TestCase):
+
+    def test_parsers(self):
+        self.assertEqual([parse_stock(v) for v in ('Nil', '0', '10+', 'x+', '1,200', '', 'n/a', None)],
+                         [0, 0, 10, 10, 1200, 0, 0, 0])
+        self.assertEqual([parse_price(v) for v in ('£1,234.5', '0.20', '', 'N/A', 'NaN', '1e12', None)],
+                         [Decimal('1234.50'), Decimal('0.20'), None, None, None, None, None])
+        self.assertEqual([parse_active(v) for v in ('A', 'S', '', None)], [True, False, None, None])
+
+    def test_save_parses_stock_qty(self):
+        serial = build_serial('VIN1', parents=1, children=1, parts=1)
+        pricing = PricingData.objects.get(part_number__parts__child_title__parent__serial_number=serial)
+        pricing.stock_available = '10+'
+        pricing.save()
+        pricing.refresh_from_db()
+        self.assertEqual(pricing.stock_qty, 10)
+        self.assertEqual(pricing.list_price, Decimal('12.50'))
+
+    def test_in_stock_parts_under_price_is_one_query(self):
+        serial = build_serial('VIN1', parents=1, children=2, parts=3, priced_every=1)
+        build_serial('VIN2', parents=1, children=1, parts=3, priced_every=1, prefix='Q')
+        PricingData.objects.update(active=True, stock_qty=10)
+        PricingData.objects.filter(part_number__number='P00001').update(list_price=Decimal('3.00'))
+        PricingData.objects.filter(part_number__number='P00002').update(list_price=Decimal('4.99'))
+        PricingData.objects.filter(part_number__number='P00003').update(list_price=Decimal('1.00'), stock_qty=0)
+        PricingData.objects.filter(part_number__number='P00004').update(list_price=Decimal('1.00'), active=False)
+
+        with self.assertNumQueries(1):
+            rows = in_stock_parts_under(serial, Decimal('5'))
+
+        self.assertEqual([row['part_number'] for row in rows], ['P00001', 'P00002'])
+        self.assertEqual(rows[0]['list_price'], Decimal('3.00'))
+
+
+def write_pricing_json(folder, name, values, whs_stock=None):
+    """A scraper JSON file with the given {INDEX_MAPPING index: value}"""
+    path = os.path.join(folder, name)
+    all_inputs = [{'index': index, 'value': values.get(index, '')} for index in range(max(INDEX_MAPPING) + 1)]
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'allInputs': all_inputs, 'whs_stock': whs_stock or {}}, file)
+    return path
+
+
+class LoadPricesTests(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        build_serial('VIN1', parents=1, children=1, parts=4, priced_every=2)
+
+    def test_parse_json_file(self):
+        from loadprices import parse_json_file
+
+        record = parse_json_file(write_pricing_json(self.tmp, 'P00001.json', {
+            3: 'P00001', 4: 'Bolt', 5: 'A', 24: '£1,234.50', 29: '', 34: '9.8',
+        }, {'whs': '02', 'stock_available': '10+'}))
+
+        self.assertEqual((record['part_number'], record['filename_part_number']), ('P00001', 'P00001'))
+        fields = record['fields']
+        self.assertNotIn('part_number_value', fields)
+        self.assertEqual((fields['description'], fields['active'], fields['whs']), ('Bolt', True, '02'))
+        self.assertEqual((fields['list_price'], fields['vor'], fields['stock_order']),
+                         (Decimal('1234.50'), None, Decimal('9.80')))
+        self.assertEqual((fields['stock_available'], fields['stock_qty']), ('10+', 10))
+
+    def test_unusable_files_are_skipped(self):
+        from loadprices import parse_json_file
+
+        paths = [write_pricing_json(self.tmp, 'blank.json', {4: 'No number'}),
+                 write_pricing_json(self.tmp, 'long.json', {3: 'P00001', 4: 'x' * 101})]
+        for name, content in (('broken.json', '{"allInputs": ['), ('list.json', '[1, 2]'), ('str.json', '"P00001"')):
+            paths.append(os.path.join(self.tmp, name))
+            with open(paths[-1], 'w', encoding='utf-8') as file:
+                file.write(content)
+        paths.append(os.path.join(self.tmp, 'missing.json'))
+
+        with self.assertLogs('loadprices', 'WARNING') as logs:
+            self.assertEqual([parse_json_file(path) for path in paths], [None] * 6)
+        self.assertEqual(len(logs.records), 6)
+
+    def test_load_records_skips_or_updates_existing_pricing(self):
+        from loadprices import load_records
+
+        def record(number, description, filename=None):
+            return {'path': f'{number}.json', 'part_number': number, 'filename_part_number': filename or number,
+                    'fields': {'description': description, 'list_price': Decimal('2.00')}}
+
+        records = [record('P00000', 'New 0'), record('P00001', 'New 1'), record('typo', 'New 3', 'P00003'),
+                   record('NOPE', 'Unknown')]
+        with self.assertLogs('loadprices', 'ERROR'):
+            stats = load_records(records)
+        self.assertEqual({key: stats[key] for key in ('created', 'updated', 'skipped', 'not_found')},
+                         {'created': 2, 'updated': 0, 'skipped': 1, 'not_found': 1})
+        self.assertEqual(PricingData.objects.get(part_number__number='P00000').description, 'Desc 0')
+        self.assertEqual(PricingData.objects.get(part_number__number='P00003').description, 'New 3')
+
+        stats = load_records(records[:3], update_existing=True)
+        self.assertEqual((stats['created'], stats['updated'], stats['skipped']), (0, 3, 0))
+        self.assertEqual(PricingData.objects.get(part_number__number='P00000').description, 'New 0')
+
+    def test_batches_split_at_batch_size(self):
+        from loadprices import load_records
+
+        records = [{'path': f'P0000{n}.json', 'part_number': f'P0000{n}', 'filename_part_number': f'P0000{n}',
+                    'fields': {'description': f'Batch {n}'}} for n in range(4)]
+        PricingData.objects.all().delete()
+        load_records(records[:1])
+
+        with CaptureQueriesContext(connection) as queries:
+            stats = load_records(records, batch_size=2, update_existing=True)
+
+        self.assertEqual((stats['created'], stats['updated']), (3, 1))
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "motorpartsdata_pricingdata"')]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(sorted(PricingData.objects.values_list('description', flat=True)),
+                         ['Batch 0', 'Batch 1', 'Batch 2', 'Batch 3'])
+
+    def test_process_folder_keeps_going_past_bad_files(self):
+        from loadprices import process_folder
+
+        write_pricing_json(self.tmp, 'P00001.json', {3: 'P00001', 4: 'Bolt'})
+        with open(os.path.join(self.tmp, 'P00003.json'), 'w', encoding='utf-8') as file:
+            file.write('[]')
+
+        with self.assertLogs('loadprices', 'INFO'):
+            stats = process_folder(self.tmp)
+
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(PricingData.objects.get(part_number__number='P00001').description, 'Bolt')
+
+
+class PartNumberTests(TestCase):
+
+    def test_resolve_creates_each_number_once(self):
+        first = PartNumber.resolve(['A1', 'B2', 'A1'])
+        second = PartNumber.resolve(['B2', 'C3'])
+
+        self.assertEqual(PartNumber.objects.count(), 3)
+        self.assertEqual(first['B2'], second['B2'])
+        self.assertEqual(set(second), {'B2', 'C3'})
+
+    def test_ingest_links_parts_to_canonical_numbers(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        shutil.copytree(SAMPLE_SECTION, os.path.join(tmp, 'TESTVIN0000000001', 'safety belt'))
+
+        ingest_directory(os.path.join(tmp, 'TESTVIN0000000001'), workers=1)
+
+        self.assertFalse(Part.objects.exclude(canonical__number=F('part_number')).exists())
+        self.assertEqual(PartNumber.objects.count(), Part.objects.values('part_number').distinct().count())
+
+    def test_pricing_is_shared_across_serials(self):
+        build_serial('VIN1', parents=1, children=1, parts=2)
+        build_serial('VIN2', parents=1, children=1, parts=2)
+
+        self.assertEqual(PricingData.objects.count(), 1)
+        instances = part_instances_pricing(['P00000'])
+        self.assertEqual([has for _, has in instances['P00000']], [True, True])
+        # Re-ingesting a serial's parts leaves the pricing of its numbers in place
+        Part.objects.filter(child_title__parent__serial_number__serial='VIN1').delete()
+        self.assertEqual(PricingData.objects.count(), 1)
+
+
+class SerialPartTests(TestCase):
+
+    def test_part_save_and_ingest_maintain_rows(self):
+        build_serial('VIN1', parents=1, children=2, parts=2)
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        shutil.copytree(SAMPLE_SECTION, os.path.join(tmp, 'TESTVIN0000000001', 'safety belt'))
+        ingest_directory(os.path.join(tmp, 'TESTVIN0000000001'), workers=1)
+
+        self.assertEqual(SerialPart.objects.count(), Part.objects.count())
+        self.assertEqual(refresh_serial_parts(), {'created': 0, 'deleted': 0})
+
+    def test_lookups_both_ways_are_single_queries(self):
+        vin1 = build_serial('VIN1', parents=1, children=2, parts=2)
+        build_serial('VIN2', parents=1, children=1, parts=2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(serials_using('P00001'), ['VIN1', 'VIN2'])
+        with self.assertNumQueries(1):
+            self.assertEqual(serials_using('P00003'), ['VIN1'])
+        with self.assertNumQueries(1):
+            self.assertEqual(serial_part_numbers(vin1), {'P00000', 'P00001', 'P00002', 'P00003'})
+
+    def test_part_saves_skip_unchanged_rows(self):
+        build_serial('VIN1', parents=1, children=1, parts=2)
+        part = Part.objects.get(part_number='P00001')
+
+        # Resolve, update, then read the serial and the row, which is unchanged
+        with self.assertNumQueries(4):
+            part.save()
+        with self.assertNumQueries(1):
+            part.usage_name = 'Renamed'
+            part.save(update_fields=['usage_name'])
+        part.call_out_order = 42
+        part.save(update_fields=['call_out_order'])
+        self.assertEqual(SerialPart.objects.get(part=part).call_out_order, 42)
+        part.part_number = 'P00000'
+        part.save(update_fields=['part_number'])
+        self.assertEqual(SerialPart.objects.get(part=part).part_number.number, 'P00000')
+        self.assertEqual(Part.objects.get(pk=part.pk).canonical.number, 'P00000')
+
+    def test_refresh_repairs_bulk_changes(self):
+        serial = build_serial('VIN1', parents=1, children=1, parts=3)
+        other = build_serial('VIN2', parents=1, children=1, parts=1, prefix='Q')
+        # Bulk paths that skip Part.save()
+        Part.objects.filter(part_number='P00001').update(call_out_order=42)
+        SerialPart.objects.filter(part__part_number='P00002').delete()
+
+        stats = refresh_serial_parts([serial.id])
+
+        self.assertEqual(stats, {'created': 2, 'deleted': 1})
+        self.assertEqual(SerialPart.objects.get(part__part_number='P00001').call_out_order, 42)
+        self.assertEqual(SerialPart.objects.filter(serial_number=other).count(), 1)
+
+    def test_refresh_command_and_part_usage(self):
+        build_serial('VIN1', parents=1, children=1, parts=2)
+        SerialPart.objects.all().delete()
+        out = StringIO()
+
+        call_command('refresh_serial_parts', '--serial', 'VIN1', '--full', stdout=out)
+        call_command('part_usage', '--part', 'P00001', stdout=out)
+
+        self.assertIn('2 rows written', out.getvalue())
+        self.assertTrue(out.getvalue().endswith('VIN1\n'))
+
+
+class CatalogueDiffTests(TestCase):
+
+    def setUp(self):
+        # VIN1 P00000-P00003, VIN2 P00000-P00001 + Q00000-Q00001, VIN3 P00000 only
+        self.vin1 = build_serial('VIN1', parents=1, children=2, parts=2)
+        self.vin2 = build_serial('VIN2', parents=1, children=1, parts=2)
+        self.vin2_extra = build_serial('VIN2X', parents=1, children=1, parts=2, prefix='Q', priced_every=99)
+        ParentTitle.objects.filter(serial_number=self.vin2_extra).update(serial_number=self.vin2)
+        refresh_serial_parts()
+        self.vin3 = build_serial('VIN3', parents=1, children=1, parts=1)
+
+    def test_two_serials_in_one_query(self):
+        with self.assertNumQueries(1):
+            diff = diff_serials(self.vin1, [self.vin2])
+
+        self.assertEqual(part_numbers(diff, 'added'), ['Q00000', 'Q00001'])
+        self.assertEqual(part_numbers(diff, 'removed'), ['P00002', 'P00003'])
+        self.assertEqual(part_numbers(diff, 'shared'), ['P00000', 'P00001'])
+        self.assertEqual(part_numbers(diff, 'added', unpriced_only=True), ['Q00001'])
+
+    def test_many_serials(self):
+        diff = diff_serials(self.vin1, [self.vin2, self.vin3])
+
+        self.assertEqual(summarise(diff), {'added': 2, 'removed': 2, 'shared': 1, 'partial': 1})
+        self.assertEqual(part_numbers(diff, 'partial'), ['P00001'])
+        self.assertEqual(diff[-1], {'part_number': 'P00001', 'status': 'partial', 'serials': 2, 'has_pricing': False})
+
+    def test_command_writes_csv_and_seeds_queue(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        queue = os.path.join(tmp, 'next.txt')
+        out = StringIO()
+
+        call_command('diff_serials', 'VIN1', 'VIN2', '--format', 'csv', '--queue', queue, stdout=out, stderr=StringIO())
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'part_number,status,serials,has_pricing')
+        self.assertEqual(lines[1], 'Q00000,added,1,True')
+        with open(queue, encoding='utf-8') as file:
+            self.assertEqual(file.read(), "['Q00001']")
+
+
+class StubPricingPage:
+    """Stands in for the XT pricing page: fails a code fail_times before answering"""
+
+    def __init__(self, fail_times=None):
+        self.fail_times = dict(fail_times or {})
+        self.captured = []
+
+    def __call__(self, code):
+        if self.fail_times.get(code, 0) > 0:
+            self.fail_times[code] -= 1
+            raise TimeoutError(f"pricing for {code} did not load")
+        self.captured.append(code)
+
+
+class PriceScrapeQueueTests(TestCase):
+
+    def setUp(self):
+        # P00000 and P00002 priced; P00001 used by both serials, P00003 by VIN1 only
+        build_serial('VIN1', parents=1, children=2, parts=2)
+        build_serial('VIN2', parents=1, children=1, parts=2)
+
+    def test_unpriced_and_widely_used_numbers_come_first(self):
+        self.assertEqual(enqueue(), {'created': 4, 'requeued': 0})
+
+        jobs = claim(10, 'test')
+
+        self.assertEqual([job.part_number.number for job in jobs], ['P00001', 'P00003', 'P00000', 'P00002'])
+        self.assertEqual(claim(10, 'other'), [])
+
+    def test_enqueue_deduplicates_and_requeues_finished_jobs(self):
+        enqueue(['P00001', 'P00003'])
+        page = StubPricingPage()
+        work(page, 'test')
+
+        stats = enqueue(['P00001', 'P00001', 'P00000'], unpriced_only=True)
+
+        self.assertEqual(stats, {'created': 0, 'requeued': 1})
+        self.assertEqual(PriceScrapeJob.objects.count(), 2)
+        self.assertEqual(PriceScrapeJob.objects.get(part_number__number='P00001').status, PriceScrapeJob.PENDING)
+
+    def test_failed_jobs_back_off_then_give_up(self):
+        enqueue(['P00001', 'P00003'])
+        page = StubPricingPage(fail_times={'P00001': 99})
+
+        with self.assertLogs('motorpartsdata.scrape_queue', 'WARNING'):
+            self.assertEqual(work(page, 'test'), {'done': 1, 'failed': 1})
+        job = PriceScrapeJob.objects.get(part_number__number='P00001')
+        self.assertEqual((job.status, job.attempts), (PriceScrapeJob.PENDING, 1))
+        self.assertGreater(job.next_attempt_at, timezone.now())
+        self.assertIn('did not load', job.last_error)
+
+        with self.assertLogs('motorpartsdata.scrape_queue', 'WARNING'):
+            for _ in range(MAX_ATTEMPTS - 1):
+                PriceScrapeJob.objects.filter(pk=job.pk).update(next_attempt_at=timezone.now())
+                work(page, 'test')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (PriceScrapeJob.FAILED, MAX_ATTEMPTS))
+        self.assertEqual(page.captured, ['P00003'])
+
+    def test_stale_claims_are_handed_out_again(self):
+        enqueue(['P00001'])
+        claim(1, 'crashed')
+        PriceScrapeJob.objects.update(claimed_at=timezone.now() - CLAIM_TIMEOUT * 2)
+
+        self.assertEqual([job.claimed_by for job in claim(1, 'test')], ['test'])
+
+    def test_commands_seed_the_queue(self):
+        call_command('diff_serials', 'VIN2', 'VIN1', '--enqueue', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(list(PriceScrapeJob.objects.values_list('part_number__number', flat=True)), ['P00003'])
+
+        out = StringIO()
+        call_command('scrape_queue', '--unpriced', stdout=out)
+        self.assertIn('pending: 2', out.getvalue())
+
+
+class FakePricingPage:
+    """
+    A driver whose pricing inputs change polls_until_ready capture calls after
+    each search, and its warehouse/stock row whs_delay calls after that
+    """
+
+    def __init__(self, polls_until_ready=3, whs_delay=0):
+        self.polls_until_ready = polls_until_ready
+        self.whs_delay = whs_delay
+        self.values = {index: '' for index in INDEX_MAPPING}
+        self.whs_stock = {}
+        self.pending = []
+        self.scripts = 0
+
+    def search(self, code, price, stock='10+'):
+        self.values[3] = code
+        self.pending = [
+            [self.polls_until_ready, {4: f"DESC {code}", 5: 'A', 24: price}, None],
+            [self.polls_until_ready + self.whs_delay, {}, {'whs': '02', 'stock_available': stock}],
+        ]
+
+    def execute_script(self, script, indexes, row_styles):
+        self.scripts += 1
+        for step in self.pending:
+            step[0] -= 1
+            if step[0] == 0:
+                self.values.update(step[1])
+                if step[2] is not None:
+                    self.whs_stock = step[2]
+        # JSON round trip: keys arrive as strings
+        return {'values': {str(index): self.values[index] for index in indexes}, 'whs_stock': dict(self.whs_stock)}
+
+
+class PriceCaptureTests(TestCase):
+
+    def test_wait_returns_once_the_change_has_settled(self):
+        page = FakePricingPage(polls_until_ready=3)
+        before = capture(page)
+        page.search('C00253935', '48.43')
+
+        snapshot = wait_for_update(page, before, poll=0, stable=0)
+
+        # The first changed poll, then one more to see it hold
+        self.assertEqual(page.scripts, 5)
+        self.assertEqual(snapshot['values'][24], '48.43')
+        self.assertEqual(snapshot['whs_stock'], {'whs': '02', 'stock_available': '10+'})
+
+    def test_page_filled_in_two_steps_is_not_captured_half_way(self):
+        page = FakePricingPage(polls_until_ready=2, whs_delay=1)
+        blank = capture(page)
+        page.search('C00000001', '10.00', stock='Nil')
+        before = wait_for_update(page, blank, poll=0)
+        page.search('C00253935', '48.43')
+
+        snapshot = wait_for_update(page, before, poll=0)
+
+        self.assertEqual(snapshot['values'][4], 'DESC C00253935')
+        self.assertEqual(snapshot['whs_stock'], {'whs': '02', 'stock_available': '10+'})
+
+    def test_stock_row_filled_polls_later_is_waited_for(self):
+        page = FakePricingPage(polls_until_ready=1, whs_delay=4)
+        before = capture(page)
+        page.search('C00253935', '48.43')
+
+        snapshot = wait_for_update(page, before, poll=0.01)
+
+        self.assertEqual(snapshot['values'][24], '48.43')
+        self.assertEqual(snapshot['whs_stock'], {'whs': '02', 'stock_available': '10+'})
+
+    def test_changed_page_must_hold_still_for_the_stable_window(self):
+        page = FakePricingPage(polls_until_ready=1)
+        blank = capture(page)
+        page.search('C00000001', '10.00')
+        before = wait_for_update(page, blank, poll=0, stable=0)
+        page.whs_delay = 4
+        page.search('C00253935', '48.43', stock='Nil')
+        started = time.monotonic()
+
+        snapshot = wait_for_update(page, before, poll=0.01, stable=0.1)
+
+        # The old stock row is still showing while the new values come in
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        self.assertEqual(snapshot['whs_stock']['stock_available'], 'Nil')
+
+    def test_typing_the_code_alone_is_not_an_update(self):
+        page = FakePricingPage(polls_until_ready=5)
+        before = capture(page)
+        page.search('C00253935', '48.43')
+
+        snapshot = wait_for_update(page, before, poll=0, settle=10)
+
+        self.assertEqual(snapshot['values'][24], '48.43')
+
+    def test_identical_result_is_accepted_after_settle_window(self):
+        page = FakePricingPage(polls_until_ready=1)
+        blank = capture(page)
+        page.search('C00000001', '10.00')
+        before = wait_for_update(page, blank, poll=0)
+        # A code rendering exactly like the previous one never changes the page
+        page.search('C00000001', '10.00')
+
+        snapshot = wait_for_update(page, before, poll=0, settle=0.01)
+
+        self.assertEqual(signature(snapshot), signature(before))
+
+    def test_page_that_never_settles_times_out(self):
+        page = FakePricingPage()
+        before = capture(page)
+        counter = iter(range(10 ** 9))
+        page.execute_script = lambda *args: {'values': {'4': str(next(counter))}, 'whs_stock': {}}
+
+        with self.assertRaises(CaptureTimeout):
+            wait_for_update(page, before, timeout=0.01, poll=0)
+
+    def test_form_data_keeps_loadprices_positions(self):
+        page = FakePricingPage(polls_until_ready=1)
+        before = capture(page)
+        page.search('C00253935', '48.43')
+
+        form_data = to_form_data(wait_for_update(page, before, poll=0))
+
+        captured = {name: form_data['allInputs'][index].get('value', '') for index, name in INDEX_MAPPING.items()}
+        self.assertEqual(captured['part_number_value'], 'C00253935')
+        self.assertEqual(captured['list_price'], '48.43')
+        self.assertEqual(captured['vor'], '')
+        self.assertEqual(len(form_data['allInputs']), max(INDEX_MAPPING) + 1)
+        self.assertEqual(form_data['whs_stock']['stock_available'], '10+')
+
+    def test_latency_summary(self):
+        stats = LatencyStats()
+        for total in (0.2, 0.4, 0.3):
+            stats.add('C1', total / 2, total)
+
+        summary = stats.summary()
+
+        self.assertEqual((summary['parts'], summary['p50_ms'], summary['max_ms']), (3, 300, 400))
+        self.assertEqual(summary['mean_wait_ms'], 150)
+
+
+class PartSearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        build_serial('VIN1', parents=1, children=2, parts=3)
+        rebuild_index()
+
+    def numbers(self, query):
+        return [PartNumber.objects.get(id=part_number_id).number for part_number_id, _ in search(query)]
+
+    def test_matches_number_usage_description_and_titles(self):
+        self.assertEqual(self.numbers('P00004'), ['P00004'])
+        self.assertEqual(self.numbers('usage 4'), ['P00004'])
+        self.assertEqual(self.numbers('desc 4'), ['P00004'])
+        self.assertEqual(len(self.numbers('parent')), 6)
+        self.assertLessEqual({'P00003', 'P00004', 'P00005'}, set(self.numbers('child 0-1')))
+
+    def test_prefix_typo_and_separator_matching(self):
+        self.assertEqual(len(self.numbers('P0000')), 6)
+        self.assertEqual(len(self.numbers('usgae 2')), 1)
+        self.assertEqual(self.numbers('p00 004'), ['P00004'])
+        self.assertEqual(self.numbers('nothing'), [])
+
+    def test_number_matches_rank_first(self):
+        part = Part.objects.get(part_number='P00001')
+        Part.objects.create(child_title=part.child_title, call_out_order=9, part_number='Q1',
+                            usage_name='Fits P00001', unit_qty='1')
+        rebuild_index()
+
+        self.assertEqual(self.numbers('p00001'), ['P00001', 'Q1'])
+
+    def test_reindexing_picks_up_new_text(self):
+        pricing = PricingData.objects.get(part_number__number='P00002')
+        pricing.description = 'Wiper blade'
+        pricing.save()
+        self.assertEqual(self.numbers('wiper'), [])
+
+        index_part_numbers([pricing.part_number_id])
+
+        self.assertEqual(self.numbers('wiper'), ['P00002'])
+        self.assertEqual(self.numbers('desc 2'), [])
+
+    def test_ingest_indexes_its_part_numbers(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        shutil.copytree(SAMPLE_SECTION, os.path.join(tmp, 'TESTVIN0000000001', 'safety belt'))
+
+        ingest_directory(os.path.join(tmp, 'TESTVIN0000000001'), workers=1)
+
+        self.assertIn('C00160309', self.numbers('C00160309'))
+        self.assertTrue(set(self.numbers('seat belts')) >= {'C00160309'})
+
+    def test_shop_search_returns_ranked_products(self):
+        import_to_oscar('--serial', 'VIN1', '--bulk')
+
+        response = self.client.get(reverse('search:search'), {'q': 'usage 4'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result.object.upc for result in response.context['page'].object_list], ['EPC-P00004'])
+
+    def test_backend_pages_and_counts_in_the_database(self):
+        import_to_oscar('--serial', 'VIN1', '--bulk')
+        backend = haystack_connections['default'].get_backend()
+
+        full = backend.search('usage')
+        first = backend.search('usage', start_offset=0, end_offset=2)
+        with CaptureQueriesContext(connection) as queries:
+            second = backend.search('usage', start_offset=2, end_offset=4)
+
+        upcs = [result.object.upc for result in full['results']]
+        self.assertEqual((full['hits'], first['hits'], len(upcs)), (6, 6, 6))
+        self.assertEqual([result.object.upc for result in first['results'] + second['results']], upcs[:4])
+        # The page's hits are read with LIMIT, never the whole posting list
+        reads = [query['sql'] for query in queries.captured_queries
+                 if query['sql'].startswith('SELECT "motorpartsdata_searchposting"."part_number_id", ')]
+        self.assertEqual(len(reads), 1)
+        self.assertIn('LIMIT 4', reads[0])
+
+    def test_shop_search_finds_products_with_bare_part_number_upcs(self):
+        # As created by scrapeandpush_oscar
+        product_class = get_model('catalogue', 'ProductClass').objects.create(name='Part')
+        Product.objects.create(upc='P00002', title='Usage 2', product_class=product_class, slug='usage-2-p00002')
+
+        response = self.client.get(reverse('search:search'), {'q': 'usage 2'})
+
+        self.assertEqual([result.object.upc for result in response.context['page'].object_list], ['P00002'])
+
+
+class PartLookupTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        build_serial('VIN1', parents=1, children=2, parts=3)
+        Part.objects.create(child_title=ChildTitle.objects.last(), call_out_order=9, part_number='C00049476-1',
+                            usage_name='Bracket', unit_qty='1')
+
+    def test_normalize(self):
+        self.assertEqual(PartNumber.normalize(' b0000-3507 '), 'B00003507')
+        part_number = PartNumber.objects.get(number='C00049476-1')
+        self.assertEqual(part_number.normalized, 'C000494761')
+        # The key and its distinct one-deletion forms (deleting any of the 0s gives the same one)
+        self.assertEqual(part_number.variants.count(), 9)
+
+    def test_exact_normalised_and_near_lookups(self):
+        expected = PartNumber.objects.get(number='P00004')
+        with self.assertNumQueries(1):
+            self.assertEqual(lookup('P00004'), (expected, EXACT))
+        self.assertEqual(lookup('c0004 9476/1')[1], NORMALISED)
+        part_number, match = lookup('P00040')
+        self.assertEqual(match, NEAR)
+        self.assertIn(part_number.number, {'P00004', 'P00000'})
+        self.assertEqual(lookup('XYZ'), (None, None))
+        self.assertEqual(lookup('c0004 9476/1', near=False)[0].number, 'C00049476-1')
+        self.assertEqual([p.number for p in near_misses('C00049467-1')], ['C00049476-1'])
+
+    def test_exact_number_beats_numbers_sharing_its_key(self):
+        PartNumber.resolve(['P0000-4'])
+
+        self.assertEqual(lookup('P0000-4')[0].number, 'P0000-4')
+        self.assertEqual(lookup('P00004')[0].number, 'P00004')
+        self.assertEqual([(p.number, match) for p, match in matches('p00004')][:2],
+                         [('P0000-4', NORMALISED), ('P00004', NORMALISED)])
+
+    def test_diagrams_match_epc_upcs_and_typed_numbers(self):
+        diagrams = diagrams_for_upcs(['EPC-P00004', 'p0000 4', 'EPC-NOPE'])
+
+        self.assertEqual(diagrams['EPC-P00004']['title'], 'Child 0-1')
+        self.assertEqual(diagrams['p0000 4']['title'], 'Child 0-1')
+        self.assertIsNone(diagrams['EPC-NOPE'])
+
+    def test_endpoints_use_lookup(self):
+        response = self.client.get(reverse('svg_diagram', args=['EPC-C00049467-1']))
+        self.assertEqual(response.json()['suggestions'], ['C00049476-1'])
+
+        response = self.client.get(reverse('part_pricing_detail', args=['c00049476 1']))
+        self.assertEqual(response.context['part'].part_number, 'C00049476-1')
+        self.assertEqual(response.context['searched_for'], 'c00049476 1')
+        self.assertFalse(response.context['near_miss'])
+
+
+class SupersessionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        build_serial('VIN1', parents=1, children=2, parts=3, priced_every=1)
+
+    def replace(self, number, replacement='', oldest=''):
+        PricingData.objects.filter(part_number__number=number).update(replacement=replacement, oldest=oldest)
+
+    def test_successors_prefer_explicit_replacements(self):
+        records = [('B', 'C', 'A'), ('C', '', 'A'), ('X', 'Y', 'X'), ('D', 'D', '')]
+        self.assertEqual(successors(records), {'B': 'C', 'A': 'C', 'X': 'Y'})
+
+    def test_closure_flags_the_end_of_each_chain(self):
+        rows, cycles = closure({'A': 'B', 'B': 'C'})
+        self.assertEqual(sorted(rows), [('A', 'B', 1, False), ('A', 'C', 2, True), ('B', 'C', 1, True)])
+        self.assertEqual(cycles, 0)
+
+        rows, cycles = closure({'A': 'B', 'B': 'A', 'C': 'A'})
+        self.assertEqual(cycles, 3)
+        self.assertFalse(any(is_current for *_, is_current in rows))
+
+    def test_rebuild_and_lookups(self):
+        self.replace('P00000', 'P00001')
+        self.replace('P00001', 'P00002')
+        # An old number with no pricing joins through the oldest field
+        self.replace('P00003', 'P00004', oldest='OLD1')
+
+        self.assertEqual(rebuild(), {'numbers': 4, 'rows': 6, 'cycles': 0})
+        self.assertEqual(current_replacement('P00000').number, 'P00002')
+        self.assertEqual(current_replacement('OLD1').number, 'P00004')
+        self.assertIsNone(current_replacement('P00002'))
+        self.assertEqual(superseded_numbers('P00002'), ['P00001', 'P00000'])
+        ids = dict(PartNumber.objects.values_list('number', 'id'))
+        with self.assertNumQueries(1):
+            found = current_replacements([ids['P00000'], ids['P00002']])
+        self.assertEqual({key: value.number for key, value in found.items()}, {ids['P00000']: 'P00002'})
+
+        # Rebuilding replaces the old closure
+        self.replace('P00001')
+        rebuild()
+        self.assertEqual(current_replacement('P00000').number, 'P00001')
+        self.assertIsNone(current_replacement('P00001'))
+
+    def test_cycles_have_no_current_replacement(self):
+        self.replace('P00000', 'P00001')
+        self.replace('P00001', 'P00000')
+
+        self.assertEqual(rebuild()['cycles'], 2)
+        self.assertIsNone(current_replacement('P00000'))
+
+    def test_loadprices_rebuilds(self):
+        from loadprices import load_records
+
+        stats = load_records([{
+            'path': 'P00000.json', 'part_number': 'P00000', 'filename_part_number': 'P00000',
+            'fields': {'replacement': 'P00005', 'oldest': 'P00000'},
+        }], update_existing=True)
+
+        self.assertEqual(stats['supersessions'], 1)
+        self.assertEqual(current_replacement('P00000').number, 'P00005')
+
+    def test_search_results_follow_with_replacement(self):
+        self.replace('P00000', 'P00001')
+        rebuild()
+        ids = dict(PartNumber.objects.values_list('number', 'id'))
+
+        self.assertEqual(with_replacements([(ids['P00000'], 4), (ids['P00003'], 2)]),
+                         [(ids['P00000'], 4), (ids['P00001'], 4), (ids['P00003'], 2)])
+        # Already a hit, so not repeated
+        self.assertEqual(with_replacements([(ids['P00001'], 4), (ids['P00000'], 2)]),
+                         [(ids['P00001'], 4), (ids['P00000'], 2)])
+
+    def test_shop_search_lists_and_counts_replacements(self):
+        import_to_oscar('--serial', 'VIN1', '--bulk')
+        self.replace('P00000', 'P00001')
+        rebuild()
+        rebuild_index()
+        backend = haystack_connections['default'].get_backend()
+
+        found = backend.search('P00000')
+
+        self.assertEqual(found['hits'], 2)
+        self.assertEqual([result.object.upc for result in found['results']], ['EPC-P00000', 'EPC-P00001'])
+        self.assertEqual(backend.search('usage')['hits'], 6)
+
+    def test_pricing_page_shows_replacement(self):
+        self.replace('P00000', 'P00001')
+        rebuild()
+
+        response = self.client.get(reverse('part_pricing_detail', args=['P00000']))
+        self.assertEqual(response.context['current_replacement'].number, 'P00001')
+        self.assertContains(response, 'Superseded by')
+        response = self.client.get(reverse('part_pricing_detail', args=['P00001']))
+        self.assertEqual(response.context['superseded_numbers'], ['P00000'])
+
+    def test_pricing_page_shows_replacement_on_no_diagram(self):
+        # Supersession creates the PartNumber of a replacement on no diagram
+        self.replace('P00000', 'P09999')
+        rebuild()
+        PricingData.objects.create(part_number=PartNumber.objects.get(number='P09999'), description='New style')
+
+        response = self.client.get(reverse('part_pricing_detail', args=['P09999']))
+
+        self.assertIsNone(response.context['part'])
+        self.assertEqual(response.context['superseded_numbers'], ['P00000'])
+        self.assertContains(response, 'Not used on any diagram.')
+        self.assertContains(response, 'New style')
+
+
+class FitmentTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.vin1 = build_serial('VIN1', parents=1, children=2, parts=2)
+        self.vin2 = build_serial('VIN2', parents=1, children=1, parts=2)
+
+    def test_serial_set_encodings(self):
+        sparse = SerialSet.of([70000, 3, 3])
+        self.assertEqual(list(sparse), [3, 70000])
+        self.assertEqual(len(sparse), 2)
+        self.assertIn(70000, sparse)
+        self.assertNotIn(4, sparse)
+
+        dense = SerialSet.of(range(0, 2000, 2))
+        self.assertEqual(dense.data[:1], BITMAP)
+        self.assertEqual(len(dense.data), 251)
+        self.assertEqual(len(dense), 1000)
+        self.assertIn(1998, dense)
+        self.assertNotIn(1999, dense)
+        self.assertNotIn(5000, dense)
+        self.assertEqual(list(SerialSet(dense.data)), list(range(0, 2000, 2)))
+        self.assertEqual(list(SerialSet()), [])
+
+    def test_part_saves_maintain_fitment(self):
+        self.assertEqual(compatible_serials('P00001'), ['VIN1', 'VIN2'])
+        self.assertEqual(compatible_serials('P00003'), ['VIN1'])
+        self.assertEqual(compatible_serials('NOPE'), [])
+        self.assertTrue(fits('P00001', 'VIN2'))
+        self.assertFalse(fits('P00003', 'VIN2'))
+        self.assertFalse(fits('P00001', 'NOVIN'))
+
+        part = Part.objects.get(child_title__parent__serial_number=self.vin2, part_number='P00001')
+        part.part_number = 'P00003'
+        part.save()
+        self.assertEqual(compatible_serials('P00001'), ['VIN1'])
+        self.assertTrue(fits('P00003', 'VIN2'))
+        with self.captureOnCommitCallbacks(execute=True):
+            part.delete()
+        self.assertFalse(fits('P00003', 'VIN2'))
+
+    def test_deleting_a_serial_updates_fitment_once(self):
+        with mock.patch.object(fitment, 'update_part_numbers', wraps=fitment.update_part_numbers) as update, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.vin2.delete()
+
+        update.assert_called_once()
+        self.assertEqual(set(update.call_args.args[0]), set(PartNumber.objects.filter(
+            number__in=['P00000', 'P00001']).values_list('id', flat=True)))
+        self.assertEqual(compatible_serials('P00001'), ['VIN1'])
+
+    def test_cached_checks_skip_the_database(self):
+        fits('P00001', 'VIN1')
+        compatible_serials('P00001')
+        with self.assertNumQueries(0):
+            self.assertTrue(fits('P00001', 'VIN1'))
+            self.assertEqual(compatible_serials('P00001'), ['VIN1', 'VIN2'])
+
+    def test_rebuild_and_refresh(self):
+        Fitment.objects.all().delete()
+        self.assertEqual(rebuild_fitment(), {'part_numbers': 4, 'serials': 2})
+        self.assertEqual(compatible_serials('P00000'), ['VIN1', 'VIN2'])
+
+        # Bulk changes bypass the signals until refresh_serial_parts repairs them
+        Part.objects.filter(child_title__parent__serial_number=self.vin2).update(canonical=PartNumber.resolve(['X1'])['X1'])
+        refresh_serial_parts([self.vin2.id])
+        self.assertEqual(compatible_serials('P00000'), ['VIN1'])
+        self.assertEqual(compatible_serials('X1'), ['VIN2'])
+
+    def test_ingest_updates_fitment(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        shutil.copytree(SAMPLE_SECTION, os.path.join(tmp, 'TESTVIN0000000001', 'safety belt'))
+        ingest_directory(os.path.join(tmp, 'TESTVIN0000000001'), workers=1)
+
+        number = Part.objects.filter(child_title__parent__serial_number__serial='TESTVIN0000000001').first().part_number
+        self.assertIn('TESTVIN0000000001', compatible_serials(number))
+
+    def test_endpoint(self):
+        response = self.client.get(reverse('fitment', args=['p0000 1']))
+        self.assertEqual(response.json(), {
+            'success': True, 'part_number': 'P00001', 'serial_count': 2, 'serials': ['VIN1', 'VIN2'],
+        })
+        response = self.client.get(reverse('fitment', args=['P00003']), {'serial': 'VIN2'})
+        self.assertFalse(response.json()['fits'])
+        response = self.client.get(reverse('fitment', args=['P00013']))
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('P00003', response.json()['suggestions'])
+
+    def test_endpoint_caches_only_known_numbers(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            response = self.client.get(reverse('fitment', args=['no such part']))
+            fits = self.client.get(reverse('fitment', args=['P00001']), {'serial': 'VIN 1'}).json()['fits']
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(fits)
+        cache_set.assert_not_called()
+
+
+class CatalogueApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.serial = build_serial('VIN1', parents=2, children=3, parts=2)
+        build_serial('VIN2', parents=1, children=1, parts=1)
+        self.section = ParentTitle.objects.filter(serial_number=self.serial).first()
+
+    def test_keyset_pages(self):
+        url = reverse('api_serial_sections', args=['VIN1'])
+        first = self.client.get(url, {'limit': 1}).json()
+        self.assertEqual([item['title'] for item in first['results']], ['Parent 0'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([item['title'] for item in second['results']], ['Parent 1'])
+        self.assertIsNone(second['next'])
+        self.assertEqual(set(second['results'][0]), {'id', 'title', 'serial_id'})
+
+        serials = self.client.get(reverse('api_serials')).json()['results']
+        self.assertEqual([item['serial'] for item in serials], ['VIN1', 'VIN2'])
+
+    def test_svg_code_only_loaded_when_asked(self):
+        url = reverse('api_section_diagrams', args=[self.section.id])
+        with CaptureQueriesContext(connection) as queries:
+            results = self.client.get(url).json()['results']
+        self.assertEqual(len(results), 3)
+        self.assertNotIn('svg_code', results[0])
+        self.assertTrue(results[0]['svg_url'].startswith('/svg/'))
+        self.assertFalse(any('svgblob' in query['sql'] for query in queries))
+
+        results = self.client.get(url, {'fields': 'title,svg_code'}).json()['results']
+        self.assertEqual(results[0], {'title': 'Child 0-0', 'svg_code': '<svg></svg>'})
+
+    def test_parts_and_errors(self):
+        diagram = ChildTitle.objects.filter(parent=self.section).first()
+        results = self.client.get(reverse('api_diagram_parts', args=[diagram.id]), {'fields': 'part_number'}).json()
+        self.assertEqual(results['results'], [{'part_number': 'P00000'}, {'part_number': 'P00001'}])
+
+        response = self.client.get(reverse('api_serials'), {'fields': 'serial,nope'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_serials'), {'limit': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_serial_sections', args=['NOVIN'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('api_diagram_parts', args=[0])).status_code, 404)
+        # Ids past bigint are rejected before they reach the database
+        self.assertEqual(self.client.get(reverse('api_serials'), {'after': str(2 ** 63 - 1)}).json()['results'], [])
+        self.assertEqual(self.client.get(reverse('api_serials'), {'after': '99999999999999999999'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_diagram_parts', args=[10 ** 20])).status_code, 404)
+
+    def test_conditional_get(self):
+        url = reverse('api_serials')
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        SerialNumber.objects.create(serial='VIN3')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import catalogue_api, views
 
 urlpatterns = [
     path('serial/', views.serial_lookup, name='serial_lookup'),
@@ -8,4 +8,9 @@ urlpatterns = [
     path('parts-pricing/<str:serial_number>/', views.parts_pricing_view, name='parts_pricing'),
     path('parts-pricing-debug/<str:serial_number>/', views.parts_pricing_debug, name='parts_pricing_debug'),
     path('part-detail/<str:part_number>/', views.part_pricing_detail, name='part_pricing_detail'),
+    path('fitment/<str:part_number>/', views.fitment_view, name='fitment'),
+    path('catalogue/serials/', catalogue_api.serials, name='api_serials'),
+    path('catalogue/serials/<str:serial>/sections/', catalogue_api.serial_sections, name='api_serial_sections'),
+    path('catalogue/sections/<int:section_id>/diagrams/', catalogue_api.section_diagrams, name='api_section_diagrams'),
+    path('catalogue/diagrams/<int:diagram_id>/parts/', catalogue_api.diagram_parts, name='api_diagram_parts'),
 ]
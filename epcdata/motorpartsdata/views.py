@@ -1,7 +1,12 @@
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.views import redirect_to_login
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import require_http_methods
 from .models import SerialNumber, ParentTitle, ChildTitle, Part, PricingData
+from . import fitment
+from .part_lookup import EXACT, NEAR, lookup, near_misses
+from .pricing import serial_parts_pricing, pricing_summary, part_instances_pricing
+from .supersession import current_replacement, superseded_numbers
 
 def serial_lookup(request):
     """Serial lookup view - SUPERUSER ONLY"""
@@ -62,72 +67,44 @@ def parts_pricing_view(request, serial_number):
             'serial_number': serial_number
         })
     
-    # Get all parts for this serial number through the relationship chain
-    parts_data = []
-    seen_part_numbers = set()
-    
-    # Navigate through SerialNumber -> ParentTitle -> ChildTitle -> Part
-    for parent_title in serial.parent_titles.all():
-        for child_title in parent_title.child_titles.all():
-            for part in child_title.parts.all():
-                if part.part_number in seen_part_numbers:
-                    continue
-                seen_part_numbers.add(part.part_number)
-                try:
-                    # Try to get pricing data for this part
-                    pricing_data = PricingData.objects.get(part_number=part)
-                    parts_data.append({
-                        'part': part,
-                        'description': pricing_data.description or 'N/A',
-                        'list_price': pricing_data.list_price or 'N/A',
-                        'stock_order': pricing_data.stock_order or 'N/A',
-                        'has_pricing': True,
-                        'parent_title': parent_title.title,
-                        'child_title': child_title.title
-                    })
-                except PricingData.DoesNotExist:
-                    parts_data.append({
-                        'part': part,
-                        'description': 'Data Missing',
-                        'list_price': 'Data Missing',
-                        'stock_order': 'Data Missing',
-                        'has_pricing': False,
-                        'parent_title': parent_title.title,
-                        'child_title': child_title.title
-                    })
-    
-    # Sort by has_pricing (False first, so "Data Missing" entries come first)
-    parts_data.sort(key=lambda x: x['has_pricing'])
+    # One joined query over SerialNumber -> ParentTitle -> ChildTitle -> Part -> PricingData,
+    # sorted with "Data Missing" entries first
+    parts_data = serial_parts_pricing(serial)
     
     return render(request, 'motorparts/parts_pricing.html', {
         'serial': serial,
         'serial_number': serial_number,
         'parts_data': parts_data,
-        'total_parts': len(parts_data),
-        'missing_pricing': len([p for p in parts_data if not p['has_pricing']]),
-        'with_pricing': len([p for p in parts_data if p['has_pricing']])
+        **pricing_summary(parts_data)
     })
 
 def part_pricing_detail(request, part_number):
     """
-    Display pricing data for a specific part number
+    Display pricing data for a specific part number, also found when typed
+    with other case or separators, or with one typo (see part_lookup)
     """
-    # Get the first part instance with this part number
-    part = Part.objects.filter(part_number=part_number).first()
-    
-    if not part:
+    canonical, match = lookup(part_number)
+    if not canonical:
         return render(request, 'motorparts/part_pricing_detail.html', {
             'error': f'Part number "{part_number}" not found',
             'part_number': part_number
         })
+
+    # Get the first part instance with this part number; replacement numbers
+    # known only from pricing data have none and show just their pricing
+    part = Part.objects.filter(canonical=canonical).order_by('id').first()
     
     # Get pricing data for this part
-    pricing_data = PricingData.objects.filter(part_number=part).first()
+    pricing_data = PricingData.objects.filter(part_number_id=canonical.id).first()
     has_pricing = pricing_data is not None
     
     return render(request, 'motorparts/part_pricing_detail.html', {
         'part': part,
-        'part_number': part_number,
+        'part_number': canonical.number,
+        'searched_for': part_number if match != EXACT else None,
+        'near_miss': match == NEAR,
+        'current_replacement': current_replacement(canonical.number),
+        'superseded_numbers': superseded_numbers(canonical.number),
         'pricing_data': pricing_data,
         'has_pricing': has_pricing
     })
@@ -144,65 +121,51 @@ def parts_pricing_debug(request, serial_number):
             'serial_number': serial_number
         })
     
-    # Get all parts for this serial number through the relationship chain
-    parts_data = []
-    seen_part_numbers = set()
-    debug_info = []
-    
-    # Navigate through SerialNumber -> ParentTitle -> ChildTitle → Part
-    for parent_title in serial.parent_titles.all():
-        for child_title in parent_title.child_titles.all():
-            for part in child_title.parts.all():
-                if part.part_number in seen_part_numbers:
-                    continue
-                seen_part_numbers.add(part.part_number)
-                
-                # Debug: Check all parts with this part_number
-                all_parts_with_same_number = Part.objects.filter(part_number=part.part_number)
-                parts_with_pricing = []
-                for p in all_parts_with_same_number:
-                    pricing_exists = PricingData.objects.filter(part_number=p).exists()
-                    parts_with_pricing.append(f"Part ID {p.id}: {'Yes' if pricing_exists else 'No'}")
-                
-                debug_info.append({
-                    'part_number': part.part_number,
-                    'current_part_id': part.id,
-                    'all_parts_info': parts_with_pricing
-                })
-                
-                # Try to get pricing data for this specific part
-                pricing_data = PricingData.objects.filter(part_number=part).first()
-                
-                if pricing_data:
-                    parts_data.append({
-                        'part': part,
-                        'description': pricing_data.description or 'N/A',
-                        'list_price': pricing_data.list_price or 'N/A',
-                        'stock_order': pricing_data.stock_order or 'N/A',
-                        'has_pricing': True,
-                        'parent_title': parent_title.title,
-                        'child_title': child_title.title
-                    })
-                else:
-                    parts_data.append({
-                        'part': part,
-                        'description': 'Data Missing',
-                        'list_price': 'Data Missing',
-                        'stock_order': 'Data Missing',
-                        'has_pricing': False,
-                        'parent_title': parent_title.title,
-                        'child_title': child_title.title
-                    })
+    parts_data = serial_parts_pricing(serial)
     
-    # Sort by has_pricing (False first, so "Data Missing" entries come first)
-    parts_data.sort(key=lambda x: x['has_pricing'])
+    # Debug: pricing status of every Part instance sharing each part number
+    instances = part_instances_pricing(item['part']['part_number'] for item in parts_data)
+    debug_info = []
+    for item in parts_data:
+        part_number = item['part']['part_number']
+        debug_info.append({
+            'part_number': part_number,
+            'current_part_id': item['part']['id'],
+            'all_parts_info': [
+                f"Part ID {part_id}: {'Yes' if has_pricing else 'No'}"
+                for part_id, has_pricing in instances.get(part_number, [])
+            ]
+        })
     
     return render(request, 'motorparts/parts_pricing_debug.html', {
         'serial': serial,
         'serial_number': serial_number,
         'parts_data': parts_data,
         'debug_info': debug_info,
-        'total_parts': len(parts_data),
-        'missing_pricing': len([p for p in parts_data if not p['has_pricing']]),
-        'with_pricing': len([p for p in parts_data if p['has_pricing']])
+        **pricing_summary(parts_data)
     })
+
+
+@require_http_methods(["GET"])
+def fitment_view(request, part_number):
+    """
+    JSON fitment of a part number: the serials it fits, or with ?serial=
+    whether it fits that one. Typed numbers are matched normalised.
+    """
+    # Resolved first, so only stored numbers (never raw URL text) become cache keys
+    found, _ = lookup(part_number, near=False)
+    if found is None:
+        return JsonResponse({
+            'success': False,
+            'message': 'Part not found',
+            'suggestions': [near.number for near in near_misses(part_number)],
+        }, status=404)
+    number = found.number
+
+    serial = request.GET.get('serial')
+    if serial:
+        # Serials are plain VINs; anything else can't fit and isn't worth a cache key
+        fits = serial.isascii() and serial.isalnum() and fitment.fits(number, serial)
+        return JsonResponse({'success': True, 'part_number': number, 'serial': serial, 'fits': fits})
+    serials = fitment.compatible_serials(number)
+    return JsonResponse({'success': True, 'part_number': number, 'serial_count': len(serials), 'serials': serials})
@@ -1,27 +1,121 @@
-from django.http import JsonResponse
+import gzip
+
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, Http404
+from django.urls import reverse
+from django.utils.http import http_date
 from django.views.decorators.http import require_http_methods
-from motorpartsdata.models import Part, ChildTitle
+from motorpartsdata.diagrams import diagrams_for_upcs
+from motorpartsdata.models import SvgBlob, brotli
+from motorpartsdata.part_lookup import near_misses, part_number_for_upc
+
+# Diagrams are addressed by the sha256 of their content, so a URL never changes meaning
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def accepted_encodings(header):
+    """Content codings listed in an Accept-Encoding header, minus any refused with q=0"""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding)
+    return accepted
+
+
+def choose_encoding(request):
+    """'br', 'gzip' or None (identity) for this request"""
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if brotli and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def svg_etag(digest, encoding):
+    # Each encoded variant is a different byte sequence, so it gets its own strong tag
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def etag_matches(request, digest):
+    """True if If-None-Match names any variant of this diagram"""
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        tag = tag.removeprefix('W/').strip('"')
+        if tag.split('-')[0] == digest:
+            return True
+    return False
+
+
+def cached_svg_response(response, digest, encoding):
+    response['ETag'] = svg_etag(digest, encoding)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@require_http_methods(["GET", "HEAD"])
+def svg_file_view(request, digest):
+    """Serve a stored diagram as image/svg+xml, precompressed when the client allows it"""
+    encoding = choose_encoding(request)
+
+    if etag_matches(request, digest):
+        if not SvgBlob.objects.filter(hash=digest).exists():
+            raise Http404("Unknown diagram")
+        return cached_svg_response(HttpResponseNotModified(), digest, encoding)
+
+    column = 'brotli_data' if encoding == 'br' else 'data'
+    row = SvgBlob.objects.filter(hash=digest).values_list('created_at', 'data', column).first()
+    if row is None:
+        raise Http404("Unknown diagram")
+    created_at, data, body = row
+
+    if encoding == 'br' and body is None:
+        # Blob stored before brotli was available: compress once and keep it
+        body = brotli.compress(gzip.decompress(bytes(data)))
+        SvgBlob.objects.filter(hash=digest).update(brotli_data=body)
+    elif encoding is None:
+        body = gzip.decompress(bytes(data))
+
+    response = HttpResponse(bytes(body), content_type='image/svg+xml')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Last-Modified'] = http_date(created_at.timestamp())
+    return cached_svg_response(response, digest, encoding)
+
 
 @require_http_methods(["GET"])
 def svg_diagram_view(request, upc):
-    """Return SVG diagram data for a product UPC"""
-    try:
-        part = Part.objects.get(part_number=upc)
-        child_title = part.child_title
-        
-        if child_title and child_title.svg_code:
-            return JsonResponse({
-                'success': True,
-                'title': child_title.title,
-                'svg_code': child_title.svg_code
-            })
-        else:
-            return JsonResponse({
-                'success': False,
-                'message': 'No SVG diagram available'
-            })
-    except (Part.DoesNotExist, ChildTitle.DoesNotExist):
+    """Return SVG diagram data for a product UPC (or part number, matched normalised)"""
+    diagram = diagrams_for_upcs([upc]).get(upc)
+    if diagram is None:
+        return JsonResponse({
+            'success': False,
+            'message': 'Part not found',
+            # Numbers one typo away, for "did you mean"
+            'suggestions': [part_number.number for part_number in near_misses(part_number_for_upc(upc))],
+        })
+
+    if diagram['svg_code']:
+        return JsonResponse({
+            'success': True,
+            'title': diagram['title'],
+            'svg_code': diagram['svg_code'],
+            'svg_url': reverse('svg_file', args=[diagram['hash']]),
+        })
+    else:
         return JsonResponse({
             'success': False,
-            'message': 'Part not found'
+            'message': 'No SVG diagram available'
         })